@@ -0,0 +1,119 @@
+"""Flash calls, throughput and queueing delay of micro-batched vs per-job classification, fully offline
+
+Classifies the leading text of synthetic documents from concurrent threads
+(standing in for concurrent jobs) through the fake Gemini model with a fixed
+latency and a server-side quota. Batches up to the thread count (what the
+service's batch size is capped at), so each batch can fill.
+
+Run from services/document-service:
+    python -m benchmarks.bench_classify_batching [--documents 300 --threads 16 --latency-ms 400 --quota-rpm 600]
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+os.environ.setdefault("LLM_RETRY_BASE_SECONDS", "0.2")
+os.environ.setdefault("LLM_RETRY_MAX_SECONDS", "2")
+os.environ.setdefault("LLM_BURST_SECONDS", "1")
+
+from src.config import settings  # noqa: E402
+from src.workflows.classification_batcher import ClassificationBatcher  # noqa: E402
+from src.workflows.fake_gemini import FakeGeminiChat  # noqa: E402
+from src.workflows.helpers import CLASSIFICATION_PROMPT, CLASSIFICATION_BATCH_PROMPT  # noqa: E402
+from src.workflows.llm_client import ModelLimiter, RateLimitedLLM  # noqa: E402
+from src.workflows.registry import _build_chain  # noqa: E402
+from src.utils.metrics import CLASSIFY_BATCH_FILL, CLASSIFY_BATCH_WAIT_SECONDS  # noqa: E402
+
+from .synthetic_docs import agreement_pages  # noqa: E402
+
+TITLES = [
+    "FACILITY AGREEMENT dated 1 March 2024 for ACME HOLDINGS PLC as Borrower",
+    "AMENDMENT AND RESTATEMENT AGREEMENT relating to a facility agreement dated 4 May 2021",
+    "INDICATIVE TERM SHEET - Senior Facilities - Strictly private and confidential",
+    "COMMITMENT LETTER - Project Falcon - Senior Facilities",
+]
+
+
+def documents(count: int) -> list:
+    body = agreement_pages(1)[0]
+    return [(f"{TITLES[i % len(TITLES)]}\n{body}")[:settings.CLASSIFY_MAX_CHARS] for i in range(count)]
+
+
+def run(name: str, texts: list, threads: int, window_ms: float, max_size: int, latency_ms: float, quota_rpm: int):
+    llm = RateLimitedLLM(
+        FakeGeminiChat(model="fake-flash", latency_ms=latency_ms, requests_per_minute=quota_rpm),
+        # Client budget just under the server quota, as the service configures it
+        ModelLimiter("fake-flash", int(quota_rpm * 0.9), 0, max_concurrency=threads),
+        max_retries=4
+    )
+    single = _build_chain(CLASSIFICATION_PROMPT, "{text}", llm)
+    batched = _build_chain(CLASSIFICATION_BATCH_PROMPT, "{documents}", llm)
+    calls = {"count": 0}
+    lock = threading.Lock()
+
+    def count(call):
+        def counted(text):
+            with lock:
+                calls["count"] += 1
+            return call(text)
+        return counted
+
+    batcher = ClassificationBatcher(
+        window_seconds=window_ms / 1000,
+        max_size=max_size,
+        classify_one=count(lambda text: single.invoke({"text": text}).content.strip()),
+        classify_many=count(lambda docs: batched.invoke({"documents": docs}).content)
+    )
+
+    def classify(text):
+        started = time.perf_counter()
+        try:
+            label = batcher.classify(text)
+        except Exception as e:
+            label = f"error: {e}"
+        return label, time.perf_counter() - started
+
+    fill_before = CLASSIFY_BATCH_FILL.snapshot()
+    wait_before = CLASSIFY_BATCH_WAIT_SECONDS.snapshot()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(classify, texts))
+    elapsed = time.perf_counter() - started
+
+    errors = sum(1 for label, _ in results if label.startswith("error"))
+    latencies = sorted(seconds for _, seconds in results)
+    fill, wait = CLASSIFY_BATCH_FILL.snapshot(), CLASSIFY_BATCH_WAIT_SECONDS.snapshot()
+    batches = fill["count"] - fill_before["count"]
+    mean_fill = (fill["sum"] - fill_before["sum"]) / batches if batches else 0.0
+    mean_wait_ms = (wait["sum"] - wait_before["sum"]) / max(wait["count"] - wait_before["count"], 1) * 1000
+    print(f"{name:<24}{calls['count']:>7}{errors:>7}{elapsed:>9.2f}{len(texts) / elapsed:>9.1f}"
+          f"{mean_fill:>8.0%}{mean_wait_ms:>11.1f}{statistics.median(latencies) * 1000:>9.0f}"
+          f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent jobs")
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--quota-rpm", type=int, default=600, help="Fake server-side Flash quota")
+    parser.add_argument("--windows-ms", default="10,50,200")
+    args = parser.parse_args()
+
+    texts = documents(args.documents)
+    print(f"{args.documents} documents, {args.threads} concurrent, Flash latency {args.latency_ms:.0f} ms, "
+          f"quota {args.quota_rpm} RPM\n")
+    print(f"{'mode':<24}{'calls':>7}{'errors':>7}{'seconds':>9}{'docs/s':>9}{'fill':>8}"
+          f"{'queue ms':>11}{'p50 ms':>9}{'p99 ms':>9}")
+    run("per job", texts, args.threads, 0, 1, args.latency_ms, args.quota_rpm)
+    for window in (float(w) for w in args.windows_ms.split(",")):
+        run(f"batched, {window:.0f} ms window", texts, args.threads, window, args.threads,
+            args.latency_ms, args.quota_rpm)
+
+
+if __name__ == "__main__":
+    main()
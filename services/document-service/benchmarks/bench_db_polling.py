@@ -0,0 +1,112 @@
+"""Status-poll latency under concurrent progress writers: pooled WAL connections vs connect-per-call
+
+Run from services/document-service:
+    python -m benchmarks.bench_db_polling [--jobs 50 --pollers 20 --seconds 10]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import aiosqlite
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+from src.database import jobs  # noqa: E402
+from src.database.connection import db_manager  # noqa: E402
+
+
+async def legacy_get_job(job_id: str):
+    """The pre-pool access pattern: a fresh connection per call"""
+    async with aiosqlite.connect(db_manager.db_path) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute("SELECT * FROM extraction_jobs WHERE job_id = ?", (job_id,)) as cursor:
+            return await cursor.fetchone()
+
+
+async def legacy_update_progress(job_id: str, progress: int):
+    async with aiosqlite.connect(db_manager.db_path) as db:
+        await db.execute(
+            "UPDATE extraction_jobs SET status = ?, progress = ?, updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+            ("processing", progress, job_id)
+        )
+        await db.commit()
+
+
+async def run(mode: str, job_ids: list, pollers: int, writers: int, seconds: float) -> dict:
+    get = legacy_get_job if mode == "legacy" else jobs.get_job
+    if mode == "legacy":
+        update = legacy_update_progress
+    else:
+        async def update(job_id, progress):
+            await jobs.update_job_status(job_id, status="processing", progress=progress)
+
+    poll_latencies, write_count = [], 0
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    async def poller():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await get(random.choice(job_ids))
+            poll_latencies.append((time.perf_counter() - start) * 1000)
+
+    async def writer():
+        nonlocal write_count
+        progress = 0
+        while time.perf_counter() < deadline:
+            await update(random.choice(job_ids), progress % 100)
+            progress += 1
+            write_count += 1
+            await asyncio.sleep(0.001)
+
+    await asyncio.gather(*[poller() for _ in range(pollers)], *[writer() for _ in range(writers)])
+    if mode == "pooled":
+        # Count buffered progress only once it is committed
+        await db_manager.flush_progress()
+    elapsed = time.perf_counter() - started
+    poll_latencies.sort()
+    return {
+        "mode": mode,
+        "polls": len(poll_latencies),
+        "writes": write_count,
+        "writes_per_s": write_count / elapsed,
+        "p50_ms": statistics.median(poll_latencies),
+        "p99_ms": poll_latencies[int(len(poll_latencies) * 0.99) - 1],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--pollers", type=int, default=20)
+    parser.add_argument("--writers", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.db_path = Path(tmp) / "bench.db"
+        await jobs.init_db()
+        job_ids = [str(uuid.uuid4()) for _ in range(args.jobs)]
+        for job_id in job_ids:
+            await jobs.create_job(job_id, "bench.pdf", "/dev/null", 0, status="processing")
+
+        results = [
+            await run(mode, job_ids, args.pollers, args.writers, args.seconds)
+            for mode in ("legacy", "pooled")
+        ]
+        await jobs.close_db()
+
+    print(f"{'mode':<8}{'polls':>9}{'writes':>9}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['polls']:>9}{r['writes']:>9}{r['writes_per_s']:>10.0f}"
+              f"{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""Time, peak memory and recovered table text of the streaming DOCX reader vs python-docx
+
+Reads data/sample-documents/amendment-sample.docx (skipped while it is an
+empty placeholder) and synthetic agreements with a margin ratchet table
+every ten pages, with the python-docx reader this replaced (paragraphs
+only) and the streaming one. Peak memory is the growth in peak RSS of a
+fresh process reading the file once (python-docx's lxml tree lives outside
+the Python heap, so tracemalloc would miss it). "blocks" walks the document
+without keeping its text, which is what stays bounded; "text" also builds
+the joined document text.
+
+Run from services/document-service:
+    python -m benchmarks.bench_docx [--pages 100,1000,3000] [--repeat 3]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict
+
+from docx import Document as DocxDocument
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+from src.core.parsers.docx_parser import extract_docx_pages, iter_docx_blocks  # noqa: E402
+
+from .bench_pipeline import SAMPLE_DIR  # noqa: E402
+from .synthetic_docs import MARGIN_RATCHET, agreement_pages, write_docx  # noqa: E402
+
+
+def legacy_read(file_path: str) -> str:
+    """The reader this replaced: the python-docx object model, paragraphs only"""
+    doc = DocxDocument(file_path)
+    return "\n".join(para.text for para in doc.paragraphs if para.text.strip())
+
+
+def streaming_read(file_path: str) -> str:
+    return extract_docx_pages(file_path).text
+
+
+def streaming_blocks(file_path: str) -> int:
+    return sum(1 for _ in iter_docx_blocks(file_path))
+
+
+READERS: Dict[str, Callable] = {
+    "python-docx": legacy_read,
+    "streaming text": streaming_read,
+    "streaming blocks": streaming_blocks,
+}
+
+
+def _peak_rss_kib() -> int:
+    # VmHWM rather than ru_maxrss, which a spawned process inherits from its parent (Linux only)
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+
+
+def peak_rss_growth(reader: str, file_path: str) -> float:
+    """MiB the peak RSS of this (fresh) process grows by while reading the file once"""
+    before = _peak_rss_kib()
+    READERS[reader](file_path)
+    return (_peak_rss_kib() - before) / 1024
+
+
+def measure(reader: str, path: Path, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = READERS[reader](str(path))
+        timings.append(time.perf_counter() - started)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        peak = pool.submit(peak_rss_growth, reader, str(path)).result()
+    return {"seconds": statistics.median(timings), "peak_mib": peak, "output": output}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default="100,1000,3000", help="Synthetic document page counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        sample = SAMPLE_DIR / "amendment-sample.docx"
+        if sample.stat().st_size > 0:
+            paths[f"sample:{sample.name}"] = sample
+        else:
+            print(f"{sample.name} is an empty placeholder; synthetic documents only\n")
+        for count in (int(n) for n in args.pages.split(",")):
+            path = Path(tmp) / f"synthetic-{count}p.docx"
+            write_docx(path, agreement_pages(count), table_every=10)
+            paths[f"synthetic:{count}p"] = path
+
+        grid_cell = MARGIN_RATCHET[2][0]
+        print(f"{'document':<24}{'reader':<18}{'seconds':>9}{'peak RSS MiB':>14}{'chars':>10}{'ratchet rows':>14}")
+        for name, path in paths.items():
+            for reader in READERS:
+                result = measure(reader, path, args.repeat)
+                output = result["output"]
+                chars = f"{len(output):,}" if isinstance(output, str) else "-"
+                rows = output.count(grid_cell) if isinstance(output, str) else "-"
+                print(f"{name:<24}{reader:<18}{result['seconds']:>9.3f}{result['peak_mib']:>14.1f}"
+                      f"{chars:>10}{rows:>14}")
+
+
+if __name__ == "__main__":
+    main()
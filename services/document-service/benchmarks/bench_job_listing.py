@@ -0,0 +1,167 @@
+"""Job listing latency on a large table: OFFSET pagination vs keyset cursors, filters and counts
+
+Seeds a temporary database (default 1M jobs) and pages deep into it.
+
+Run from services/document-service:
+    python -m benchmarks.bench_job_listing [--rows 1000000 --pages 200 --page-size 50]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+from src.database import jobs  # noqa: E402
+from src.database.connection import db_manager  # noqa: E402
+from src.database.migrations import MIGRATIONS  # noqa: E402
+
+STATUSES = ["completed"] * 8 + ["failed", "pending"]
+DOCUMENT_TYPES = ["FACILITY_AGREEMENT", "AMENDMENT", "TERM_SHEET", "OTHER"]
+
+
+def seed(db_path: Path, rows: int):
+    """Bulk insert synthetic jobs spread over a year, three per timestamp so the cursor must break ties"""
+    start = datetime(2025, 1, 1)
+    rng = random.Random(7)
+    db = sqlite3.connect(db_path)
+    batch = []
+    for i in range(rows):
+        status = rng.choice(STATUSES)
+        batch.append((
+            str(uuid.UUID(int=rng.getrandbits(128))),
+            f"doc-{i}.pdf",
+            f"uploads/doc-{i}.pdf",
+            100_000,
+            status,
+            100 if status == "completed" else 0,
+            round(rng.random(), 3) if status == "completed" else None,
+            f'{{"document_type": "{rng.choice(DOCUMENT_TYPES)}"}}' if status == "completed" else None,
+            (start + timedelta(seconds=(i // 3) * 90)).strftime("%Y-%m-%d %H:%M:%S"),
+        ))
+        if len(batch) == 50_000:
+            _insert(db, batch)
+            batch = []
+    if batch:
+        _insert(db, batch)
+    db.close()
+
+
+def _insert(db, batch):
+    db.executemany(
+        """
+        INSERT INTO extraction_jobs
+            (job_id, filename, file_path, file_size, status, progress, confidence, result, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        batch
+    )
+    db.commit()
+
+
+async def offset_page(limit: int, offset: int):
+    """The pre-cursor OFFSET query"""
+    async with db_manager.reader() as db:
+        async with db.execute(
+            """
+            SELECT job_id, filename, status, progress, confidence, created_at, updated_at
+            FROM extraction_jobs
+            ORDER BY created_at DESC
+            LIMIT ? OFFSET ?
+            """,
+            (limit, offset)
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+async def timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+
+def summarize(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<34} n={len(latencies):<5} p50={statistics.median(latencies):8.2f} ms  "
+          f"p99={p99:8.2f} ms  max={latencies[-1]:8.2f} ms")
+
+
+async def main(rows: int, pages: int, page_size: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.db_path = Path(tmp) / "bench.db"
+
+        # Seed at schema version 1 (no document_type column, indexes or counts),
+        # then migrate the way an existing deployment would
+        await db_manager.open()
+        async with db_manager.writer() as conn:
+            await MIGRATIONS[0][1](conn)
+            await conn.execute("PRAGMA user_version = 1")
+        await db_manager.close()
+
+        start = time.perf_counter()
+        seed(db_manager.db_path, rows)
+        print(f"Seeded {rows:,} jobs in {time.perf_counter() - start:.1f}s")
+
+        # Legacy OFFSET pagination before the indexes exist
+        await db_manager.open()
+        offset_latencies = []
+        for page in range(0, pages, max(1, pages // 10)):
+            offset_latencies.append(await timed(offset_page(page_size, page * page_size)))
+        summarize("offset (no index, every 10th page)", offset_latencies)
+        await db_manager.close()
+
+        start = time.perf_counter()
+        await jobs.init_db()
+        print(f"Applied migrations in {time.perf_counter() - start:.1f}s")
+
+        offset_latencies = []
+        for page in range(pages):
+            offset_latencies.append(await timed(offset_page(page_size, page * page_size)))
+        summarize("offset (indexed, first pages)", offset_latencies)
+        deep = [await timed(offset_page(page_size, rows * k // 10)) for k in range(1, 10)]
+        summarize("offset (indexed, 10%..90% deep)", deep)
+
+        for label, filters in [
+            ("keyset", {}),
+            ("keyset status=failed", {"status": "failed"}),
+            ("keyset type=AMENDMENT", {"document_type": "AMENDMENT"}),
+            ("keyset confidence>=0.9", {"min_confidence": 0.9}),
+        ]:
+            latencies, cursor = [], None
+            for _ in range(pages):
+                start = time.perf_counter()
+                page = await jobs.list_jobs(limit=page_size, cursor=cursor, **filters)
+                latencies.append((time.perf_counter() - start) * 1000)
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+            summarize(label, latencies)
+
+        for label, filters in [
+            ("count (all, maintained)", {}),
+            ("count status=completed", {"status": "completed"}),
+            ("count date window (indexed)", {"created_after": "2025-01-10 00:00:00",
+                                             "created_before": "2025-01-11 00:00:00"}),
+        ]:
+            latencies = [await timed(jobs.count_jobs(**filters)) for _ in range(20)]
+            summarize(label, latencies)
+        print(f"Total jobs reported: {await jobs.count_jobs():,}")
+
+        await jobs.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.pages, args.page_size))
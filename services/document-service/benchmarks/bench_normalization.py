@@ -0,0 +1,122 @@
+"""Records per second of ontology normalization, for single extractions and stored-result batches
+
+Generates raw extractions the way the models return them (aliased keys,
+amounts like "GBP 250,000,000", rates like "SONIA + 2.5%", dates in several
+formats) and times:
+
+  * normalizing them one at a time with the compiled engine, against
+    loading and compiling the ontology for every record;
+  * re-normalizing all of them stored as job results, as after an
+    ontology bump, at several batch sizes, then the no-op pass that finds
+    every result already current.
+
+Run from services/document-service:
+    python -m benchmarks.bench_normalization [--records 20000 --covenants 8]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+from src.config import settings  # noqa: E402
+from src.core.mappers.ontology_mapper import OntologyEngine, get_ontology  # noqa: E402
+from src.database import jobs  # noqa: E402
+from src.database.connection import db_manager  # noqa: E402
+from src.database.results import renormalize_job_results, store_job_results  # noqa: E402
+
+BORROWERS = ["Acme Holdings plc", "Northwind Logistics Limited", "Contoso Energy S.à r.l.", "Fabrikam Retail Group"]
+AMOUNTS = ["GBP 250,000,000", "£1.5bn", "USD 75 million", "EUR 400.000.000", "$120m"]
+RATES = ["SONIA + 2.5%", "Term SOFR plus 175 bps", "EURIBOR + 3.25 per cent. per annum, zero floor",
+         "Compounded SONIA plus a Margin of 2.75%", "6.5% fixed"]
+DATES = ["15th March 2029", "31/12/2030", "2028-06-30", "June 30, 2031", "1 Sept 2027"]
+COVENANTS = ["Net debt to EBITDA", "Interest Cover", "DSCR", "Loan to Value", "Minimum Liquidity"]
+FREQUENCIES = ["quarterly", "tested semi-annually", "each Financial Year", "Monthly"]
+
+
+def raw_extraction(rng: random.Random, covenants: int) -> dict:
+    """A facility agreement extraction as a model returns it, with a mix of canonical and aliased keys"""
+    extraction = {
+        rng.choice(["borrower", "obligor"]): {
+            rng.choice(["name", "legal_name"]): rng.choice(BORROWERS),
+            rng.choice(["jurisdiction", "country"]): rng.choice(["England", "Luxembourg", "Delaware"]),
+        },
+        rng.choice(["facility", "facility_details"]): {
+            rng.choice(["amount", "total_commitments"]): rng.choice(AMOUNTS),
+            "type": rng.choice(["Term Loan B", "RCF", "Revolving Credit Facility"]),
+            rng.choice(["maturity_date", "termination_date"]): rng.choice(DATES),
+            rng.choice(["interest_rate", "margin"]): rng.choice(RATES),
+        },
+        rng.choice(["covenants", "financial_covenants"]): [
+            {"type": rng.choice(COVENANTS), rng.choice(["threshold", "level"]): f"{rng.uniform(1, 5):.2f}:1",
+             "frequency": rng.choice(FREQUENCIES), "definition": "As defined in Clause 26.1"}
+            for _ in range(covenants)
+        ],
+    }
+    return extraction
+
+
+def stored_result(extraction: dict) -> dict:
+    """A job result as stored before the ontology engine: the model output under the MVP version"""
+    return {"document_type": "FACILITY_AGREEMENT", "extraction": extraction,
+            "ontology_version": "1.0.0-mvp", "source": "gemini-extraction"}
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>12,.0f}"
+
+
+async def batch_pass(engine: OntologyEngine, batch_size: int, force: bool) -> dict:
+    return await renormalize_job_results(engine, batch_size=batch_size, force=force)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--covenants", type=int, default=8, help="Covenants per extraction")
+    parser.add_argument("--batch-sizes", default="100,500,2000")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    extractions = [raw_extraction(rng, args.covenants) for _ in range(args.records)]
+    engine = get_ontology()
+
+    print(f"{'single extractions':<44}{'records':>9}{'seconds':>9}{'records/s':>12}")
+    started = time.perf_counter()
+    for extraction in extractions:
+        engine.normalize("FACILITY_AGREEMENT", extraction)
+    seconds = time.perf_counter() - started
+    print(f"{'compiled engine':<44}{len(extractions):>9}{seconds:>9.2f}{rate(len(extractions), seconds)}")
+
+    sample = extractions[:min(200, len(extractions))]
+    started = time.perf_counter()
+    for extraction in sample:
+        OntologyEngine.load(settings.ONTOLOGY_PATH).normalize("FACILITY_AGREEMENT", extraction)
+    seconds = time.perf_counter() - started
+    print(f"{'load + compile per record':<44}{len(sample):>9}{seconds:>9.2f}{rate(len(sample), seconds)}")
+
+    print(f"\n{'stored results (job_results)':<44}{'records':>9}{'seconds':>9}{'records/s':>12}")
+    for batch_size in (int(n) for n in args.batch_sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager.db_path = Path(tmp) / "bench.db"
+            await jobs.init_db()
+            results = [(str(uuid.uuid4()), stored_result(extraction)) for extraction in extractions]
+            async with db_manager.writer() as db:
+                await store_job_results(db, results)
+
+            stats = await batch_pass(engine, batch_size, force=False)
+            print(f"{f're-normalize, batches of {batch_size}':<44}{stats['renormalized']:>9}"
+                  f"{stats['seconds']:>9.2f}{stats['records_per_second']:>12,.0f}")
+            stats = await batch_pass(engine, batch_size, force=False)
+            print(f"{f'already current, batches of {batch_size}':<44}{stats['skipped']:>9}"
+                  f"{stats['seconds']:>9.2f}{stats['records_per_second']:>12,.0f}")
+            await jobs.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
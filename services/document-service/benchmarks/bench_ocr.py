@@ -0,0 +1,136 @@
+"""OCR throughput of scanned PDFs in pages per second at 1 to N OCR workers
+
+Runs on the PDFs in data/sample-documents (empty placeholders are skipped),
+a synthetic fully scanned agreement and a synthetic agreement whose last
+pages are scanned signature pages. Each run starts with an empty OCR cache;
+a final run at the highest worker count shows re-reading from the cache.
+Text-layer pages are never OCRed, so only scanned pages count towards the
+rate. Needs tesseract and poppler on PATH, plus pytesseract, pdf2image and
+Pillow.
+
+Run from services/document-service:
+    python -m benchmarks.bench_ocr [--pages 24] [--workers 1,2,4,8]
+"""
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+os.environ["TEXT_STORE_ENABLED"] = "false"
+
+from src.config import settings  # noqa: E402
+from src.core.parsers import ocr_engine  # noqa: E402
+from src.core.parsers.pdf_parser import (  # noqa: E402
+    _extract_page_range, extract_pdf_pages, get_page_count, shutdown_pdf_pool
+)
+from src.database import jobs  # noqa: E402
+from src.database.connection import db_manager  # noqa: E402
+
+from .bench_pipeline import SAMPLE_DIR  # noqa: E402
+from .synthetic_docs import agreement_pages, render_scan, write_pdf  # noqa: E402
+
+
+def documents(pages: int, workdir: Path) -> Dict[str, tuple]:
+    """{name: (path, expected text or None)} of sample PDFs with content and synthetic scans"""
+    found = {}
+    for path in sorted(SAMPLE_DIR.glob("*.pdf")):
+        if path.stat().st_size > 0:
+            found[f"sample:{path.name}"] = (path, None)
+
+    text = agreement_pages(pages)
+    scanned = workdir / f"scanned-{pages}p.pdf"
+    write_pdf(scanned, text, {i: render_scan(page) for i, page in enumerate(text)})
+    found[f"synthetic:scanned-{pages}p"] = (scanned, text)
+
+    mixed = workdir / f"signatures-{pages}p.pdf"
+    signature_pages = range(pages - max(2, pages // 10), pages)
+    write_pdf(mixed, text, {i: render_scan(text[i]) for i in signature_pages})
+    found[f"synthetic:{pages}p+signatures"] = (mixed, text)
+    return found
+
+
+def scanned_page_count(path: Path) -> int:
+    extracted = _extract_page_range(str(path), 0, get_page_count(str(path)), detect_scans=True)
+    return sum(1 for _, fingerprint in extracted if fingerprint)
+
+
+def word_recall(expected: List[str], pages: List[str]) -> float:
+    """Share of the source words found on the same page after OCR"""
+    found = total = 0
+    for source, text in zip(expected, pages):
+        words = set(re.findall(r"[A-Za-z]{3,}", text))
+        expected_words = re.findall(r"[A-Za-z]{3,}", source)
+        total += len(expected_words)
+        found += sum(1 for word in expected_words if word in words)
+    return found / total if total else 1.0
+
+
+async def create_schema():
+    await jobs.init_db()
+    await jobs.close_db()
+
+
+def clear_cache():
+    with sqlite3.connect(db_manager.db_path) as db:
+        db.execute("DELETE FROM ocr_pages")
+
+
+def start_pool(workers: int):
+    """Size the OCR pool and spawn its processes up front, so runs time OCR rather than startup"""
+    shutdown_pdf_pool()
+    settings.OCR_WORKERS = workers
+    if workers > 1:
+        pool = ocr_engine._get_pool()
+        for future in [pool.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+
+
+def timed_extract(path: Path) -> tuple:
+    started = time.perf_counter()
+    document = extract_pdf_pages(str(path))
+    return time.perf_counter() - started, document
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=24, help="Pages per synthetic document")
+    default_workers = sorted({1, 2, 4, os.cpu_count() or 1})
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)), help="OCR worker counts")
+    args = parser.parse_args()
+    worker_counts = [int(n) for n in args.workers.split(",")]
+
+    if not ocr_engine.ocr_available():
+        raise SystemExit("OCR dependencies are missing (see the warning above); nothing to benchmark")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.db_path = Path(tmp) / "bench.db"
+        asyncio.run(create_schema())
+
+        print(f"OCR at {settings.OCR_DPI} dpi, lang {settings.OCR_LANG}\n")
+        print(f"{'document':<36}{'pages':>6}{'scanned':>9}{'workers':>9}{'seconds':>9}"
+              f"{'pages/s':>9}{'speedup':>9}{'recall':>8}")
+        for name, (path, expected) in documents(args.pages, Path(tmp)).items():
+            page_count, scanned = get_page_count(str(path)), scanned_page_count(path)
+            base = None
+            for workers in worker_counts:
+                start_pool(workers)
+                clear_cache()
+                seconds, document = timed_extract(path)
+                base = base or seconds
+                recall = f"{word_recall(expected, [page.text for page in document.pages]):.0%}" if expected else "-"
+                print(f"{name:<36}{page_count:>6}{scanned:>9}{workers:>9}{seconds:>9.2f}"
+                      f"{scanned / seconds:>9.1f}{base / seconds:>8.1f}x{recall:>8}")
+            seconds, _ = timed_extract(path)
+            print(f"{name + ' (cached)':<36}{page_count:>6}{scanned:>9}{worker_counts[-1]:>9}{seconds:>9.2f}"
+                  f"{scanned / seconds:>9.1f}{base / seconds:>8.1f}x{'-':>8}")
+        shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""End-to-end extraction pipeline benchmark with a deterministic fake Gemini, compared to a stored baseline
+
+Runs run_extraction_workflow on the sample documents in data/sample-documents
+(empty placeholders are skipped) and on synthetic PDF/DOCX agreements, then
+reports throughput, p50/p99 job and per-stage latency and peak RSS. Each
+document runs in its own process, so peak RSS is per document.
+
+Run from services/document-service:
+    python -m benchmarks.bench_pipeline [--pages 10,100,1000] [--jobs 3] [--concurrency 3]
+        [--latency-ms 50] [--save-baseline] [--fail-on-regression]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+SAMPLE_DIR = Path(__file__).resolve().parents[3] / "data" / "sample-documents"
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "pipeline.json"
+STAGES = ["classify", "extract_gemini", "fuse", "normalize", "validate"]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and of finished child processes (Linux reports KiB)
+
+    Reads the process's own peak from VmHWM where /proc has it: ru_maxrss of a
+    spawned process starts from its parent's peak.
+    """
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        with open("/proc/self/status") as status:
+            own = next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        pass
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / scale, 1)
+
+
+def documents(pages: List[int], workdir: Path) -> Dict[str, Path]:
+    """Sample documents that have content, plus synthetic ones at each page count"""
+    from .synthetic_docs import agreement_pages, write_docx, write_pdf
+
+    found = {}
+    for path in sorted(SAMPLE_DIR.glob("*")):
+        if path.suffix.lower() in (".pdf", ".docx") and path.stat().st_size > 0:
+            found[f"sample:{path.name}"] = path
+    for count in pages:
+        text = agreement_pages(count)
+        for suffix, write in ((".pdf", write_pdf), (".docx", write_docx)):
+            path = workdir / f"synthetic-{count}p{suffix}"
+            write(path, text)
+            found[f"synthetic:{count}p{suffix}"] = path
+    return found
+
+
+async def run_scenario(path: Path, jobs: int, concurrency: int) -> Dict[str, Any]:
+    from src.database.jobs import create_job, get_job, get_job_trace
+    from src.utils.file_utils import hash_file
+    from src.workflows.langgraph_extraction import run_extraction_workflow
+
+    content_hash = hash_file(str(path))
+    semaphore = asyncio.Semaphore(concurrency)
+    traces, statuses = [], []
+
+    async def one():
+        job_id = str(uuid.uuid4())
+        await create_job(job_id, path.name, str(path), path.stat().st_size, content_hash=content_hash)
+        async with semaphore:
+            await run_extraction_workflow(job_id, str(path), content_hash, trace=True)
+        statuses.append((await get_job(job_id))["status"])
+        traces.append((await get_job_trace(job_id))["trace"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(jobs)))
+    elapsed = time.perf_counter() - started
+
+    totals = [trace["total_ms"] for trace in traces]
+    stages = {}
+    for stage in STAGES:
+        timings = [s["wall_ms"] for trace in traces for s in trace["stages"] if s["stage"] == stage]
+        if timings:
+            stages[stage] = {"p50_ms": round(statistics.median(timings), 1), "p99_ms": round(percentile(timings, 0.99), 1)}
+    return {
+        "jobs": jobs,
+        "failed": sum(status != "completed" for status in statuses),
+        "throughput_jobs_per_s": round(jobs / elapsed, 3),
+        "p50_ms": round(statistics.median(totals), 1),
+        "p99_ms": round(percentile(totals, 0.99), 1),
+        "llm_calls_per_job": round(sum(s["llm_calls"] for t in traces for s in t["stages"]) / jobs, 1),
+        "stages": stages,
+    }
+
+
+async def isolated_scenario(db_path: str, path: str, jobs: int, concurrency: int) -> Dict[str, Any]:
+    from src.core.parsers.pdf_parser import shutdown_pdf_pool
+    from src.database import jobs as job_db
+    from src.database.connection import db_manager
+    from src.utils.events import event_bus
+    from src.workflows.registry import registry
+
+    db_manager.db_path = Path(db_path)
+    await job_db.init_db()
+    registry.warm()
+    event_bus.bind(asyncio.get_running_loop())
+    try:
+        return await run_scenario(Path(path), jobs, concurrency)
+    finally:
+        await job_db.close_db()
+        # Parser workers exit here, so their peak counts towards this scenario
+        shutdown_pdf_pool()
+
+
+def scenario_process(db_path: str, path: str, jobs: int, concurrency: int) -> Dict[str, Any]:
+    """Run one scenario in a fresh process, so its peak RSS is its own and not the largest so far"""
+    result = asyncio.run(isolated_scenario(db_path, path, jobs, concurrency))
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print changes against the baseline; returns the regressions beyond tolerance"""
+    regressions = []
+    print(f"\nvs baseline ({baseline.get('meta', {}).get('recorded_at', 'unknown date')}), tolerance {tolerance:.0%}")
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            print(f"  {name:<30} no baseline")
+            continue
+        changes = []
+        for key, higher_is_better in (("throughput_jobs_per_s", True), ("p50_ms", False), ("p99_ms", False)):
+            if not base.get(key):
+                continue
+            change = (result[key] - base[key]) / base[key]
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = " REGRESSION"
+                regressions.append(f"{name} {key} {change:+.0%}")
+            changes.append(f"{key} {change:+.0%}{flag}")
+        print(f"  {name:<30} " + ", ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default="10,100,1000", help="Synthetic document page counts")
+    parser.add_argument("--jobs", type=int, default=3, help="Jobs per document")
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--latency-ms", type=int, default=50, help="Fake Gemini latency per call")
+    parser.add_argument("--text-store", action="store_true", help="Reuse parsed text between jobs")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the configured Gemini RPM/TPM limits")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the fake model first
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_GEMINI_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["TEXT_STORE_ENABLED"] = "true" if args.text_store else "false"
+    if not args.rate_limits:
+        # Measure the pipeline, not the quota pacing
+        for name in ("GEMINI_FLASH_RPM", "GEMINI_FLASH_TPM", "GEMINI_PRO_RPM", "GEMINI_PRO_TPM"):
+            os.environ[name] = "0"
+
+    results = {}
+    spawn = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = documents([int(p) for p in args.pages.split(",") if p], Path(tmp))
+        print(f"{len(docs)} documents, {args.jobs} jobs each, concurrency {args.concurrency}, "
+              f"fake Gemini {args.latency_ms} ms/call, "
+              f"each document in a fresh process\n")
+        print(f"{'document':<30}{'jobs/s':>8}{'p50 ms':>10}{'p99 ms':>10}{'calls':>7}{'RSS MB':>8}   stage p50/p99 ms")
+        for name, path in docs.items():
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                result = pool.submit(
+                    scenario_process, str(Path(tmp) / "bench.db"), str(path), args.jobs, args.concurrency
+                ).result()
+            results[name] = result
+            stages = "  ".join(
+                f"{stage} {timing['p50_ms']:.0f}/{timing['p99_ms']:.0f}"
+                for stage, timing in result["stages"].items() if stage in ("classify", "extract_gemini")
+            )
+            failed = f"  ({result['failed']} failed)" if result["failed"] else ""
+            print(f"{name:<30}{result['throughput_jobs_per_s']:>8.2f}{result['p50_ms']:>10.1f}"
+                  f"{result['p99_ms']:>10.1f}{result['llm_calls_per_job']:>7.1f}{result['peak_rss_mb']:>8.1f}   "
+                  f"{stages}{failed}")
+
+    regressions = []
+    if args.baseline.exists():
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            "meta": {
+                "recorded_at": time.strftime("%Y-%m-%d"),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "jobs": args.jobs,
+                "concurrency": args.concurrency,
+                "latency_ms": args.latency_ms,
+                "text_store": args.text_store,
+                "rate_limits": args.rate_limits,
+            },
+            "scenarios": results,
+        }, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        print("Regressions: " + "; ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Status-poll cost of inline JSON results vs compressed result blobs with ETags
+
+Creates completed jobs with large extraction results, then times the old
+status read (SELECT * with the result TEXT in the job row, json.loads on
+every poll) against the status read of the job row alone, the full result
+read, a projected read and the ETag revalidation that answers 304.
+
+Run from services/document-service:
+    python -m benchmarks.bench_result_storage [--jobs 200 --covenants 400 --polls 2000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+from src.api.routes.upload import _project  # noqa: E402
+from src.database import jobs  # noqa: E402
+from src.database.connection import db_manager  # noqa: E402
+from src.database.results import get_job_result, get_job_result_etag  # noqa: E402
+
+
+def large_result(covenants: int, seed: int) -> dict:
+    """A normalized result like a long facility agreement's, with per-field provenance"""
+    rng = random.Random(seed)
+    extraction = {
+        "borrower": {"name": "ACME HOLDINGS LIMITED", "jurisdiction": "England and Wales"},
+        "facility": {"amount": 250000000, "currency": "GBP", "type": "Term Loan",
+                     "maturity_date": "2029-12-31", "interest_rate": "SONIA + 2.25%"},
+        "covenants": [
+            {"type": rng.choice(["Leverage", "Interest Cover", "Cashflow Cover"]),
+             "definition": "Total Net Debt to EBITDA for the Relevant Period ending on Test Date %d" % i,
+             "threshold": round(rng.uniform(1, 5), 2), "frequency": "Quarterly"}
+            for i in range(covenants)
+        ],
+    }
+    provenance = {f"covenants[{i}]": i // 10 for i in range(covenants)}
+    return {"document_type": "FACILITY_AGREEMENT", "extraction": extraction, "provenance": provenance,
+            "ontology_version": "1.0.0-mvp", "source": "gemini-extraction"}
+
+
+async def legacy_status(job_id: str):
+    """The pre-split status read: the whole row including the result, parsed on every poll"""
+    async with db_manager.reader() as db:
+        async with db.execute("SELECT * FROM extraction_jobs WHERE job_id = ?", (job_id,)) as cursor:
+            job = dict(await cursor.fetchone())
+    job["result"] = json.loads(job["result"])
+    return job
+
+
+async def status_row(job_id: str):
+    return await jobs.get_job(job_id)
+
+
+async def full_status(job_id: str):
+    await jobs.get_job(job_id)
+    return await get_job_result(job_id)
+
+
+async def revalidate(job_id: str):
+    await jobs.get_job(job_id)
+    return await get_job_result_etag(job_id)
+
+
+async def projected(job_id: str):
+    stored = await get_job_result(job_id)
+    return _project(stored["result"], ["facility", "borrower"])
+
+
+async def time_calls(call, job_ids: list, polls: int) -> list:
+    latencies = []
+    for _ in range(polls):
+        job_id = random.choice(job_ids)
+        start = time.perf_counter()
+        await call(job_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--covenants", type=int, default=400, help="List items per result (sets its size)")
+    parser.add_argument("--polls", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.db_path = Path(tmp) / "bench.db"
+        await jobs.init_db()
+
+        job_ids = []
+        for i in range(args.jobs):
+            job_id = str(uuid.uuid4())
+            await jobs.create_job(job_id, f"doc-{i}.pdf", f"/tmp/doc-{i}.pdf", 1000)
+            await jobs.update_job_status(job_id, status="completed", progress=100,
+                                         result=large_result(args.covenants, i), confidence=0.85)
+            job_ids.append(job_id)
+
+        # The same results inline in the job row, as before the split
+        async with db_manager.writer() as db:
+            async with db.execute("SELECT job_id, etag, encoding, size, body FROM job_results") as cursor:
+                rows = await cursor.fetchall()
+            await db.executemany(
+                "UPDATE extraction_jobs SET result = ? WHERE job_id = ?",
+                [(json.dumps(large_result(args.covenants, job_ids.index(row["job_id"]))), row["job_id"])
+                 for row in rows]
+            )
+        inline_bytes = sum(row["size"] for row in rows)
+        blob_bytes = sum(len(row["body"]) for row in rows)
+        print(f"{args.jobs} completed jobs, result {inline_bytes / len(rows) / 1024:.0f} KiB JSON, "
+              f"{blob_bytes / len(rows) / 1024:.0f} KiB compressed ({blob_bytes / inline_bytes:.0%})\n")
+
+        print(f"{'read':<42}{'mean ms':>9}{'p50 ms':>9}{'p99 ms':>9}")
+        for name, call in (
+            ("legacy status (SELECT *, json.loads)", legacy_status),
+            ("status row only (processing job poll)", status_row),
+            ("status row + full result", full_status),
+            ("status row + ETag check (304)", revalidate),
+            ("result ?fields=facility,borrower", projected),
+        ):
+            latencies = sorted(await time_calls(call, job_ids, args.polls))
+            print(f"{name:<42}{statistics.mean(latencies):>9.3f}{statistics.median(latencies):>9.3f}"
+                  f"{latencies[int(len(latencies) * 0.99) - 1]:>9.3f}")
+
+        await jobs.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""Compare prompt size and preparation latency: 30k-char truncation vs section pre-selection
+
+Run from services/document-service:
+    python -m benchmarks.bench_section_selection [--synthetic-clauses 400]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+
+# Parsing and ranking are local; no Gemini call is made
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+os.environ.setdefault("TEXT_STORE_ENABLED", "false")
+
+from src.config import settings  # noqa: E402
+from src.core.extractors.section_index import SectionIndex, select_relevant_text  # noqa: E402
+from src.workflows.helpers import read_document, load_extraction_query_terms  # noqa: E402
+
+SAMPLE_DIR = Path(__file__).resolve().parents[3] / "data" / "sample-documents"
+DOC_TYPES = {"facility": "FACILITY_AGREEMENT", "amendment": "AMENDMENT", "term-sheet": "TERM_SHEET"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token estimate (~4 chars per token)"""
+    return len(text) // 4
+
+
+def term_coverage(text: str, terms: list) -> float:
+    """Fraction of query terms that appear in the prompt text"""
+    lowered = text.lower()
+    return sum(term.lower() in lowered for term in terms) / len(terms)
+
+
+def synthetic_agreement(clauses: int, seed: int = 7) -> str:
+    """Facility-agreement-like text with the key commercial clauses buried late in the document"""
+    rng = random.Random(seed)
+    filler = "Each Party acknowledges that the provisions of this Clause apply as set out in the Agreement. "
+    lines = ["FACILITY AGREEMENT", "dated 12 March 2024 between ACME HOLDINGS LIMITED as Borrower "
+             "(incorporated in England and Wales) and GLOBAL BANK PLC as Agent"]
+    special = {
+        int(clauses * 0.55): "THE FACILITY\nThe Lenders make available a sterling term loan facility "
+                             "in an aggregate amount equal to the Total Commitments of GBP 250,000,000.",
+        int(clauses * 0.7): "INTEREST\nThe rate of interest is the percentage rate per annum equal to "
+                            "the aggregate of the applicable Margin and SONIA. The Margin is 2.25 per cent.",
+        int(clauses * 0.8): "REPAYMENT\nThe Borrower shall repay the Loan in full on the Termination Date, "
+                            "being 31 December 2029.",
+        int(clauses * 0.9): "FINANCIAL COVENANTS\nLeverage: Total Net Debt to EBITDA shall not exceed 3.50:1 "
+                            "in respect of any Relevant Period, tested quarterly on each Test Date.",
+    }
+    for i in range(1, clauses + 1):
+        if i in special:
+            heading, body = special[i].split("\n", 1)
+            lines.append(f"{i}. {heading}")
+            lines.append(body)
+        else:
+            lines.append(f"{i}. DEFINITIONS AND INTERPRETATION PART {i}")
+            lines.append(filler * rng.randint(4, 12))
+    return "\n".join(lines)
+
+
+def bench(name: str, text: str, doc_type: str, repeat: int) -> dict:
+    terms = load_extraction_query_terms(doc_type)
+    budget = settings.EXTRACTION_MAX_CHARS
+
+    truncate_times, section_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        truncated = text[:budget]
+        truncate_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        selected = select_relevant_text(text, terms, budget)
+        section_times.append(time.perf_counter() - start)
+
+    return {
+        "document": name,
+        "chars": len(text),
+        "sections": len(SectionIndex(text).sections),
+        "truncate_tokens": estimate_tokens(truncated),
+        "sections_tokens": estimate_tokens(selected),
+        "truncate_coverage": term_coverage(truncated, terms),
+        "sections_coverage": term_coverage(selected, terms),
+        "truncate_ms": statistics.median(truncate_times) * 1000,
+        "sections_ms": statistics.median(section_times) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--synthetic-clauses", type=int, default=400)
+    args = parser.parse_args()
+
+    results = []
+    for path in sorted(SAMPLE_DIR.glob("*")):
+        if path.suffix.lower() not in settings.ALLOWED_EXTENSIONS:
+            continue
+        doc_type = next((t for key, t in DOC_TYPES.items() if key in path.name), "FACILITY_AGREEMENT")
+        try:
+            text = read_document(str(path))
+        except ValueError as e:
+            print(f"skip {path.name}: {e}")
+            continue
+        results.append(bench(path.name, text, doc_type, args.repeat))
+
+    if args.synthetic_clauses:
+        text = synthetic_agreement(args.synthetic_clauses)
+        results.append(bench(f"synthetic-{args.synthetic_clauses}-clauses", text, "FACILITY_AGREEMENT", args.repeat))
+
+    header = f"{'document':<40}{'chars':>9}{'sects':>7}{'trunc tok':>11}{'sect tok':>10}{'trunc cov':>11}{'sect cov':>10}{'sect ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['document']:<40}{r['chars']:>9}{r['sections']:>7}{r['truncate_tokens']:>11}"
+            f"{r['sections_tokens']:>10}{r['truncate_coverage']:>11.0%}{r['sections_coverage']:>10.0%}"
+            f"{r['sections_ms']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Per-job workflow setup overhead: rebuilding graph and chains per job vs the warm registry
+
+Run from services/document-service:
+    python -m benchmarks.bench_setup_overhead [--jobs 200]
+"""
+import argparse
+import os
+import statistics
+import time
+
+# Building clients and chains makes no network calls
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+from src.workflows.helpers import EXTRACTION_PROMPTS, CLASSIFICATION_PROMPT  # noqa: E402
+from src.workflows.langgraph_extraction import create_extraction_workflow  # noqa: E402
+from src.workflows.registry import registry, _build_chain  # noqa: E402
+
+
+def cold_setup(doc_type: str):
+    """What every job used to do: compile the graph and build both chains"""
+    create_extraction_workflow()
+    prompts = {name: spec for name, spec in EXTRACTION_PROMPTS.items()}  # prompt dict rebuilt per call
+    _build_chain(CLASSIFICATION_PROMPT, "Document text:\n\n{text}", registry.flash_llm)
+    _build_chain(prompts.get(doc_type, prompts["FACILITY_AGREEMENT"]), "{document_text}", registry.pro_llm)
+
+
+def warm_setup(doc_type: str):
+    """Registry lookups done per job today"""
+    registry.get_app()
+    registry.get_classification_chain()
+    registry.get_extraction_chain(doc_type)
+
+
+def measure(fn, jobs: int) -> list:
+    timings = []
+    for i in range(jobs):
+        doc_type = list(EXTRACTION_PROMPTS)[i % len(EXTRACTION_PROMPTS)]
+        start = time.perf_counter()
+        fn(doc_type)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    registry.warm()
+    print(f"registry warm-up: {(time.perf_counter() - start) * 1000:.1f} ms (once per process)")
+
+    for name, fn in (("per-job rebuild", cold_setup), ("warm registry", warm_setup)):
+        timings = sorted(measure(fn, args.jobs))
+        print(
+            f"{name:<16} p50 {statistics.median(timings):>10.1f} us   "
+            f"p99 {timings[int(len(timings) * 0.99) - 1]:>10.1f} us   "
+            f"total {sum(timings) / 1000:>8.1f} ms / {args.jobs} jobs"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Peak Python memory per extraction job (tracemalloc), with the fake Gemini model
+
+Runs one job at a time on the documents in data/sample-documents (empty
+placeholders are skipped) and synthetic agreements, and reports the peak
+traced allocation of each job. PDF pages parsed in pool worker processes
+are not traced; their text is once it reaches the workflow.
+
+Run from services/document-service:
+    python -m benchmarks.bench_state_memory [--pages 10,100,1000] [--jobs 3]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import tracemalloc
+import uuid
+from pathlib import Path
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default="10,100,1000", help="Synthetic document page counts")
+    parser.add_argument("--jobs", type=int, default=3, help="Jobs per document")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_GEMINI_LATENCY_MS"] = "0"
+    os.environ["TEXT_STORE_ENABLED"] = "false"
+    for name in ("GEMINI_FLASH_RPM", "GEMINI_FLASH_TPM", "GEMINI_PRO_RPM", "GEMINI_PRO_TPM"):
+        os.environ[name] = "0"
+
+    from .bench_pipeline import documents
+    from src.core.parsers.pdf_parser import shutdown_pdf_pool
+    from src.database import jobs
+    from src.database.connection import db_manager
+    from src.utils.events import event_bus
+    from src.utils.file_utils import hash_file
+    from src.workflows.helpers import read_document_pages
+    from src.workflows.langgraph_extraction import run_extraction_workflow
+    from src.workflows.registry import registry
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.db_path = Path(tmp) / "bench.db"
+        await jobs.init_db()
+        registry.warm()
+        event_bus.bind(asyncio.get_running_loop())
+        docs = documents([int(p) for p in args.pages.split(",") if p], Path(tmp))
+
+        tracemalloc.start()
+        print(f"{'document':<30}{'text MB':>9}{'peak MB':>9}{'peak/text':>11}")
+        for name, path in docs.items():
+            peaks = []
+            for _ in range(args.jobs):
+                job_id = str(uuid.uuid4())
+                await jobs.create_job(job_id, path.name, str(path), path.stat().st_size)
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                await run_extraction_workflow(job_id, str(path), hash_file(str(path)))
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+
+            text_mb = read_document_pages(str(path)).char_count / 1e6
+            peak_mb = statistics.median(peaks) / 1e6
+            print(f"{name:<30}{text_mb:>9.2f}{peak_mb:>9.2f}{peak_mb / text_mb if text_mb else 0:>10.1f}x")
+        tracemalloc.stop()
+
+        await jobs.close_db()
+        shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
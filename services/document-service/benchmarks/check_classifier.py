@@ -0,0 +1,89 @@
+"""Per-label accuracy and fast-path rate of the rule classifier against test fixtures
+
+Run from services/document-service:
+    python -m benchmarks.check_classifier [--fixtures path/to/extraction-input.json]
+
+Fixture entries need an expected ``document_type`` and either inline ``text``
+or a ``file`` name under data/sample-documents.
+"""
+import argparse
+import json
+import os
+from collections import Counter, defaultdict
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+os.environ.setdefault("TEXT_STORE_ENABLED", "false")
+
+from src.config import settings  # noqa: E402
+from src.core.extractors.rule_classifier import classify_by_rules, MIN_FAST_PATH_SCORE  # noqa: E402
+from src.workflows.helpers import read_document  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parents[3] / "data"
+DEFAULT_FIXTURES = DATA_DIR / "test-fixtures" / "extraction-input.json"
+
+
+def load_cases(path: Path) -> list:
+    """Fixture cases as (name, expected label, text)"""
+    raw = path.read_text(encoding="utf-8").strip()
+    if not raw:
+        return []
+    data = json.loads(raw)
+    entries = data.get("documents", []) if isinstance(data, dict) else data
+
+    cases = []
+    for i, entry in enumerate(entries):
+        expected = entry.get("document_type") or entry.get("expected_type")
+        if not expected:
+            continue
+        if entry.get("text"):
+            text = entry["text"]
+        elif entry.get("file"):
+            text = read_document(str(DATA_DIR / "sample-documents" / entry["file"]),
+                                 max_chars=settings.CLASSIFY_MAX_CHARS)
+        else:
+            continue
+        cases.append((entry.get("file") or entry.get("id") or f"case-{i}", expected, text))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES)
+    args = parser.parse_args()
+
+    cases = load_cases(args.fixtures)
+    if not cases:
+        print(f"No labelled cases in {args.fixtures}")
+        return
+
+    totals, correct, fast, fast_correct = Counter(), Counter(), Counter(), Counter()
+    confusion = defaultdict(Counter)
+    for name, expected, text in cases:
+        result = classify_by_rules(text[:settings.CLASSIFY_MAX_CHARS])
+        is_fast = (
+            result.score >= MIN_FAST_PATH_SCORE
+            and result.confidence >= settings.CLASSIFIER_FAST_PATH_CONFIDENCE
+        )
+        totals[expected] += 1
+        confusion[expected][result.label] += 1
+        correct[expected] += result.label == expected
+        if is_fast:
+            fast[expected] += 1
+            fast_correct[expected] += result.label == expected
+        if is_fast and result.label != expected:
+            print(f"fast-path error: {name} expected {expected}, got {result.label} ({result.confidence:.2f})")
+
+    print(f"{'label':<20}{'cases':>7}{'rule acc':>10}{'fast rate':>11}{'fast acc':>10}")
+    for label in sorted(totals):
+        print(
+            f"{label:<20}{totals[label]:>7}{correct[label] / totals[label]:>10.0%}"
+            f"{fast[label] / totals[label]:>11.0%}"
+            f"{(fast_correct[label] / fast[label]) if fast[label] else 0:>10.0%}"
+        )
+    print(f"fast-path rate: {sum(fast.values()) / len(cases):.0%} of {len(cases)} cases")
+    print("confusion:", {label: dict(row) for label, row in confusion.items()})
+
+
+if __name__ == "__main__":
+    main()
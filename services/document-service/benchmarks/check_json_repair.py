@@ -0,0 +1,103 @@
+"""Parse rate and recovered fields of the tolerant JSON parser on damaged model responses
+
+Damages each extraction prompt's JSON example the ways models do (code fences,
+surrounding prose, trailing commas, Python literals, output cut off at the
+token limit) and compares the old strict parser, where every failure meant
+another Pro call, with the repairing one.
+
+Run from services/document-service:
+    python -m benchmarks.check_json_repair
+"""
+import json
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+from src.workflows.helpers import EXTRACTION_PROMPTS, load_extraction_schema  # noqa: E402
+from src.workflows.response_parser import parse_json_response  # noqa: E402
+
+
+def strict_parse(text: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """The parser this replaced: strip fences, then json.loads"""
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return json.loads(text.strip())
+
+
+def tolerant_parse(text: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    return parse_json_response(text, schema).data
+
+
+def leaves(value: Any, path: str = "") -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return {k: v for key, item in value.items() for k, v in leaves(item, f"{path}.{key}").items()}
+    if isinstance(value, list):
+        return {k: v for i, item in enumerate(value) for k, v in leaves(item, f"{path}[{i}]").items()}
+    return {path: value}
+
+
+def variants(schema: Dict[str, Any]) -> Dict[str, str]:
+    pretty = json.dumps(schema, indent=2)
+    damaged = {
+        "clean": pretty,
+        "fenced": f"```json\n{pretty}\n```",
+        "prose": f"Here is the extracted data:\n{pretty}\nLet me know if you need anything else.",
+        "trailing comma": re.sub(r"(\S)\n(\s*[}\]])", r"\1,\n\2", pretty),
+        "python literals": json.dumps({**schema, "secured": True, "guarantor": None}, indent=2)
+        .replace("true", "True").replace("null", "None"),
+    }
+    for percent in (25, 50, 75, 90):
+        damaged[f"truncated {percent}%"] = pretty[:len(pretty) * percent // 100]
+    return damaged
+
+
+def run(parse: Callable, cases: List[tuple]) -> Dict[str, float]:
+    parsed = recovered = total_fields = 0
+    started = time.perf_counter()
+    for schema, text in cases:
+        expected = leaves(schema)
+        total_fields += len(expected)
+        try:
+            result = leaves(parse(text, schema))
+        except ValueError:
+            continue
+        parsed += 1
+        recovered += sum(1 for path, value in expected.items() if result.get(path) == value)
+    return {
+        "parsed": parsed / len(cases),
+        "fields": recovered / total_fields,
+        "us_per_parse": (time.perf_counter() - started) / len(cases) * 1e6,
+    }
+
+
+def main():
+    cases, by_kind = [], {}
+    for doc_type in EXTRACTION_PROMPTS:
+        schema = load_extraction_schema(doc_type)
+        for kind, text in variants(schema).items():
+            cases.append((schema, text))
+            by_kind.setdefault(kind, []).append((schema, text))
+
+    print(f"{'damage':<18}{'strict parsed':>15}{'tolerant parsed':>17}{'fields kept':>13}")
+    for kind, kind_cases in by_kind.items():
+        strict, tolerant = run(strict_parse, kind_cases), run(tolerant_parse, kind_cases)
+        print(f"{kind:<18}{strict['parsed']:>15.0%}{tolerant['parsed']:>17.0%}{tolerant['fields']:>13.0%}")
+
+    strict, tolerant = run(strict_parse, cases), run(tolerant_parse, cases)
+    print(f"\n{len(cases)} responses: strict parser {strict['parsed']:.0%} parsed "
+          f"({strict['us_per_parse']:.0f} us each), tolerant {tolerant['parsed']:.0%} parsed "
+          f"with {tolerant['fields']:.0%} of fields ({tolerant['us_per_parse']:.0f} us each)")
+    print(f"Responses that no longer fail the job (and cost a re-run): "
+          f"{round((tolerant['parsed'] - strict['parsed']) * len(cases))} of {len(cases)}")
+
+
+if __name__ == "__main__":
+    main()
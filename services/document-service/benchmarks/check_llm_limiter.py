@@ -0,0 +1,74 @@
+"""Gemini client limiter against the fake Gemini model with a server-side quota, fully offline
+
+Run from services/document-service:
+    python -m benchmarks.check_llm_limiter [--calls 200] [--threads 16] [--quota-rpm 1200]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+os.environ.setdefault("LLM_RETRY_BASE_SECONDS", "0.2")
+os.environ.setdefault("LLM_RETRY_MAX_SECONDS", "2")
+# The fake enforces its quota over one-second windows
+os.environ.setdefault("LLM_BURST_SECONDS", "1")
+
+from src.workflows.helpers import EXTRACTION_PROMPTS  # noqa: E402
+from src.workflows.fake_gemini import FakeGeminiChat  # noqa: E402
+from src.workflows.llm_client import ModelLimiter, RateLimitedLLM  # noqa: E402
+from src.workflows.registry import _build_chain  # noqa: E402
+
+DOCUMENT = "This Facility Agreement is dated 1 March 2024 between Acme Holdings plc as Borrower. " * 40
+
+
+def run(name: str, llm, calls: int, threads: int, limiter=None):
+    chain = _build_chain(EXTRACTION_PROMPTS["FACILITY_AGREEMENT"], "{document_text}", llm)
+
+    def call(_):
+        try:
+            chain.invoke({"document_text": DOCUMENT})
+            return None
+        except Exception as e:
+            return str(e)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        errors = [e for e in pool.map(call, range(calls)) if e]
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<26} ok {calls - len(errors):>4}/{calls}   failed {len(errors):>4}   "
+          f"{elapsed:>6.2f}s   {(calls - len(errors)) / elapsed:>6.1f} calls/s")
+    if limiter:
+        stats = limiter.snapshot()
+        print(f"{'':<26} retries {stats['retries']}, 429/5xx seen {stats['overloaded']}, "
+              f"max queued {stats['max_queued']}, concurrency limit {stats['concurrency_limit']} "
+              f"({stats['concurrency_decreases']} decreases), avg wait {stats['avg_wait_seconds']}s, "
+              f"tokens est/reported {stats['estimated_tokens']}/{stats['reported_tokens']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--quota-rpm", type=int, default=1200)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    def fake():
+        return FakeGeminiChat(model="fake-pro", latency_ms=args.latency_ms, requests_per_minute=args.quota_rpm)
+
+    print(f"fake Gemini quota {args.quota_rpm} requests/min, {args.calls} calls from {args.threads} threads\n")
+    run("no client limits", fake(), args.calls, args.threads)
+
+    # Some headroom under the quota, as production limits should have
+    matched = ModelLimiter("fake-pro", int(args.quota_rpm * 0.9), 0, max_concurrency=args.threads)
+    run("limits = 90% of quota", RateLimitedLLM(fake(), matched, max_retries=4), args.calls, args.threads, matched)
+
+    # Client configured well above the real quota: only AIMD and retries protect the calls
+    loose = ModelLimiter("fake-pro", args.quota_rpm * 10, 0, max_concurrency=args.threads)
+    run("limits = 10x quota", RateLimitedLLM(fake(), loose, max_retries=6), args.calls, args.threads, loose)
+
+
+if __name__ == "__main__":
+    main()
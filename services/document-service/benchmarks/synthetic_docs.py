@@ -0,0 +1,177 @@
+"""Deterministic synthetic loan documents (PDF and DOCX) of any page count for benchmarks"""
+import random
+import textwrap
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from docx import Document as DocxDocument
+
+LINES_PER_PAGE = 40
+LINE_CHARS = 90
+# A4 at 200 dpi, the pixel size of scanned pages
+SCAN_SIZE = (1654, 2339)
+
+FILLER = [
+    "Each Party acknowledges that the provisions of this Clause apply as set out in this Agreement.",
+    "The Agent shall promptly notify the Lenders of the details of any Utilisation Request received.",
+    "No Obligor shall create or permit to subsist any Security over any of its assets.",
+    "Any amount payable under the Finance Documents shall be paid without set-off or counterclaim.",
+    "The Borrower shall supply to the Agent in sufficient copies for all the Lenders its audited accounts.",
+    "Each Lender shall make its participation in each Loan available through its Facility Office.",
+]
+
+KEY_CLAUSES = [
+    ("THE FACILITY", "The Lenders make available a sterling term loan facility in an aggregate amount "
+                     "equal to the Total Commitments of GBP 250,000,000."),
+    ("INTEREST", "The rate of interest is the percentage rate per annum equal to the aggregate of the "
+                 "applicable Margin and SONIA. The Margin is 2.25 per cent. per annum."),
+    ("REPAYMENT", "The Borrower shall repay the Loan in full on the Termination Date, being 31 December 2029."),
+    ("FINANCIAL COVENANTS", "Leverage: Total Net Debt to EBITDA shall not exceed 3.50:1 in respect of any "
+                            "Relevant Period, tested quarterly on each Test Date."),
+]
+
+
+def agreement_pages(pages: int, seed: int = 7) -> List[str]:
+    """Facility-agreement text split into pages, key commercial clauses spread through the document"""
+    rng = random.Random(seed)
+    key_pages = {max(1, int(pages * fraction)): clause
+                 for fraction, clause in zip((0.3, 0.5, 0.7, 0.9), KEY_CLAUSES)}
+    result = []
+    clause = 1
+    for page in range(pages):
+        lines = []
+        if page == 0:
+            lines += [
+                "SENIOR FACILITIES AGREEMENT",
+                "dated 12 March 2024 between ACME HOLDINGS LIMITED as Borrower (incorporated in England",
+                "and Wales), the Original Lenders and GLOBAL BANK PLC as Agent",
+            ]
+        if page in key_pages:
+            heading, body = key_pages[page]
+            lines.append(f"{clause}. {heading}")
+            lines += textwrap.wrap(body, LINE_CHARS)
+            clause += 1
+        while len(lines) < LINES_PER_PAGE:
+            if rng.random() < 0.1:
+                lines.append(f"{clause}. DEFINITIONS AND INTERPRETATION PART {clause}")
+                clause += 1
+            lines += textwrap.wrap(" ".join(rng.choice(FILLER) for _ in range(3)), LINE_CHARS)
+        result.append("\n".join(lines[:LINES_PER_PAGE]))
+    return result
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_stream(text: str) -> bytes:
+    body = "\n".join(f"({_pdf_escape(line)}) Tj T*" for line in text.split("\n"))
+    return f"BT /F1 10 Tf 13 TL 50 770 Td\n{body}\nET".encode("latin-1", "replace")
+
+
+def _write_objects(path: Path, objects: Dict[int, bytes]):
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(out)
+        out += f"{object_id} 0 obj\n".encode() + objects[object_id] + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for object_id in sorted(objects):
+        out += f"{offsets[object_id]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def _stream(stream: bytes, entries: str = "") -> bytes:
+    return f"<< {entries}/Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+
+
+def write_pdf(path: Path, pages: List[str], scanned: Optional[Dict[int, bytes]] = None):
+    """Write a minimal text PDF (Helvetica, one content stream per page).
+
+    Pages in ``scanned`` (index to 8-bit grayscale pixels of SCAN_SIZE, see
+    ``render_scan``) are written as an image with no text layer instead.
+    """
+    scanned = scanned or {}
+    page_count = len(pages)
+    font_id = 3
+    # Objects: 1 catalog, 2 page tree, 3 font, (page, content) pairs, then the scanned page images
+    page_ids = [4 + 2 * i for i in range(page_count)]
+    image_ids = {index: 4 + 2 * page_count + i for i, index in enumerate(sorted(scanned))}
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Count {page_count} /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] >>".encode(),
+        font_id: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    for index, (page_id, text) in enumerate(zip(page_ids, pages)):
+        if index in scanned:
+            width, height = SCAN_SIZE
+            resources = f"/XObject << /Im0 {image_ids[index]} 0 R >>"
+            stream = b"q 612 0 0 842 0 0 cm /Im0 Do Q"
+            objects[image_ids[index]] = _stream(
+                zlib.compress(scanned[index]),
+                f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode "
+            )
+        else:
+            resources = f"/Font << /F1 {font_id} 0 R >>"
+            stream = _text_stream(text)
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << {resources} >> /Contents {page_id + 1} 0 R >>"
+        ).encode()
+        objects[page_id + 1] = _stream(stream)
+    _write_objects(path, objects)
+
+
+def render_scan(text: str) -> bytes:
+    """Grayscale pixels of a page of text as a 200 dpi scan would show it (needs Pillow)"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 26)
+    except OSError:
+        font = ImageFont.load_default()
+    image = Image.new("L", SCAN_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(text.split("\n")):
+        draw.text((140, 140 + i * 36), line, fill=0, font=font)
+    return image.tobytes()
+
+
+MARGIN_RATCHET = [
+    ("Leverage", "Margin (% p.a.)", "Commitment fee"),
+    ("Greater than 3.50:1", "2.75", "35% of Margin"),
+    ("3.00:1 to 3.50:1", "2.50", "35% of Margin"),
+    ("2.50:1 to 3.00:1", "2.25", "35% of Margin"),
+    ("Less than 2.50:1", "2.00", "35% of Margin"),
+]
+
+
+def write_docx(path: Path, pages: List[str], table_every: int = 0):
+    """Write the pages as DOCX paragraphs, numbered clause lines as headings.
+
+    With ``table_every``, every that many pages end with a margin ratchet table.
+    """
+    document = DocxDocument()
+    for page, text in enumerate(pages, start=1):
+        paragraph = []
+        for line in text.split("\n"):
+            heading = line[:1].isdigit() and line.split(". ", 1)[-1].isupper()
+            if heading or line.isupper():
+                if paragraph:
+                    document.add_paragraph(" ".join(paragraph))
+                    paragraph = []
+                document.add_heading(line, level=1)
+            else:
+                paragraph.append(line)
+        if paragraph:
+            document.add_paragraph(" ".join(paragraph))
+        if table_every and page % table_every == 0:
+            table = document.add_table(rows=len(MARGIN_RATCHET), cols=len(MARGIN_RATCHET[0]))
+            for row, values in zip(table.rows, MARGIN_RATCHET):
+                for cell, value in zip(row.cells, values):
+                    cell.text = value
+    document.save(path)
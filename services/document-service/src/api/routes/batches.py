@@ -0,0 +1,207 @@
+"""Batch upload API routes for whole data rooms"""
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from pathlib import Path
+import asyncio
+import uuid
+import zipfile
+from typing import Dict, Any, List, Optional
+
+from ...database.jobs import create_batch, get_batch, list_jobs, get_cached_extraction
+from ...workflows.helpers import PROMPT_VERSION
+from ...workflows.scheduler import scheduler
+from ...utils.file_utils import (
+    stream_upload_to_disk, iter_archive_documents, UploadTooLargeError, FileTypeMismatchError
+)
+from ...config import settings
+
+router = APIRouter(prefix="/api/v1/batches", tags=["batches"])
+
+UPLOAD_DIR = Path(settings.UPLOAD_DIR)
+UPLOAD_DIR.mkdir(exist_ok=True)
+
+def _new_upload_path(extension: str) -> Path:
+    """Upload path named by a fresh job id"""
+    return UPLOAD_DIR / f"{uuid.uuid4()}{extension}"
+
+def _job_entry(filename: str, stored) -> Dict[str, Any]:
+    return {
+        "job_id": stored.path.stem,
+        "filename": filename,
+        "file_path": str(stored.path),
+        "file_size": stored.size,
+        "content_hash": stored.content_hash
+    }
+
+async def _store_archive(upload: UploadFile, accepted: list, rejected: list):
+    """Save a zip upload and extract its documents as batch jobs"""
+    archive_path = UPLOAD_DIR / f"{uuid.uuid4()}.zip"
+    try:
+        await stream_upload_to_disk(
+            upload,
+            destination=archive_path,
+            max_bytes=settings.MAX_BATCH_ARCHIVE_MB * 1024 * 1024,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE_KB * 1024
+        )
+        if not zipfile.is_zipfile(archive_path):
+            rejected.append({"filename": upload.filename, "reason": "Not a valid zip archive"})
+            return
+
+        members = await asyncio.to_thread(lambda: list(iter_archive_documents(
+            archive_path,
+            allowed_extensions=settings.ALLOWED_EXTENSIONS,
+            max_members=settings.MAX_BATCH_FILES,
+            max_member_bytes=settings.MAX_FILE_SIZE_MB * 1024 * 1024,
+            destination_for=_new_upload_path,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE_KB * 1024
+        )))
+        for name, stored, reason in members:
+            if stored:
+                accepted.append(_job_entry(name, stored))
+            else:
+                rejected.append({"filename": f"{upload.filename}/{name}", "reason": reason})
+    except UploadTooLargeError:
+        rejected.append({
+            "filename": upload.filename,
+            "reason": f"Archive too large. Maximum size: {settings.MAX_BATCH_ARCHIVE_MB}MB"
+        })
+    except (FileTypeMismatchError, zipfile.BadZipFile) as e:
+        rejected.append({"filename": upload.filename, "reason": str(e)})
+    finally:
+        archive_path.unlink(missing_ok=True)
+
+async def _store_document(upload: UploadFile, extension: str, accepted: list, rejected: list):
+    """Save one document upload as a batch job"""
+    try:
+        stored = await stream_upload_to_disk(
+            upload,
+            destination=_new_upload_path(extension),
+            max_bytes=settings.MAX_FILE_SIZE_MB * 1024 * 1024,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE_KB * 1024,
+            expected_type=extension
+        )
+    except UploadTooLargeError:
+        rejected.append({
+            "filename": upload.filename,
+            "reason": f"File too large. Maximum size: {settings.MAX_FILE_SIZE_MB}MB"
+        })
+        return
+    except FileTypeMismatchError as e:
+        rejected.append({"filename": upload.filename, "reason": str(e)})
+        return
+    accepted.append(_job_entry(upload.filename, stored))
+
+def _discard(jobs: List[Dict[str, Any]]):
+    for job in jobs:
+        Path(job["file_path"]).unlink(missing_ok=True)
+
+@router.post("")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    trace: bool = Query(False, description="Store a per-stage trace of each extraction with its job")
+) -> Dict[str, Any]:
+    """
+    Upload many loan documents, or zip archives of them, as one batch.
+
+    All jobs are created in one transaction and scheduled fairly against
+    other batches. Unsupported or invalid files are skipped and listed
+    under "rejected".
+    Returns: batch_id for tracking
+    """
+    accepted: List[Dict[str, Any]] = []
+    rejected: List[Dict[str, str]] = []
+
+    for upload in files:
+        extension = Path(upload.filename or "").suffix.lower()
+        if extension == ".zip":
+            await _store_archive(upload, accepted, rejected)
+        elif extension in settings.ALLOWED_EXTENSIONS:
+            await _store_document(upload, extension, accepted, rejected)
+        else:
+            rejected.append({
+                "filename": upload.filename,
+                "reason": f"Invalid file type. Allowed: {settings.ALLOWED_EXTENSIONS} or .zip"
+            })
+
+        if len(accepted) > settings.MAX_BATCH_FILES:
+            _discard(accepted)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many documents. Maximum per batch: {settings.MAX_BATCH_FILES}"
+            )
+
+    if not accepted:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "No valid documents in batch", "rejected": rejected}
+        )
+
+    # Identical content already extracted with the current prompts: skip the LLM
+    to_queue = []
+    for job in accepted:
+        job["trace"] = trace
+        cached = None
+        if settings.EXTRACTION_CACHE_ENABLED:
+            cached = await get_cached_extraction(job["content_hash"], PROMPT_VERSION)
+        if cached:
+            job.update({
+                "status": "completed",
+                "result": cached["normalized_data"],
+                "confidence": cached["confidence"],
+                "document_type": cached["normalized_data"].get("document_type")
+            })
+        else:
+            to_queue.append(job)
+
+    if len(to_queue) > await scheduler.free_slots():
+        _discard(accepted)
+        raise HTTPException(
+            status_code=503,
+            detail="Extraction queue cannot hold this batch. Please retry later."
+        )
+
+    batch_id = str(uuid.uuid4())
+    await create_batch(batch_id, source="upload", jobs=accepted)
+    await scheduler.submit_batch(batch_id, to_queue)
+
+    return {
+        "batch_id": batch_id,
+        "job_count": len(accepted),
+        "queued": len(to_queue),
+        "cached": len(accepted) - len(to_queue),
+        "rejected": rejected,
+        "jobs": [
+            {"job_id": job["job_id"], "filename": job["filename"], "status": job.get("status", "processing")}
+            for job in accepted
+        ],
+        "message": "Batch uploaded successfully. Processing started."
+    }
+
+@router.get("/{batch_id}")
+async def get_batch_status(batch_id: str) -> Dict[str, Any]:
+    """Aggregate progress and throughput of a batch"""
+    batch = await get_batch(batch_id)
+
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return batch
+
+@router.get("/{batch_id}/jobs")
+async def list_batch_jobs(
+    batch_id: str,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None
+) -> Dict[str, Any]:
+    """List the jobs of a batch; pass next_cursor back as cursor for the next page"""
+    try:
+        page = await list_jobs(limit=limit, cursor=cursor, batch_id=batch_id, status=status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "batch_id": batch_id,
+        "limit": limit,
+        "next_cursor": page["next_cursor"],
+        "jobs": page["jobs"]
+    }
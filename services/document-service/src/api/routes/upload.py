@@ -1,12 +1,24 @@
 """Document upload and extraction API routes"""
-from fastapi import APIRouter, UploadFile, File, BackgroundTasks, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pathlib import Path
+import hashlib
+import json
 import uuid
-import aiofiles
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 
-from ...database.jobs import create_job, get_job, update_job_status, list_jobs
-from ...workflows.langgraph_extraction import run_extraction_workflow
+from ...database.jobs import (
+    create_job, get_job, get_job_summary, get_job_trace, update_job_status, list_jobs, count_jobs,
+    get_cached_extraction
+)
+from ...database.results import get_job_result, get_job_result_etag
+from ...utils.events import event_bus, JobEvent
+from ...workflows.helpers import PROMPT_VERSION
+from ...workflows.scheduler import scheduler, QueueFullError
+from ...utils.file_utils import (
+    stream_upload_to_disk, UploadTooLargeError, FileTypeMismatchError
+)
 from ...config import settings
 
 router = APIRouter(prefix="/api/v1/documents", tags=["documents"])
@@ -18,7 +30,7 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 @router.post("/upload")
 async def upload_document(
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    trace: bool = Query(False, description="Store a per-stage trace of the extraction with the job")
 ) -> Dict[str, Any]:
     """
     Upload a loan document for extraction.
@@ -35,25 +47,30 @@ async def upload_document(
             detail=f"Invalid file type. Allowed: {settings.ALLOWED_EXTENSIONS}"
         )
 
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
+    # Generate unique job ID
+    job_id = str(uuid.uuid4())
 
-    # Check file size (convert MB to bytes)
+    # Stream file to disk, enforcing the size limit and hashing in one pass
+    file_path = UPLOAD_DIR / f"{job_id}{file_ext}"
     max_size_bytes = settings.MAX_FILE_SIZE_MB * 1024 * 1024
-    if file_size > max_size_bytes:
+    try:
+        stored = await stream_upload_to_disk(
+            file,
+            destination=file_path,
+            max_bytes=max_size_bytes,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE_KB * 1024,
+            expected_type=file_ext
+        )
+    except UploadTooLargeError:
         raise HTTPException(
             status_code=400,
             detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE_MB}MB"
         )
+    except FileTypeMismatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Generate unique job ID
-    job_id = str(uuid.uuid4())
-
-    # Save file
-    file_path = UPLOAD_DIR / f"{job_id}{file_ext}"
-    async with aiofiles.open(file_path, "wb") as f:
-        await f.write(content)
+    file_size = stored.size
+    content_hash = stored.content_hash
 
     # Create job record
     await create_job(
@@ -61,55 +78,286 @@ async def upload_document(
         filename=file.filename,
         file_path=str(file_path),
         file_size=file_size,
-        status="pending"
+        status="pending",
+        content_hash=content_hash,
+        trace=trace
     )
 
-    # Trigger background extraction
-    background_tasks.add_task(
-        run_extraction_workflow,
-        job_id=job_id,
-        file_path=str(file_path)
-    )
+    # Identical content already extracted with the current prompts: skip the LLM
+    cached = None
+    if settings.EXTRACTION_CACHE_ENABLED:
+        cached = await get_cached_extraction(content_hash, PROMPT_VERSION)
+    if cached:
+        await update_job_status(
+            job_id=job_id,
+            status="completed",
+            progress=100,
+            result=cached["normalized_data"],
+            confidence=cached["confidence"],
+            document_type=cached["normalized_data"].get("document_type")
+        )
+        return {
+            "job_id": job_id,
+            "filename": file.filename,
+            "status": "completed",
+            "cached": True,
+            "message": "Document matched a previous extraction. Results are ready."
+        }
+
+    # Queue extraction on the durable job queue
+    try:
+        queue_position = await scheduler.submit(
+            job_id=job_id,
+            file_path=str(file_path),
+            content_hash=content_hash
+        )
+    except QueueFullError as e:
+        await update_job_status(job_id, status="failed", error=str(e))
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=503,
+            detail="Extraction queue is full. Please retry later."
+        )
 
     return {
         "job_id": job_id,
         "filename": file.filename,
         "status": "processing",
+        "queue_position": queue_position,
         "message": "Document uploaded successfully. Extraction started."
     }
 
+def _not_modified(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+def _etag_headers(etag: str) -> Dict[str, str]:
+    # Clients may keep the body but must revalidate it
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
 @router.get("/{job_id}/status")
-async def get_job_status(job_id: str) -> Dict[str, Any]:
-    """Get extraction job status and results"""
+async def get_job_status(job_id: str, request: Request) -> Response:
+    """Get extraction job status and results (conditional with If-None-Match)"""
     job = await get_job(job_id)
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return {
+    # The version is built from the small columns and the result's stored
+    # ETag, so an unchanged completed job is answered without reading the blob
+    result_etag = await get_job_result_etag(job_id) if job["status"] == "completed" else None
+    version = json.dumps(
+        [job["status"], job["progress"], job["updated_at"], job["partial_result"], job["error"],
+         job["confidence"], result_etag],
+        sort_keys=True, default=str
+    )
+    etag = f'"{hashlib.sha256(version.encode()).hexdigest()[:32]}"'
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+    stored = await get_job_result(job_id) if result_etag else None
+
+    return JSONResponse({
         "job_id": job_id,
         "filename": job["filename"],
         "status": job["status"],
         "progress": job["progress"],
-        "result": job["result"] if job["status"] == "completed" else None,
+        "result": stored["result"] if stored else None,
+        # Fields extracted so far, while the extraction is still running
+        "partial_result": job["partial_result"] if job["status"] == "processing" else None,
         "error": job["error"] if job["status"] == "failed" else None,
         "confidence": job["confidence"],
         "created_at": job["created_at"],
         "updated_at": job["updated_at"]
-    }
+    }, headers=_etag_headers(etag))
+
+def _project(result: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Keep only the requested extraction fields and their provenance (dotted paths reach into objects)"""
+    extraction = result.get("extraction") or {}
+    projected: Dict[str, Any] = {}
+    for path in fields:
+        keys = path.split(".")
+        value = extraction
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = projected
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+
+    narrowed = {**result, "extraction": projected}
+    if "provenance" in result:
+        narrowed["provenance"] = {
+            path: chunk for path, chunk in result["provenance"].items()
+            if any(path == field or path.startswith((f"{field}.", f"{field}[")) for field in fields)
+        }
+    return narrowed
+
+@router.get("/{job_id}/result")
+async def get_job_result_route(
+    job_id: str,
+    request: Request,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated extraction fields to return, e.g. facility,covenants or facility.amount"
+    )
+) -> Response:
+    """A completed job's normalized result, optionally projected to some fields (conditional with If-None-Match)"""
+    job = await get_job_summary(job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job has no result yet (status: {job['status']})")
+
+    stored_etag = await get_job_result_etag(job_id)
+    if stored_etag is None:
+        raise HTTPException(status_code=404, detail="No result stored for this job")
+
+    selected = sorted({field.strip() for field in fields.split(",") if field.strip()}) if fields else []
+    etag = stored_etag
+    if selected:
+        etag += "-" + hashlib.sha256(",".join(selected).encode()).hexdigest()[:8]
+    etag = f'"{etag}"'
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+
+    stored = await get_job_result(job_id)
+    result = stored["result"] if stored else {}
+    return JSONResponse(_project(result, selected) if selected else result, headers=_etag_headers(etag))
+
+@router.get("/{job_id}/trace")
+async def get_job_trace_route(job_id: str) -> Dict[str, Any]:
+    """Per-stage timings, tokens, retries and cache hits of the job's latest attempt"""
+    trace = await get_job_trace(job_id)
+
+    if not trace:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if trace["trace"] is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No trace recorded for this job. Upload with ?trace=true or set JOB_TRACE_ENABLED."
+        )
+
+    return trace
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request) -> StreamingResponse:
+    """
+    Server-Sent Events stream of a job's progress.
+
+    Sends the current state first, then one event per status change,
+    finished workflow stage or newly extracted field ("partial"), and
+    closes after a terminal status.
+    """
+    # Subscribe before reading the snapshot so no event falls in between
+    subscription = event_bus.subscribe(job_id)
+    job = await get_job_summary(job_id)
+    if not job:
+        event_bus.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    snapshot = _summary_event(job)
+
+    # Jobs run by separate worker processes publish on their own event bus,
+    # so without in-process workers the stream also polls the job row
+    poll_seconds = None if settings.RUN_WORKERS_IN_API else settings.QUEUE_POLL_SECONDS
+
+    async def stream():
+        try:
+            yield _sse(snapshot)
+            if snapshot.terminal:
+                return
+            last_seen = (snapshot.status, snapshot.progress)
+            idle = 0.0
+            while not await request.is_disconnected():
+                timeout = poll_seconds or settings.EVENT_KEEPALIVE_SECONDS
+                event = await subscription.get(timeout=timeout)
+                if event is None and poll_seconds:
+                    current = await get_job_summary(job_id)
+                    if current and (current["status"], current["progress"]) != last_seen:
+                        event = _summary_event(current)
+                if event is None:
+                    idle += timeout
+                    if idle >= settings.EVENT_KEEPALIVE_SECONDS:
+                        # Comment line keeps proxies from closing an idle stream
+                        yield ": keepalive\n\n"
+                        idle = 0.0
+                    continue
+                idle = 0.0
+                last_seen = (event.status, event.progress)
+                yield _sse(event)
+                if event.terminal:
+                    return
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _summary_event(job: Dict[str, Any]) -> JobEvent:
+    """Status event from a job summary row"""
+    return JobEvent(
+        job_id=job["job_id"],
+        type="status",
+        status=job["status"],
+        progress=job["progress"] or 0,
+        data={key: job[key] for key in ("confidence", "document_type", "error") if job[key] is not None}
+    )
+
+def _sse(event: JobEvent) -> str:
+    """Format an event as an SSE message"""
+    return f"event: {event.type}\ndata: {json.dumps(event.to_dict())}\n\n"
 
 @router.get("/")
-async def list_all_jobs(limit: int = 100, offset: int = 0) -> Dict[str, Any]:
-    """List all extraction jobs with pagination"""
-    jobs = await list_jobs(limit=limit, offset=offset)
+async def list_all_jobs(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    document_type: Optional[str] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """List extraction jobs newest first; pass next_cursor back as cursor for the next page"""
+    filters = {
+        "status": status,
+        "document_type": document_type,
+        "min_confidence": min_confidence,
+        "max_confidence": max_confidence,
+        "created_after": _sqlite_timestamp(created_after),
+        "created_before": _sqlite_timestamp(created_before)
+    }
+
+    try:
+        page = await list_jobs(limit=limit, cursor=cursor, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
-        "total": len(jobs),
+        "total": await count_jobs(**filters),
         "limit": limit,
-        "offset": offset,
-        "jobs": jobs
+        "next_cursor": page["next_cursor"],
+        "jobs": page["jobs"]
     }
 
+def _sqlite_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Format a query datetime like SQLite's CURRENT_TIMESTAMP (UTC, second resolution)"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
 @router.delete("/{job_id}")
 async def delete_job(job_id: str) -> Dict[str, str]:
     """Delete a job and its uploaded file"""
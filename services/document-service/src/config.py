@@ -1,5 +1,6 @@
 """Configuration settings for Document Service"""
 import os
+from pathlib import Path
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -18,18 +19,109 @@ class Settings:
     GEMINI_FLASH_MODEL: str = os.getenv("GEMINI_FLASH_MODEL", "gemini-2.0-flash-exp")
     GEMINI_PRO_MODEL: str = os.getenv("GEMINI_PRO_MODEL", "gemini-1.5-pro")
 
+    # Gemini client limits, shared per model within a process ("fake" answers locally, for offline runs)
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "gemini")
+    GEMINI_FLASH_RPM: int = int(os.getenv("GEMINI_FLASH_RPM", "1000"))
+    GEMINI_FLASH_TPM: int = int(os.getenv("GEMINI_FLASH_TPM", "1000000"))
+    GEMINI_PRO_RPM: int = int(os.getenv("GEMINI_PRO_RPM", "150"))
+    GEMINI_PRO_TPM: int = int(os.getenv("GEMINI_PRO_TPM", "2000000"))
+    # USD per million tokens, for the cost metrics
+    GEMINI_FLASH_INPUT_COST_PER_MTOK: float = float(os.getenv("GEMINI_FLASH_INPUT_COST_PER_MTOK", "0.10"))
+    GEMINI_FLASH_OUTPUT_COST_PER_MTOK: float = float(os.getenv("GEMINI_FLASH_OUTPUT_COST_PER_MTOK", "0.40"))
+    GEMINI_PRO_INPUT_COST_PER_MTOK: float = float(os.getenv("GEMINI_PRO_INPUT_COST_PER_MTOK", "1.25"))
+    GEMINI_PRO_OUTPUT_COST_PER_MTOK: float = float(os.getenv("GEMINI_PRO_OUTPUT_COST_PER_MTOK", "5.00"))
+    LLM_BURST_SECONDS: float = float(os.getenv("LLM_BURST_SECONDS", "5"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_OUTPUT_TOKEN_ESTIMATE: int = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "1024"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_RETRY_BASE_SECONDS: float = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1.0"))
+    LLM_RETRY_MAX_SECONDS: float = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+    # Ask Gemini for application/json extraction output when the installed SDK supports it
+    GEMINI_JSON_MODE: bool = os.getenv("GEMINI_JSON_MODE", "true").lower() == "true"
+    FAKE_GEMINI_LATENCY_MS: int = int(os.getenv("FAKE_GEMINI_LATENCY_MS", "50"))
+    FAKE_GEMINI_ERROR_RATE: float = float(os.getenv("FAKE_GEMINI_ERROR_RATE", "0"))
+    FAKE_GEMINI_RPM: int = int(os.getenv("FAKE_GEMINI_RPM", "0"))
+
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./lma_synapse.db")
+    DB_READER_POOL_SIZE: int = int(os.getenv("DB_READER_POOL_SIZE", "4"))
+    DB_PROGRESS_FLUSH_MS: int = int(os.getenv("DB_PROGRESS_FLUSH_MS", "250"))
 
     # Upload Configuration
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
     ALLOWED_EXTENSIONS: list = [".pdf", ".docx"]
     UPLOAD_DIR: str = "./uploads"
+    UPLOAD_CHUNK_SIZE_KB: int = int(os.getenv("UPLOAD_CHUNK_SIZE_KB", "1024"))
 
     # Processing
     ENABLE_LAYOUTLMV3: bool = os.getenv("ENABLE_LAYOUTLMV3", "false").lower() == "true"
+    # Jobs a batch may have scheduled per fair-share round
     BATCH_SIZE: int = int(os.getenv("BATCH_SIZE", "1"))
+    MAX_BATCH_FILES: int = int(os.getenv("MAX_BATCH_FILES", "500"))
+    MAX_BATCH_ARCHIVE_MB: int = int(os.getenv("MAX_BATCH_ARCHIVE_MB", "1024"))
     MAX_CONCURRENT_JOBS: int = int(os.getenv("MAX_CONCURRENT_JOBS", "3"))
+    MAX_QUEUED_JOBS: int = int(os.getenv("MAX_QUEUED_JOBS", "1000"))
+    EVENT_SUBSCRIBER_QUEUE_SIZE: int = int(os.getenv("EVENT_SUBSCRIBER_QUEUE_SIZE", "64"))
+    EVENT_KEEPALIVE_SECONDS: int = int(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+    CLASSIFY_MAX_CHARS: int = int(os.getenv("CLASSIFY_MAX_CHARS", "2000"))
+    CLASSIFIER_FAST_PATH_ENABLED: bool = os.getenv("CLASSIFIER_FAST_PATH_ENABLED", "true").lower() == "true"
+    CLASSIFIER_FAST_PATH_CONFIDENCE: float = float(os.getenv("CLASSIFIER_FAST_PATH_CONFIDENCE", "0.8"))
+    # Flash classifications from concurrent jobs are sent together: a batch goes when it holds
+    # CLASSIFY_BATCH_MAX_SIZE documents or CLASSIFY_BATCH_WINDOW_MS after its first (either at 0/1 disables)
+    CLASSIFY_BATCH_WINDOW_MS: float = float(os.getenv("CLASSIFY_BATCH_WINDOW_MS", "50"))
+    CLASSIFY_BATCH_MAX_SIZE: int = int(os.getenv("CLASSIFY_BATCH_MAX_SIZE", "16"))
+    EXTRACTION_MAX_CHARS: int = int(os.getenv("EXTRACTION_MAX_CHARS", "30000"))
+    # Stream the Pro response and store each top-level field with the job as soon as it is complete
+    EXTRACTION_STREAMING: bool = os.getenv("EXTRACTION_STREAMING", "true").lower() == "true"
+
+    # Long documents: "chunked" map-reduces over the whole text, "sections" sends the
+    # best-ranked clauses within EXTRACTION_MAX_CHARS, "truncate" keeps the first EXTRACTION_MAX_CHARS
+    EXTRACTION_MODE: str = os.getenv("EXTRACTION_MODE", "chunked")
+    EXTRACTION_CHUNK_OVERLAP_CHARS: int = int(os.getenv("EXTRACTION_CHUNK_OVERLAP_CHARS", "2000"))
+    EXTRACTION_CHUNK_CONCURRENCY: int = int(os.getenv("EXTRACTION_CHUNK_CONCURRENCY", "4"))
+    EXTRACTION_MAX_CHUNKS: int = int(os.getenv("EXTRACTION_MAX_CHUNKS", "40"))
+
+    # LMA ontology that extractions are normalized against
+    ONTOLOGY_PATH: str = os.getenv(
+        "ONTOLOGY_PATH", str(Path(__file__).resolve().parents[3] / "data" / "ontology" / "lma-mini-v1.json")
+    )
+
+    # Parsed text store
+    TEXT_STORE_ENABLED: bool = os.getenv("TEXT_STORE_ENABLED", "true").lower() == "true"
+    TEXT_STORE_MAX_ENTRIES: int = int(os.getenv("TEXT_STORE_MAX_ENTRIES", "5000"))
+    TEXT_STORE_MAX_AGE_DAYS: int = int(os.getenv("TEXT_STORE_MAX_AGE_DAYS", "30"))
+
+    # PDF parsing (0 workers = one per CPU)
+    PDF_PARSE_WORKERS: int = int(os.getenv("PDF_PARSE_WORKERS", "0"))
+    PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+    # OCR of PDF pages without a usable text layer (needs tesseract, poppler, pytesseract and pdf2image)
+    OCR_ENABLED: bool = os.getenv("OCR_ENABLED", "true").lower() == "true"
+    OCR_WORKERS: int = int(os.getenv("OCR_WORKERS", "0"))  # 0 = one per CPU
+    OCR_DPI: int = int(os.getenv("OCR_DPI", "300"))
+    OCR_LANG: str = os.getenv("OCR_LANG", "eng")
+    OCR_MIN_TEXT_CHARS: int = int(os.getenv("OCR_MIN_TEXT_CHARS", "20"))
+    OCR_PAGE_TIMEOUT_SECONDS: int = int(os.getenv("OCR_PAGE_TIMEOUT_SECONDS", "120"))
+    OCR_CACHE_MAX_PAGES: int = int(os.getenv("OCR_CACHE_MAX_PAGES", "100000"))
+    OCR_CACHE_MAX_AGE_DAYS: int = int(os.getenv("OCR_CACHE_MAX_AGE_DAYS", "90"))
+
+    # Durable job queue (run workers in the API process, or separately via python -m src.worker)
+    RUN_WORKERS_IN_API: bool = os.getenv("RUN_WORKERS_IN_API", "true").lower() == "true"
+    QUEUE_POLL_SECONDS: float = float(os.getenv("QUEUE_POLL_SECONDS", "1.0"))
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+    JOB_HEARTBEAT_SECONDS: int = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BASE_SECONDS: float = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+    JOB_RETRY_MAX_SECONDS: float = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+
+    # Store a per-stage trace with every job (otherwise only for uploads with ?trace=true)
+    JOB_TRACE_ENABLED: bool = os.getenv("JOB_TRACE_ENABLED", "false").lower() == "true"
+
+    # Extraction cache
+    EXTRACTION_CACHE_ENABLED: bool = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_MAX_ENTRIES: int = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "10000"))
+    EXTRACTION_CACHE_MAX_AGE_DAYS: int = int(os.getenv("EXTRACTION_CACHE_MAX_AGE_DAYS", "30"))
 
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
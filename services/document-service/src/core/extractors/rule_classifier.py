@@ -0,0 +1,119 @@
+"""Keyword/regex document classifier used as a fast path before the Flash model"""
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Pattern, Tuple
+
+DOCUMENT_TYPES = ["FACILITY_AGREEMENT", "AMENDMENT", "TERM_SHEET", "COMMITMENT_LETTER", "OTHER"]
+
+# (pattern, weight) per label; matches inside the title count TITLE_WEIGHT times
+LABEL_RULES: Dict[str, List[Tuple[Pattern, float]]] = {
+    "FACILITY_AGREEMENT": [
+        (re.compile(r"\bfacilit(y|ies) agreement\b"), 4.0),
+        (re.compile(r"\b(term|revolving) (loan|credit) facilit(y|ies) agreement\b"), 2.0),
+        (re.compile(r"\bmulticurrency\b"), 1.0),
+        (re.compile(r"\bthe (original )?lenders\b"), 1.0),
+        (re.compile(r"\bdefinitions and interpretation\b"), 1.0),
+    ],
+    "AMENDMENT": [
+        (re.compile(r"\bamendment and restatement agreement\b"), 6.0),
+        (re.compile(r"\b(amendment|supplemental) (agreement|letter)\b"), 5.0),
+        (re.compile(r"\bamended and restated\b"), 2.0),
+        (re.compile(r"\bthe original (facility )?agreement\b"), 2.0),
+        (re.compile(r"\b(effective|amendment) date\b"), 1.0),
+    ],
+    "TERM_SHEET": [
+        (re.compile(r"\bterm ?sheet\b"), 6.0),
+        (re.compile(r"\bsummary of (the )?(principal|key|indicative) terms\b"), 4.0),
+        (re.compile(r"\bindicative terms\b"), 2.0),
+        (re.compile(r"\bsubject to contract\b"), 1.0),
+    ],
+    "COMMITMENT_LETTER": [
+        (re.compile(r"\bcommitment letter\b"), 6.0),
+        (re.compile(r"\bmandate letter\b"), 4.0),
+        (re.compile(r"\bwe are pleased to (confirm|offer)\b"), 2.0),
+        (re.compile(r"\bcommitment (will|shall) (expire|terminate)\b"), 1.0),
+    ],
+    "OTHER": [
+        (re.compile(r"\b(compliance|transfer|assignment) certificate\b"), 5.0),
+        (re.compile(r"\b(consent|waiver|utilisation|fee) (letter|request)\b"), 5.0),
+        (re.compile(r"\bselection notice\b"), 5.0),
+    ],
+}
+
+# The title is the leading text up to the first "dated"/"between"/"relating to",
+# so a consent letter "in relation to the Facility Agreement" is not titled as one
+TITLE_CHARS = 200
+TITLE_END = re.compile(r"\b(dated|between|made on|relating to|in relation to|in respect of)\b")
+TITLE_WEIGHT = 3
+
+# Minimum winning score before the fast path may decide without the LLM
+MIN_FAST_PATH_SCORE = 5.0
+
+
+@dataclass
+class RuleClassification:
+    """Label chosen by the rule classifier with a margin-based confidence"""
+    label: str
+    confidence: float
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def score(self) -> float:
+        return self.scores.get(self.label, 0.0)
+
+
+def classify_by_rules(text: str) -> RuleClassification:
+    """Score each label by weighted pattern hits; confidence is the winner's share of the top two scores"""
+    lowered = " ".join(text.lower().split())
+    title = lowered[:TITLE_CHARS]
+    title_end = TITLE_END.search(title)
+    if title_end:
+        title = title[:title_end.start()]
+
+    scores = {}
+    for label, rules in LABEL_RULES.items():
+        score = 0.0
+        for pattern, weight in rules:
+            if pattern.search(title):
+                score += TITLE_WEIGHT * weight
+            elif pattern.search(lowered):
+                score += weight
+        scores[label] = score
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], DOCUMENT_TYPES.index(item[0])))
+    (label, best), (_, second) = ranked[0], ranked[1]
+    if best == 0:
+        return RuleClassification(label="OTHER", confidence=0.0, scores=scores)
+    return RuleClassification(label=label, confidence=best / (best + second), scores=scores)
+
+
+class ClassifierStats:
+    """Thread-safe counters for fast-path vs LLM classification"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fast_path = 0
+        self.llm_fallback = 0
+        self.by_label: Dict[str, int] = {}
+
+    def record(self, label: str, fast_path: bool):
+        with self._lock:
+            if fast_path:
+                self.fast_path += 1
+            else:
+                self.llm_fallback += 1
+            self.by_label[label] = self.by_label.get(label, 0) + 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.fast_path + self.llm_fallback
+            return {
+                "fast_path": self.fast_path,
+                "llm_fallback": self.llm_fallback,
+                "fast_path_rate": round(self.fast_path / total, 3) if total else 0.0,
+                "by_label": dict(self.by_label),
+            }
+
+
+classifier_stats = ClassifierStats()
@@ -0,0 +1,139 @@
+"""Clause-level section index with BM25 ranking for prompt pre-selection"""
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Clause headings in LMA-style agreements
+HEADING_PATTERNS = [
+    re.compile(r"^\s*\d+(\.\d+)*\.?\s+[A-Z][^\n]{0,100}$"),                     # "22. FINANCIAL COVENANTS"
+    re.compile(r"^\s*(ARTICLE|SECTION|CLAUSE|SCHEDULE|PART)\s+[\dIVXLC]+\b", re.I),  # "SCHEDULE 2"
+    re.compile(r"^\s*[A-Z][A-Z0-9 ,&'()\-]{2,80}$"),                              # "REPRESENTATIONS"
+    re.compile(r"^#{1,6} \S"),                                                  # "## Margin ratchet" (DOCX)
+]
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Heading tokens count this many times as body tokens
+HEADING_WEIGHT = 3
+
+# Inserted between non-adjacent selected sections
+OMISSION_MARKER = "\n[...]\n"
+
+
+@dataclass
+class Section:
+    """A contiguous block of text under one heading"""
+    index: int
+    heading: str
+    text: str
+    start: int
+    tokens: Counter = field(default_factory=Counter, repr=False)
+
+    @property
+    def length(self) -> int:
+        return sum(self.tokens.values())
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _is_heading(line: str) -> bool:
+    return 0 < len(line.strip()) <= 120 and any(p.match(line) for p in HEADING_PATTERNS)
+
+
+def split_sections(text: str, max_section_chars: int = 4000) -> List[Section]:
+    """Split text at clause headings; oversized sections are cut into blocks"""
+    sections: List[Section] = []
+    heading, start, offset = "", 0, 0
+
+    def close(end: int):
+        body_start = start
+        while body_start < end:
+            body_end = min(body_start + max_section_chars, end)
+            body = text[body_start:body_end]
+            if body.strip():
+                tokens = Counter(tokenize(body))
+                for token in tokenize(heading):
+                    tokens[token] += HEADING_WEIGHT
+                sections.append(Section(
+                    index=len(sections), heading=heading, text=body, start=body_start, tokens=tokens
+                ))
+            body_start = body_end
+
+    for line in text.splitlines(keepends=True):
+        if _is_heading(line):
+            close(offset)
+            heading, start = line.strip(), offset
+        offset += len(line)
+    close(len(text))
+    return sections
+
+
+class SectionIndex:
+    """BM25 index over the sections of one document"""
+
+    def __init__(self, text: str, k1: float = 1.5, b: float = 0.75, max_section_chars: int = 4000):
+        self.sections = split_sections(text, max_section_chars=max_section_chars)
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (
+            sum(s.length for s in self.sections) / len(self.sections) if self.sections else 0.0
+        )
+        doc_freq: Counter = Counter()
+        for section in self.sections:
+            doc_freq.update(section.tokens.keys())
+        n = len(self.sections)
+        self.idf: Dict[str, float] = {
+            token: math.log(1 + (n - df + 0.5) / (df + 0.5)) for token, df in doc_freq.items()
+        }
+
+    def score(self, section: Section, query_tokens: List[str]) -> float:
+        score = 0.0
+        norm = self.k1 * (1 - self.b + self.b * section.length / (self.avg_length or 1))
+        for token in query_tokens:
+            tf = section.tokens.get(token, 0)
+            if tf:
+                score += self.idf.get(token, 0.0) * tf * (self.k1 + 1) / (tf + norm)
+        return score
+
+    def rank(self, queries: List[str]) -> List[Section]:
+        """Sections matching the query terms, best BM25 score first (ties keep document order)"""
+        query_tokens = [token for query in queries for token in tokenize(query)]
+        scored = [(self.score(section, query_tokens), section) for section in self.sections]
+        return [
+            section for score, section in sorted(scored, key=lambda p: (-p[0], p[1].index))
+            if score > 0
+        ]
+
+    def select(self, queries: List[str], max_chars: int, always_include: int = 1) -> str:
+        """Top-ranked sections that fit in ``max_chars``, reassembled in document order.
+
+        The first ``always_include`` sections (title page, parties) are always
+        kept since they carry the borrower and agreement date.
+        """
+        chosen: Dict[int, Section] = {}
+        used = 0
+        candidates = self.sections[:always_include] + self.rank(queries)
+        for section in candidates:
+            cost = len(section.text) + len(OMISSION_MARKER)
+            if section.index in chosen or used + cost > max_chars:
+                continue
+            chosen[section.index] = section
+            used += cost
+
+        parts, previous = [], None
+        for section in sorted(chosen.values(), key=lambda s: s.index):
+            if previous is not None and section.index != previous + 1:
+                parts.append(OMISSION_MARKER)
+            parts.append(section.text)
+            previous = section.index
+        return "".join(parts)
+
+
+def select_relevant_text(text: str, queries: Optional[List[str]], max_chars: int) -> str:
+    """Text fitting ``max_chars``: the whole text if it fits, otherwise the best sections"""
+    if len(text) <= max_chars or not queries:
+        return text[:max_chars]
+    return SectionIndex(text).select(queries, max_chars)
@@ -0,0 +1,270 @@
+"""Value parsers for ontology field types (amounts, currencies, dates, rates, enums), compiled from its tables"""
+import re
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",),
+        ("june", "jun"), ("july", "jul"), ("august", "aug"), ("september", "sep", "sept"),
+        ("october", "oct"), ("november", "nov"), ("december", "dec"),
+    ], start=1)
+    for name in names
+}
+ORDINALS = {
+    word: number
+    for number, words in enumerate([
+        ("first", "one"), ("second", "two"), ("third", "three"), ("fourth", "four"), ("fifth", "five"),
+        ("sixth", "six"), ("seventh", "seven"), ("eighth", "eight"), ("ninth", "nine"), ("tenth", "ten"),
+    ], start=1)
+    for word in words
+}
+SCALES = {
+    "k": 10 ** 3, "thousand": 10 ** 3,
+    "m": 10 ** 6, "mm": 10 ** 6, "mn": 10 ** 6, "mio": 10 ** 6, "million": 10 ** 6,
+    "b": 10 ** 9, "bn": 10 ** 9, "billion": 10 ** 9,
+    "tn": 10 ** 12, "trillion": 10 ** 12,
+}
+
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_NUMBER = re.compile(r"\d{1,3}(?:[,.' ]\d{3})+(?:[.,]\d+)?(?!\d)|\d+(?:[.,]\d+)?")
+_SCALE = re.compile(rf"^\s*({'|'.join(sorted(SCALES, key=len, reverse=True))})\b", re.I)
+_ORDINAL_SUFFIX = re.compile(r"(\d)(st|nd|rd|th)\b", re.I)
+_DATE_PATTERNS = [
+    ("ymd", re.compile(r"\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b")),
+    ("dmy_name", re.compile(rf"\b(\d{{1,2}})\s+({_MONTH})\.?,?\s+(\d{{4}})\b", re.I)),
+    ("mdy_name", re.compile(rf"\b({_MONTH})\.?\s+(\d{{1,2}}),?\s+(\d{{4}})\b", re.I)),
+    ("numeric", re.compile(r"\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{2}|\d{4})\b")),
+]
+_RATIO = re.compile(r"(\d+(?:\.\d+)?)\s*(?::\s*1(?:\.0+)?\b|x\b|times\b)", re.I)
+_PERCENT = re.compile(r"(\d+(?:\.\d+)?)\s*(?:%|per\s*cent\b|percent\b|pct\b)", re.I)
+_BPS = re.compile(r"(\d+(?:\.\d+)?)\s*(?:bps|bp|basis\s+points?)\b", re.I)
+_FLOOR = re.compile(r"(?:floor(?:\s+of)?\s*(\d+(?:\.\d+)?)\s*(?:%|per\s*cent)?|\b(zero)\s+(?:per\s*cent\s+)?floor)", re.I)
+_ISO_CODE = re.compile(r"^[A-Z]{3}$")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class NormalizationError(ValueError):
+    """A value that does not parse as its field's type"""
+
+
+def _text_key(value: str) -> str:
+    return _WHITESPACE.sub(" ", value.lower()).strip(" .,;:")
+
+
+def _alias_pattern(aliases: Iterable[str]) -> Pattern:
+    """One regex finding any alias as a whole word, longest alias first (symbols such as "£" need no boundary)"""
+    alternatives = []
+    for alias in sorted(set(aliases), key=len, reverse=True):
+        start = r"(?<![a-z0-9])" if alias[:1].isalnum() else ""
+        end = r"(?![a-z0-9])" if alias[-1:].isalnum() else ""
+        alternatives.append(f"{start}{re.escape(alias)}{end}")
+    return re.compile("|".join(alternatives))
+
+
+class AliasTable:
+    """Canonical values by alias: exact lookup, then the longest alias found in the text"""
+
+    def __init__(self, table: Dict[str, List[str]]):
+        self._exact: Dict[str, str] = {}
+        for canonical, aliases in table.items():
+            for alias in [canonical, canonical.replace("_", " "), *aliases]:
+                self._exact.setdefault(_text_key(alias), canonical)
+        self._pattern = _alias_pattern(self._exact)
+
+    def lookup(self, text: str) -> Optional[str]:
+        key = _text_key(text)
+        if key in self._exact:
+            return self._exact[key]
+        match = self._pattern.search(key)
+        return self._exact[match.group()] if match else None
+
+
+def _to_number(text: str) -> float:
+    """Number from digits with thousands and decimal separators in either convention"""
+    digits = text.replace(" ", "").replace("'", "")
+    if "," in digits and "." in digits:
+        decimal = "," if digits.rfind(",") > digits.rfind(".") else "."
+    elif digits.count(",") == 1 and len(digits) - digits.find(",") - 1 in (1, 2):
+        decimal = ","
+    elif digits.count(".") > 1:
+        decimal = ","  # "250.000.000": dots are thousands separators
+    else:
+        decimal = "."
+    thousands = "." if decimal == "," else ","
+    return float(digits.replace(thousands, "").replace(decimal, "."))
+
+
+def _plain(number: float) -> Any:
+    return int(number) if number == int(number) else number
+
+
+class ValueNormalizer:
+    """Parsers for each ontology value type, built once from the ontology's reference tables"""
+
+    def __init__(self, ontology: Dict[str, Any]):
+        self.null_values = frozenset(_text_key(value) for value in ontology.get("null_values", []))
+        self._null_max_len = max((len(value) for value in self.null_values), default=0) + 4
+        self.day_first = ontology.get("date_day_first", True)
+        self.currencies = AliasTable(ontology.get("currencies", {}))
+        self.benchmarks = AliasTable(ontology.get("rate_benchmarks", {}))
+        self.enums = {name: AliasTable(table) for name, table in ontology.get("enums", {}).items()}
+        self._parsers = {
+            "string": self.string,
+            "party": self.party,
+            "currency": self.currency,
+            "date": self.date,
+            "rate": self.rate,
+            "number": self.number,
+            "integer": self.integer,
+        }
+
+    def types(self) -> List[str]:
+        return [*self._parsers, "amount", *self.enums]
+
+    def is_null(self, value: Any) -> bool:
+        if value is None:
+            return True
+        # Long strings are never placeholders; skip normalizing them
+        return isinstance(value, str) and len(value) <= self._null_max_len and _text_key(value) in self.null_values
+
+    def parse(self, value_type: str, value: Any) -> Any:
+        """Normalized value of a scalar field; raises NormalizationError if it does not parse"""
+        if value_type in self.enums:
+            return self.enum(value_type, value)
+        if value_type == "amount":
+            return self.amount(value)[0]
+        return self._parsers[value_type](value)
+
+    def string(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return _WHITESPACE.sub(" ", value).strip()
+        if isinstance(value, list):
+            return [self.string(item) for item in value if not self.is_null(item)]
+        return value
+
+    def party(self, value: Any) -> str:
+        if not isinstance(value, str):
+            raise NormalizationError(f"not a name: {value!r}")
+        return _WHITESPACE.sub(" ", value).strip().strip("\"'“”").rstrip(",;")
+
+    def currency(self, value: Any) -> str:
+        if not isinstance(value, str):
+            raise NormalizationError(f"not a currency: {value!r}")
+        code = self.currencies.lookup(value)
+        if code is None and _ISO_CODE.match(value.strip().upper()) and value.strip().isalpha():
+            code = value.strip().upper()
+        if code is None:
+            raise NormalizationError(f"unknown currency: {value!r}")
+        return code
+
+    def amount(self, value: Any) -> Tuple[Any, Optional[str]]:
+        """(number, ISO currency if the text names one) from e.g. "GBP 250,000,000" or "£1.5bn" """
+        if isinstance(value, bool):
+            raise NormalizationError(f"not an amount: {value!r}")
+        if isinstance(value, (int, float)):
+            return value, None
+        if not isinstance(value, str):
+            raise NormalizationError(f"not an amount: {value!r}")
+        match = _NUMBER.search(value)
+        if not match:
+            raise NormalizationError(f"no number in amount: {value!r}")
+        number = _to_number(match.group())
+        scale = _SCALE.match(value[match.end():])
+        if scale:
+            number *= SCALES[scale.group(1).lower()]
+        return _plain(round(number, 2)), self.currencies.lookup(value)
+
+    def date(self, value: Any) -> str:
+        """ISO date from the formats loan documents use, day first for all-numeric dates by default"""
+        if not isinstance(value, str):
+            raise NormalizationError(f"not a date: {value!r}")
+        text = _ORDINAL_SUFFIX.sub(r"\1", value)
+        for kind, pattern in _DATE_PATTERNS:
+            match = pattern.search(text)
+            if not match:
+                continue
+            a, b, c = match.groups()
+            if kind == "ymd":
+                year, month, day = int(a), int(b), int(c)
+            elif kind == "dmy_name":
+                year, month, day = int(c), MONTHS[b.lower()], int(a)
+            elif kind == "mdy_name":
+                year, month, day = int(c), MONTHS[a.lower()], int(b)
+            else:
+                first, second = int(a), int(b)
+                day_first = first > 12 or (self.day_first and second <= 12)
+                day, month = (first, second) if day_first else (second, first)
+                year = int(c) + 2000 if len(c) == 2 else int(c)
+            try:
+                return date(year, month, day).isoformat()
+            except ValueError:
+                raise NormalizationError(f"invalid date: {value!r}")
+        raise NormalizationError(f"unrecognized date: {value!r}")
+
+    def rate(self, value: Any) -> Dict[str, Any]:
+        """Benchmark and margin (in basis points), or a fixed rate, from e.g. "SONIA + 2.5%" """
+        if isinstance(value, dict):
+            value = value.get("raw") or " ".join(str(v) for v in value.values() if v is not None)
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise NormalizationError(f"not a rate: {value!r}")
+        if isinstance(value, (int, float)):
+            value = f"{value}%"
+
+        result = {"benchmark": self.benchmarks.lookup(value), "margin_bps": None,
+                  "fixed_rate_percent": None, "floor_percent": None, "raw": value}
+        text = value
+        floor = _FLOOR.search(text)
+        if floor:
+            result["floor_percent"] = float(floor.group(1)) if floor.group(1) else 0.0
+            text = text[:floor.start()] + text[floor.end():]
+
+        percent, bps = _PERCENT.search(text), _BPS.search(text)
+        if result["benchmark"] is not None:
+            if bps:
+                result["margin_bps"] = _plain(round(float(bps.group(1)), 2))
+            elif percent:
+                result["margin_bps"] = _plain(round(float(percent.group(1)) * 100, 2))
+        elif percent:
+            result["fixed_rate_percent"] = _plain(float(percent.group(1)))
+        else:
+            raise NormalizationError(f"no benchmark or rate in: {value!r}")
+        return result
+
+    def number(self, value: Any) -> Any:
+        """Ratios ("3.50:1", "3.5x"), percentages and amounts as plain numbers"""
+        if isinstance(value, bool):
+            raise NormalizationError(f"not a number: {value!r}")
+        if isinstance(value, (int, float)):
+            return value
+        if not isinstance(value, str):
+            raise NormalizationError(f"not a number: {value!r}")
+        ratio = _RATIO.search(value)
+        if ratio:
+            return _plain(float(ratio.group(1)))
+        return self.amount(value)[0]
+
+    def integer(self, value: Any) -> int:
+        if isinstance(value, bool):
+            raise NormalizationError(f"not an integer: {value!r}")
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str):
+            digits = re.search(r"\d+", value)
+            if digits:
+                return int(digits.group())
+            for word in re.findall(r"[a-z]+", value.lower()):
+                if word in ORDINALS:
+                    return ORDINALS[word]
+        raise NormalizationError(f"not an integer: {value!r}")
+
+    def enum(self, enum: str, value: Any) -> str:
+        if not isinstance(value, str):
+            raise NormalizationError(f"not a {enum}: {value!r}")
+        canonical = self.enums[enum].lookup(value)
+        if canonical is None:
+            raise NormalizationError(f"unknown {enum}: {value!r}")
+        return canonical
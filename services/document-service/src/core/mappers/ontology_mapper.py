@@ -0,0 +1,259 @@
+"""LMA ontology engine: maps extracted fields to canonical names and normalizes their values"""
+import json
+import logging
+import re
+import threading
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .normalizer import NormalizationError, ValueNormalizer
+from ...config import settings
+
+logger = logging.getLogger(__name__)
+
+_KEY = re.compile(r"[^a-z0-9]+")
+CONTAINER_TYPES = ("object", "list")
+
+
+@lru_cache(maxsize=4096)
+def field_key(key: str) -> str:
+    """Extracted key in the ontology's snake_case form: "Facility Amount" -> "facility_amount" """
+    return _KEY.sub("_", key.lower()).strip("_")
+
+
+def _parent(path: str) -> str:
+    return path.rsplit(".", 1)[0] if "." in path else ""
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+@dataclass
+class FieldSpec:
+    """A canonical field: its dotted path ("covenants[].type"), value type and options"""
+    path: str
+    type: str
+    currency_field: Optional[str] = None
+    scalar_field: Optional[str] = None
+
+
+@dataclass
+class DocumentSchema:
+    """Compiled lookups for one document type"""
+    fields: Dict[str, FieldSpec]
+    aliases: Dict[str, str]
+    required: List[str]
+
+
+@dataclass
+class NormalizedExtraction:
+    """Canonical extraction plus what normalization could not map or parse"""
+    data: Dict[str, Any]
+    completeness: float
+    missing_fields: List[str] = field(default_factory=list)
+    unmapped_fields: List[str] = field(default_factory=list)
+    issues: List[str] = field(default_factory=list)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "completeness": round(self.completeness, 4),
+            "missing_fields": self.missing_fields,
+            "unmapped_fields": self.unmapped_fields,
+            "issues": self.issues,
+        }
+
+
+class OntologyEngine:
+    """An ontology loaded once and compiled into per-document-type alias maps and value parsers.
+
+    Aliases are dotted paths relative to the extraction root ("borrower_name",
+    "facility.total_commitments", "covenants[].level"); an alias of an object
+    or list field renames the whole subtree. Values are parsed by field type
+    into canonical forms: ISO currencies and dates, numeric amounts, rates
+    split into benchmark and margin, enum codes. Normalizing a normalized
+    extraction returns it unchanged, so stored results can be re-run safely.
+    """
+
+    def __init__(self, ontology: Dict[str, Any]):
+        self.version: str = ontology["version"]
+        self.values = ValueNormalizer(ontology)
+        self.schemas: Dict[str, DocumentSchema] = {}
+        for doc_type in ontology["document_types"]:
+            self.schemas[doc_type] = self._compile(doc_type, ontology["document_types"])
+
+    @classmethod
+    def load(cls, path: str) -> "OntologyEngine":
+        with open(path, encoding="utf-8") as f:
+            engine = cls(json.load(f))
+        logger.info(f"Loaded ontology {engine.version} from {path} ({len(engine.schemas)} document types)")
+        return engine
+
+    def _compile(self, doc_type: str, document_types: Dict[str, Any], depth: int = 0) -> DocumentSchema:
+        definition = document_types[doc_type]
+        if "inherits" in definition:
+            if depth > 5:
+                raise ValueError(f"Ontology inheritance too deep at {doc_type}")
+            base = self._compile(definition["inherits"], document_types, depth + 1)
+            fields, aliases = dict(base.fields), dict(base.aliases)
+        else:
+            fields, aliases = {}, {}
+
+        known_types = set(self.values.types()) | set(CONTAINER_TYPES)
+        for path, spec in definition.get("fields", {}).items():
+            if spec["type"] not in known_types:
+                raise ValueError(f"Ontology field {doc_type}.{path} has unknown type {spec['type']}")
+            parent = _parent(path).removesuffix("[]")
+            if parent and fields.get(parent, FieldSpec(parent, "")).type not in CONTAINER_TYPES:
+                raise ValueError(f"Ontology field {doc_type}.{path} is inside undeclared object {parent}")
+            fields[path] = FieldSpec(path, spec["type"], spec.get("currency_field"), spec.get("scalar_field"))
+            for alias in [path, *spec.get("aliases", [])]:
+                alias = ".".join(field_key(part) + ("[]" if part.endswith("[]") else "") for part in alias.split("."))
+                # An alias may sit above its field ("borrower_name" -> "borrower.name"), never beside or below it
+                scope = _parent(alias)
+                if scope and not (_parent(path) + ".").startswith(scope + ".") or "[]" in path[len(scope):]:
+                    raise ValueError(f"Ontology alias {alias} cannot map to {doc_type}.{path}")
+                if aliases.get(alias, path) != path:
+                    raise ValueError(f"Ontology alias {alias} maps to both {aliases[alias]} and {path}")
+                aliases[alias] = path
+
+        required = definition.get("required", [])
+        for path in required:
+            if path not in fields:
+                raise ValueError(f"Ontology requires unknown field {doc_type}.{path}")
+        return DocumentSchema(fields=fields, aliases=aliases, required=required)
+
+    def schema(self, document_type: Optional[str]) -> DocumentSchema:
+        return self.schemas.get(document_type) or self.schemas["OTHER"]
+
+    def required_fields(self, document_type: Optional[str]) -> List[str]:
+        return self.schema(document_type).required
+
+    def normalize(self, document_type: Optional[str], extraction: Dict[str, Any]) -> NormalizedExtraction:
+        """Map an extraction's fields to canonical paths and normalize their values"""
+        schema = self.schema(document_type)
+        result = NormalizedExtraction(data={}, completeness=1.0)
+        currency_fills: List[tuple] = []
+        if isinstance(extraction, dict):
+            self._walk(schema, extraction, "", result.data, result, currency_fills)
+        else:
+            result.issues.append(f"extraction is not an object: {type(extraction).__name__}")
+        for target, key, currency in currency_fills:
+            if _is_empty(target.get(key)):
+                target[key] = currency
+
+        present = 0
+        for path in schema.required:
+            value: Any = result.data
+            for part in path.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            if _is_empty(value):
+                result.missing_fields.append(path)
+            else:
+                present += 1
+        result.completeness = present / len(schema.required) if schema.required else 1.0
+        return result
+
+    def _walk(self, schema: DocumentSchema, source: Dict[str, Any], prefix: str, out: Dict[str, Any],
+              result: NormalizedExtraction, currency_fills: List[tuple]):
+        for key, value in source.items():
+            raw_path = f"{prefix}.{field_key(str(key))}" if prefix else field_key(str(key))
+            canonical = schema.aliases.get(raw_path)
+            if canonical is None:
+                result.unmapped_fields.append(raw_path)
+                out.setdefault(key, value)
+                continue
+
+            # The alias may sit above its field: create the objects in between
+            target = out
+            relative = canonical[len(prefix) + 1:] if prefix else canonical
+            *parents, leaf = relative.split(".")
+            for part in parents:
+                target = target.setdefault(part, {})
+                if not isinstance(target, dict):
+                    result.issues.append(f"{canonical}: {part} is not an object")
+                    break
+            else:
+                self._set(schema, schema.fields[canonical], value, target, leaf, result, currency_fills)
+
+    def _set(self, schema: DocumentSchema, spec: FieldSpec, value: Any, target: Dict[str, Any], leaf: str,
+             result: NormalizedExtraction, currency_fills: List[tuple]):
+        """Normalize one value into ``target[leaf]``, keeping the first non-empty value on collisions"""
+        if self.values.is_null(value):
+            target.setdefault(leaf, None)
+            return
+
+        if spec.type == "object":
+            if not isinstance(value, dict):
+                if spec.scalar_field is None:
+                    result.issues.append(f"{spec.path}: expected an object, got {value!r}")
+                    target.setdefault(leaf, value)
+                    return
+                value = {spec.scalar_field: value}
+            child = target.get(leaf)
+            if not isinstance(child, dict):
+                child = target[leaf] = {}
+            self._walk(schema, value, spec.path, child, result, currency_fills)
+            return
+
+        if spec.type == "list":
+            items = value if isinstance(value, list) else [value]
+            normalized = []
+            item_spec = schema.fields.get(f"{spec.path}[]")
+            for item in items:
+                if isinstance(item, dict):
+                    child: Dict[str, Any] = {}
+                    self._walk(schema, item, f"{spec.path}[]", child, result, currency_fills)
+                    normalized.append(child)
+                elif item_spec is not None:
+                    holder: Dict[str, Any] = {}
+                    self._set(schema, item_spec, item, holder, "item", result, currency_fills)
+                    normalized.append(holder.get("item"))
+                else:
+                    normalized.append(item)
+            if _is_empty(target.get(leaf)):
+                target[leaf] = normalized
+            return
+
+        try:
+            if spec.type == "amount":
+                parsed, currency = self.values.amount(value)
+                if currency and spec.currency_field:
+                    currency_fills.append((target, spec.currency_field, currency))
+            else:
+                parsed = self.values.parse(spec.type, value)
+        except NormalizationError as e:
+            result.issues.append(f"{spec.path}: {str(e)}")
+            parsed = value
+        if _is_empty(target.get(leaf)):
+            target[leaf] = parsed
+
+    def normalize_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Re-normalize a stored job result (the normalization stage's output) under this ontology"""
+        normalized = self.normalize(result.get("document_type"), result.get("extraction") or {})
+        return {
+            **result,
+            "extraction": normalized.data,
+            "ontology_version": self.version,
+            "normalization": normalized.report(),
+        }
+
+    def normalize_batch(self, results: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Re-normalize stored results one at a time, so a batch of any size streams through"""
+        for result in results:
+            yield self.normalize_result(result)
+
+
+_ontology: Optional[OntologyEngine] = None
+_ontology_lock = threading.Lock()
+
+
+def get_ontology() -> OntologyEngine:
+    """The configured ontology, loaded and compiled on first use"""
+    global _ontology
+    if _ontology is None:
+        with _ontology_lock:
+            if _ontology is None:
+                _ontology = OntologyEngine.load(settings.ONTOLOGY_PATH)
+    return _ontology
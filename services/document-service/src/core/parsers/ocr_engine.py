@@ -0,0 +1,153 @@
+"""OCR fallback for PDF pages without a usable text layer, run in a process pool and cached per page"""
+import hashlib
+import logging
+import os
+import shutil
+import time
+from functools import lru_cache
+from typing import Dict
+
+from ...config import settings
+from ...database.ocr_cache import get_ocr_texts, store_ocr_texts
+from ...utils.metrics import OCR_PAGES, OCR_SECONDS, record_cache_lookup
+from ...utils.process_pool import SharedProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Bump when rendering or recognition changes so cached page text is redone
+OCR_ENGINE_VERSION = "tesseract-1"
+
+
+@lru_cache(maxsize=1)
+def ocr_available() -> bool:
+    """Whether pytesseract, pdf2image and the tesseract and pdftoppm binaries are installed"""
+    try:
+        import pdf2image  # noqa: F401
+        import pytesseract  # noqa: F401
+    except ImportError:
+        logger.warning("OCR disabled: pytesseract and pdf2image are not installed")
+        return False
+    missing = [binary for binary in ("tesseract", "pdftoppm") if shutil.which(binary) is None]
+    if missing:
+        logger.warning(f"OCR disabled: {', '.join(missing)} not found on PATH")
+        return False
+    return True
+
+
+def ocr_enabled() -> bool:
+    return settings.OCR_ENABLED and ocr_available()
+
+
+def engine_key() -> str:
+    """Cache key part for everything besides the page that changes OCR output"""
+    return f"{OCR_ENGINE_VERSION}:{settings.OCR_LANG}:{settings.OCR_DPI}"
+
+
+def has_text_layer(text: str) -> bool:
+    """Whether extracted page text is usable, rather than empty or a few stray glyphs"""
+    alnum = sum(1 for char in text if char.isalnum())
+    if alnum < settings.OCR_MIN_TEXT_CHARS:
+        return False
+    # Broken font encodings come out as runs of symbols rather than words
+    return alnum >= 0.5 * sum(1 for char in text if not char.isspace())
+
+
+def page_fingerprint(page) -> str:
+    """Hash of what a PyPDF2 page renders: its geometry, content streams and images"""
+    digest = hashlib.sha256()
+    digest.update(f"{list(page.mediabox)}:{page.get('/Rotate', 0)}".encode())
+
+    contents = page.get("/Contents")
+    streams = contents.get_object() if contents is not None else []
+    if not isinstance(streams, list):
+        streams = [streams]
+    for stream in streams:
+        # Raw (still encoded) bytes: hashing needs no decompression
+        digest.update(getattr(stream.get_object(), "_data", b""))
+
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    if xobjects is not None:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            digest.update(name.encode())
+            digest.update(getattr(xobjects[name].get_object(), "_data", b""))
+    return digest.hexdigest()
+
+
+def _init_ocr_worker():
+    # One tesseract thread per process; the pool provides the parallelism
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _ocr_page(file_path: str, page_number: int, dpi: int, lang: str, timeout: int) -> str:
+    """Rasterize one page (1-based) and OCR it (runs inside pool workers)"""
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_number, last_page=page_number, grayscale=True)
+    if not images:
+        return ""
+    return pytesseract.image_to_string(images[0], lang=lang, timeout=timeout).strip()
+
+
+def _worker_count() -> int:
+    return settings.OCR_WORKERS or os.cpu_count() or 1
+
+
+_pool = SharedProcessPool(_worker_count, initializer=_init_ocr_worker)
+
+
+def shutdown_ocr_pool():
+    """Stop the OCR process pool"""
+    _pool.shutdown()
+
+
+def ocr_pages(file_path: str, pages: Dict[int, str]) -> Dict[int, str]:
+    """OCR text for pages lacking a text layer, given as {0-based page index: page fingerprint}.
+
+    Pages seen before (by fingerprint) come from the OCR cache; the rest are
+    rasterized and OCRed in parallel in the OCR pool. Pages that fail to OCR
+    are left out of the result, so callers keep their text-layer text.
+    """
+    if not pages or not ocr_enabled():
+        return {}
+
+    engine = engine_key()
+    cached = get_ocr_texts(set(pages.values()), engine)
+    # Identical pages (blank separators, repeated forms) are OCRed once
+    missing: Dict[str, int] = {}
+    for index, fingerprint in pages.items():
+        record_cache_lookup("ocr", hit=fingerprint in cached)
+        if fingerprint in cached:
+            OCR_PAGES.inc(result="cached")
+        else:
+            missing.setdefault(fingerprint, index)
+    if not missing:
+        return {index: cached[fingerprint] for index, fingerprint in pages.items()}
+
+    started = time.perf_counter()
+    args = (settings.OCR_DPI, settings.OCR_LANG, settings.OCR_PAGE_TIMEOUT_SECONDS)
+    futures = {}
+    if _worker_count() > 1 and len(missing) > 1:
+        pool = _pool.get()
+        futures = {fingerprint: pool.submit(_ocr_page, file_path, index + 1, *args)
+                   for fingerprint, index in missing.items()}
+
+    recognized = {}
+    for fingerprint, index in missing.items():
+        try:
+            text = futures[fingerprint].result() if futures else _ocr_page(file_path, index + 1, *args)
+        except Exception as e:
+            logger.warning(f"OCR failed for page {index + 1} of {file_path}: {str(e)}")
+            OCR_PAGES.inc(result="failed")
+            continue
+        OCR_PAGES.inc(result="ocr")
+        recognized[fingerprint] = text
+    OCR_SECONDS.observe(time.perf_counter() - started)
+    store_ocr_texts(recognized, engine)
+
+    logger.info(f"OCRed {len(recognized)}/{len(missing)} pages of {file_path} ({len(cached)} cached)")
+    texts = {**cached, **recognized}
+    return {index: texts[fingerprint] for index, fingerprint in pages.items() if fingerprint in texts}
+
@@ -0,0 +1,173 @@
+"""Page-level, parallel PDF text extraction with OCR for pages lacking a text layer"""
+import logging
+import math
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import PyPDF2
+
+from ...config import settings
+from ...utils.process_pool import SharedProcessPool
+from .ocr_engine import has_text_layer, ocr_enabled, ocr_pages, page_fingerprint, shutdown_ocr_pool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PageText:
+    """Text of a single page and its offset in the joined document text"""
+    page_number: int
+    text: str
+    offset: int
+
+
+@dataclass
+class ParsedDocument:
+    """Per-page document text, possibly covering only the leading pages"""
+    pages: List[PageText] = field(default_factory=list)
+    page_count: int = 0
+
+    @property
+    def complete(self) -> bool:
+        """True once every page of the document has been extracted"""
+        return len(self.pages) >= self.page_count
+
+    @property
+    def char_count(self) -> int:
+        if not self.pages:
+            return 0
+        last = self.pages[-1]
+        return last.offset + len(last.text)
+
+    @property
+    def text(self) -> str:
+        """Page texts joined the way ``read_pdf`` always has (blank pages skipped)"""
+        return "\n".join(page.text for page in self.pages if page.text)
+
+    def add_page(self, text: str):
+        """Append the next page, tracking its offset in ``text``"""
+        offset = self.char_count
+        if text and offset:
+            offset += 1  # newline separator
+        self.pages.append(PageText(page_number=len(self.pages) + 1, text=text, offset=offset))
+
+
+# (text layer, fingerprint if the page needs OCR)
+PageExtract = Tuple[str, Optional[str]]
+
+
+def _extract_page_range(file_path: str, start: int, stop: int, detect_scans: bool = False) -> List[PageExtract]:
+    """Extract text for pages ``start:stop`` (runs inside pool workers).
+
+    With ``detect_scans``, pages without a usable text layer also get their
+    fingerprint, which marks them for OCR and keys the OCR cache.
+    """
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        extracted = []
+        for i in range(start, stop):
+            page = reader.pages[i]
+            text = page.extract_text() or ""
+            scanned = detect_scans and not has_text_layer(text)
+            extracted.append((text, page_fingerprint(page) if scanned else None))
+        return extracted
+
+
+def _worker_count() -> int:
+    return settings.PDF_PARSE_WORKERS or os.cpu_count() or 1
+
+
+_pool = SharedProcessPool(_worker_count)
+
+
+def shutdown_pdf_pool():
+    """Stop the PDF parsing and OCR process pools"""
+    _pool.shutdown()
+    shutdown_ocr_pool()
+
+
+def _extract_wave(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract a contiguous run of pages, fanning out to the pool when it is large enough.
+
+    Pages without a usable text layer are OCRed (or read from the OCR cache)
+    when OCR is available; otherwise their text-layer text is kept as is.
+    """
+    detect_scans = ocr_enabled()
+    page_total = stop - start
+    workers = _worker_count()
+    if workers <= 1 or page_total < settings.PDF_PARALLEL_MIN_PAGES:
+        return _apply_ocr(file_path, start, _extract_page_range(file_path, start, stop, detect_scans))
+
+    step = max(settings.PDF_PAGES_PER_TASK, math.ceil(page_total / workers))
+    pool = _pool.get()
+    futures = [
+        pool.submit(_extract_page_range, file_path, i, min(i + step, stop), detect_scans)
+        for i in range(start, stop, step)
+    ]
+    extracted = []
+    for future in futures:
+        extracted.extend(future.result())
+    return _apply_ocr(file_path, start, extracted)
+
+
+def _apply_ocr(file_path: str, start: int, extracted: List[PageExtract]) -> List[str]:
+    """Page texts with OCR output in place of missing text layers"""
+    scanned = {start + i: fingerprint for i, (_, fingerprint) in enumerate(extracted) if fingerprint}
+    recognized = ocr_pages(file_path, scanned)
+    return [recognized.get(start + i, text) for i, (text, _) in enumerate(extracted)]
+
+
+def get_page_count(file_path: str) -> int:
+    """Number of pages in a PDF"""
+    with open(file_path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_pdf_pages(
+    file_path: str,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    document: Optional[ParsedDocument] = None
+) -> ParsedDocument:
+    """Extract PDF text page by page.
+
+    Extraction stops after ``max_pages`` pages or as soon as ``max_chars``
+    characters are available. Without a character budget all requested pages
+    are extracted in one parallel wave; with a budget, pages are extracted in
+    waves sized from the characters-per-page seen so far, so a budget filled
+    by the first pages never touches the rest of the file. Passing a partially
+    parsed ``document`` continues from its last page.
+    """
+    try:
+        if document is None:
+            document = ParsedDocument(page_count=get_page_count(file_path))
+
+        stop = document.page_count if max_pages is None else min(max_pages, document.page_count)
+
+        while len(document.pages) < stop:
+            if max_chars is not None and document.char_count >= max_chars:
+                break
+
+            start = len(document.pages)
+            if max_chars is None:
+                wave = stop - start
+            elif not document.pages:
+                wave = settings.PDF_PAGES_PER_TASK
+            else:
+                chars_per_page = max(document.char_count / len(document.pages), 1)
+                needed = math.ceil((max_chars - document.char_count) / chars_per_page)
+                # Overshoot slightly, but never by more than one full round of pool tasks
+                max_wave = max(settings.PDF_PARALLEL_MIN_PAGES, _worker_count() * settings.PDF_PAGES_PER_TASK)
+                wave = min(max(settings.PDF_PAGES_PER_TASK, math.ceil(needed * 1.1)), max_wave)
+
+            for text in _extract_wave(file_path, start, min(start + wave, stop)):
+                document.add_page(text)
+    except Exception as e:
+        raise ValueError(f"Error reading PDF: {str(e)}")
+
+    logger.debug(
+        f"Extracted {len(document.pages)}/{document.page_count} pages "
+        f"({document.char_count} chars) from {file_path}"
+    )
+    return document
@@ -0,0 +1,27 @@
+"""Synchronous access and eviction for the cache tables read from workflow threads"""
+import sqlite3
+
+from .connection import db_manager
+
+
+def connect() -> sqlite3.Connection:
+    # Called from workflow threads, so use plain sqlite3 with a connection per call
+    return sqlite3.connect(db_manager.db_path, timeout=30)
+
+
+def evict(db: sqlite3.Connection, table: str, max_age_days: int, max_entries: int):
+    """Drop entries of a cache table past the max age, then least recently used entries over the size limit"""
+    db.execute(
+        f"DELETE FROM {table} WHERE last_accessed_at < datetime('now', ?)",
+        (f"-{max_age_days} days",)
+    )
+    db.execute(
+        f"""
+        DELETE FROM {table} WHERE rowid IN (
+            SELECT rowid FROM {table}
+            ORDER BY last_accessed_at DESC
+            LIMIT -1 OFFSET ?
+        )
+        """,
+        (max_entries,)
+    )
@@ -0,0 +1,168 @@
+"""Long-lived SQLite connections: a WAL-mode writer, a reader pool and batched progress writes"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import aiosqlite
+
+from ..config import settings
+from ..utils.metrics import DB_QUERY_SECONDS, DB_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Database file path
+DB_PATH = Path("lma_synapse.db")
+
+
+class DatabaseManager:
+    """Owns one writer connection and a small pool of reader connections.
+
+    WAL journaling lets readers proceed while the writer commits. Progress-only
+    job updates are buffered and written in one transaction per flush
+    interval, so a workflow reporting progress many times a second costs a
+    single commit per interval.
+    """
+
+    def __init__(self, db_path: Path, reader_count: int, flush_interval: float):
+        self.db_path = db_path
+        self.reader_count = max(1, reader_count)
+        self.flush_interval = flush_interval
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_conns = []
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._open_lock = asyncio.Lock()
+        self._pending_progress: Dict[str, Tuple[str, int]] = {}
+        self._pending_results: Dict[str, str] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    async def open(self):
+        """Open connections and start the progress flusher (idempotent)"""
+        async with self._open_lock:
+            if self.is_open:
+                return
+            self._writer = await self._connect()
+            self._write_lock = asyncio.Lock()
+            self._readers = asyncio.Queue()
+            self._reader_conns = [await self._connect() for _ in range(self.reader_count)]
+            for conn in self._reader_conns:
+                self._readers.put_nowait(conn)
+            self._flusher = asyncio.create_task(self._flush_loop())
+            logger.info(f"Database opened in WAL mode with {self.reader_count} readers: {self.db_path}")
+
+    async def close(self):
+        """Flush pending progress and close every connection"""
+        if not self.is_open:
+            return
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        await self.flush_progress()
+        for conn in self._reader_conns:
+            await conn.close()
+        await self._writer.close()
+        self._writer = None
+        self._reader_conns = []
+
+    @asynccontextmanager
+    async def reader(self):
+        """Borrow a read connection from the pool"""
+        await self.open()
+        requested = time.perf_counter()
+        conn = await self._readers.get()
+        acquired = time.perf_counter()
+        DB_WAIT_SECONDS.observe(acquired - requested, mode="reader")
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+            DB_QUERY_SECONDS.observe(time.perf_counter() - acquired, mode="reader")
+
+    @asynccontextmanager
+    async def writer(self):
+        """Exclusive use of the writer connection; commits on success"""
+        await self.open()
+        requested = time.perf_counter()
+        async with self._write_lock:
+            acquired = time.perf_counter()
+            DB_WAIT_SECONDS.observe(acquired - requested, mode="writer")
+            try:
+                yield self._writer
+                await self._writer.commit()
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            finally:
+                DB_QUERY_SECONDS.observe(time.perf_counter() - acquired, mode="writer")
+
+    def queue_progress(self, job_id: str, status: str, progress: int):
+        """Buffer a progress update; later updates for the same job replace earlier ones"""
+        self._pending_progress[job_id] = (status, progress)
+
+    def pending_progress(self, job_id: str) -> Optional[Tuple[str, int]]:
+        """Buffered (status, progress) for a job not yet committed"""
+        return self._pending_progress.get(job_id)
+
+    def queue_partial_result(self, job_id: str, result_json: str):
+        """Buffer the fields a running job has extracted so far, written with the next progress flush"""
+        self._pending_results[job_id] = result_json
+
+    def pending_partial_result(self, job_id: str) -> Optional[str]:
+        return self._pending_results.get(job_id)
+
+    def discard_progress(self, job_id: str):
+        """Drop buffered progress so it cannot overwrite a newer direct update"""
+        self._pending_progress.pop(job_id, None)
+        self._pending_results.pop(job_id, None)
+
+    async def flush_progress(self):
+        """Write all buffered progress updates in one transaction"""
+        if not (self._pending_progress or self._pending_results) or not self.is_open:
+            return
+        async with self._write_lock:
+            started = time.perf_counter()
+            pending, self._pending_progress = self._pending_progress, {}
+            results, self._pending_results = self._pending_results, {}
+            await self._writer.executemany(
+                """
+                UPDATE extraction_jobs
+                SET status = ?, progress = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = ? AND status = 'processing'
+                """,
+                [(status, progress, job_id) for job_id, (status, progress) in pending.items()]
+            )
+            await self._writer.executemany(
+                "UPDATE extraction_jobs SET partial_result = ? WHERE job_id = ? AND status = 'processing'",
+                [(result, job_id) for job_id, result in results.items()]
+            )
+            await self._writer.commit()
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, mode="progress_flush")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_progress()
+            except Exception as e:
+                logger.error(f"Progress flush failed: {str(e)}")
+
+
+db_manager = DatabaseManager(
+    db_path=DB_PATH,
+    reader_count=settings.DB_READER_POOL_SIZE,
+    flush_interval=settings.DB_PROGRESS_FLUSH_MS / 1000
+)
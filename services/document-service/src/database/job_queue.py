@@ -0,0 +1,224 @@
+"""Durable job queue on the extraction_jobs table: enqueue, leased claims, retries and recovery"""
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .connection import db_manager
+from ..utils.events import event_bus, JobEvent
+
+
+@dataclass
+class ClaimedJob:
+    """A job leased to a worker"""
+    job_id: str
+    file_path: str
+    content_hash: Optional[str]
+    batch_id: Optional[str]
+    attempts: int
+    wait_seconds: float
+    trace: bool = False
+
+
+async def _virtual_now(db) -> int:
+    async with db.execute("SELECT virtual_now FROM job_queue_state WHERE id = 1") as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+async def enqueue_jobs(jobs: List[Tuple[str, int]]):
+    """Make jobs claimable; each entry is (job_id, rounds after the current virtual time)"""
+    now = time.time()
+    async with db_manager.writer() as db:
+        virtual_now = await _virtual_now(db)
+        await db.executemany(
+            """
+            UPDATE extraction_jobs
+            SET queued_at = ?, next_attempt_at = ?, fair_seq = ?
+            WHERE job_id = ? AND status = 'pending'
+            """,
+            [(now, now, virtual_now + rounds, job_id) for job_id, rounds in jobs]
+        )
+
+
+async def queue_position(job_id: str) -> int:
+    """Claimable jobs ordered ahead of this one"""
+    async with db_manager.reader() as db:
+        async with db.execute(
+            """
+            SELECT COUNT(*) FROM extraction_jobs AS ahead, extraction_jobs AS job
+            WHERE job.job_id = ?
+              AND ahead.status = 'pending' AND ahead.queued_at IS NOT NULL
+              AND (ahead.fair_seq, ahead.queued_at) < (job.fair_seq, job.queued_at)
+            """,
+            (job_id,)
+        ) as cursor:
+            return (await cursor.fetchone())[0]
+
+
+async def pending_count() -> int:
+    """Jobs waiting for a worker, from the maintained counts"""
+    async with db_manager.reader() as db:
+        async with db.execute(
+            "SELECT COALESCE(SUM(count), 0) FROM job_counts WHERE status = 'pending'"
+        ) as cursor:
+            return (await cursor.fetchone())[0]
+
+
+async def claim_job(worker_id: str, lease_seconds: float) -> Optional[ClaimedJob]:
+    """Lease the next due job in fair-share order, or None if nothing is due.
+
+    BEGIN IMMEDIATE takes SQLite's write lock before the lookup, so two
+    worker processes can never claim the same job.
+    """
+    now = time.time()
+    async with db_manager.writer() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        async with db.execute(
+            """
+            SELECT job_id, file_path, content_hash, batch_id, attempts, fair_seq, next_attempt_at,
+                   trace_enabled
+            FROM extraction_jobs
+            WHERE status = 'pending' AND queued_at IS NOT NULL AND next_attempt_at <= ?
+            ORDER BY fair_seq, queued_at
+            LIMIT 1
+            """,
+            (now,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None
+
+        await db.execute(
+            """
+            UPDATE extraction_jobs
+            SET status = 'processing', attempts = attempts + 1, lease_owner = ?,
+                lease_expires_at = ?, heartbeat_at = ?, partial_result = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ?
+            """,
+            (worker_id, now + lease_seconds, now, row["job_id"])
+        )
+        await db.execute(
+            "UPDATE job_queue_state SET virtual_now = MAX(virtual_now, ?) WHERE id = 1",
+            (row["fair_seq"],)
+        )
+
+    return ClaimedJob(
+        job_id=row["job_id"],
+        file_path=row["file_path"],
+        content_hash=row["content_hash"],
+        batch_id=row["batch_id"],
+        attempts=row["attempts"] + 1,
+        wait_seconds=max(now - row["next_attempt_at"], 0.0),
+        trace=bool(row["trace_enabled"])
+    )
+
+
+async def renew_lease(job_id: str, worker_id: str, lease_seconds: float) -> bool:
+    """Extend a lease; False if the job is no longer leased to this worker"""
+    now = time.time()
+    async with db_manager.writer() as db:
+        cursor = await db.execute(
+            """
+            UPDATE extraction_jobs SET lease_expires_at = ?, heartbeat_at = ?
+            WHERE job_id = ? AND lease_owner = ? AND status = 'processing'
+            """,
+            (now + lease_seconds, now, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+
+async def retry_job(job_id: str, worker_id: str, delay: float, error: str, refund_attempt: bool = False):
+    """Return a leased job to the queue, claimable again after ``delay`` seconds"""
+    now = time.time()
+    async with db_manager.writer() as db:
+        db_manager.discard_progress(job_id)
+        await db.execute(
+            f"""
+            UPDATE extraction_jobs
+            SET status = 'pending', progress = 0, error = ?, next_attempt_at = ?,
+                lease_owner = NULL, lease_expires_at = NULL, partial_result = NULL,
+                updated_at = CURRENT_TIMESTAMP
+                {", attempts = MAX(attempts - 1, 0)" if refund_attempt else ""}
+            WHERE job_id = ? AND lease_owner = ?
+            """,
+            (error, now + delay, job_id, worker_id)
+        )
+    event_bus.publish(JobEvent(
+        job_id=job_id, type="status", status="pending", progress=0,
+        data={"error": error, "retry_in_seconds": round(delay, 1)}
+    ))
+
+
+async def recover_jobs(
+    max_attempts: int,
+    include_unleased: bool = False,
+    unqueued_grace_seconds: float = 60
+) -> Dict[str, int]:
+    """Requeue jobs whose worker died, failing those that have used every attempt.
+
+    Expired leases are always recovered. With ``include_unleased`` (startup),
+    running jobs without any lease, left by a process that ran before the
+    durable queue existed, and jobs that were created but never enqueued are
+    recovered too.
+    """
+    now = time.time()
+    lease_condition = "lease_expires_at < ?"
+    if include_unleased:
+        lease_condition = "(lease_expires_at IS NULL OR lease_expires_at < ?)"
+
+    async with db_manager.writer() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        async with db.execute(
+            f"SELECT job_id, attempts FROM extraction_jobs WHERE status = 'processing' AND {lease_condition}",
+            (now,)
+        ) as cursor:
+            orphans: List[Any] = list(await cursor.fetchall())
+
+        exhausted = [row["job_id"] for row in orphans if row["attempts"] >= max_attempts]
+        requeued = [row["job_id"] for row in orphans if row["attempts"] < max_attempts]
+        for job_id in exhausted + requeued:
+            db_manager.discard_progress(job_id)
+
+        await db.executemany(
+            """
+            UPDATE extraction_jobs
+            SET status = 'failed', lease_owner = NULL, lease_expires_at = NULL,
+                error = 'Worker stopped while processing; no attempts left',
+                updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ?
+            """,
+            [(job_id,) for job_id in exhausted]
+        )
+        await db.executemany(
+            """
+            UPDATE extraction_jobs
+            SET status = 'pending', progress = 0, next_attempt_at = ?,
+                queued_at = COALESCE(queued_at, ?),
+                lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ?
+            """,
+            [(now, now, job_id) for job_id in requeued]
+        )
+
+        unqueued = 0
+        if include_unleased:
+            virtual_now = await _virtual_now(db)
+            cursor = await db.execute(
+                """
+                UPDATE extraction_jobs
+                SET queued_at = ?, next_attempt_at = ?, fair_seq = ?
+                WHERE status = 'pending' AND queued_at IS NULL
+                  AND created_at < datetime('now', ?)
+                """,
+                (now, now, virtual_now, f"-{int(unqueued_grace_seconds)} seconds")
+            )
+            unqueued = max(cursor.rowcount, 0)
+
+    for job_id in exhausted:
+        event_bus.publish(JobEvent(job_id=job_id, type="status", status="failed", progress=0,
+                                   data={"error": "Worker stopped while processing; no attempts left"}))
+    for job_id in requeued:
+        event_bus.publish(JobEvent(job_id=job_id, type="status", status="pending", progress=0))
+
+    return {"requeued": len(requeued), "failed": len(exhausted), "enqueued": unqueued}
@@ -1,51 +1,53 @@
 """SQLite-based job tracking for document extraction"""
-import sqlite3
 import json
+import base64
+import hashlib
+import logging
 from datetime import datetime
-from pathlib import Path
-from typing import Optional, Dict, Any
-import aiosqlite
+from typing import Optional, Dict, Any, List, Tuple
 
-# Database file path
-DB_PATH = Path("lma_synapse.db")
+from .connection import db_manager
+from .migrations import apply_migrations
+from .results import store_job_results
+from ..core.mappers.ontology_mapper import get_ontology
+from ..utils.events import event_bus, JobEvent
+from ..utils.metrics import record_cache_lookup
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Extraction cache hit/miss counters (process-local)
+_cache_counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
 
 async def init_db():
-    """Initialize SQLite database with jobs table"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS extraction_jobs (
-                job_id TEXT PRIMARY KEY,
-                filename TEXT NOT NULL,
-                file_path TEXT NOT NULL,
-                file_size INTEGER NOT NULL,
-                status TEXT NOT NULL DEFAULT 'pending',
-                progress INTEGER DEFAULT 0,
-                result TEXT,
-                error TEXT,
-                confidence REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        await db.commit()
+    """Open the connection manager and apply pending schema migrations"""
+    await db_manager.open()
+    async with db_manager.writer() as db:
+        version = await apply_migrations(db)
+    logger.info(f"Database schema at version {version}")
+
+async def close_db():
+    """Flush buffered progress and close connections"""
+    await db_manager.close()
 
 async def create_job(
     job_id: str,
     filename: str,
     file_path: str,
     file_size: int,
-    status: str = "pending"
+    status: str = "pending",
+    content_hash: str = None,
+    trace: bool = False
 ) -> Dict[str, Any]:
     """Create a new extraction job"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with db_manager.writer() as db:
         await db.execute(
             """
-            INSERT INTO extraction_jobs (job_id, filename, file_path, file_size, status)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO extraction_jobs (job_id, filename, file_path, file_size, status, content_hash, trace_enabled)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (job_id, filename, file_path, file_size, status)
+            (job_id, filename, file_path, file_size, status, content_hash, int(trace))
         )
-        await db.commit()
 
     return {
         "job_id": job_id,
@@ -54,12 +56,112 @@ async def create_job(
         "created_at": datetime.now().isoformat()
     }
 
+async def create_batch(batch_id: str, source: str, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create a batch and all of its job rows in one transaction.
+
+    Each job dict has job_id, filename, file_path, file_size and content_hash;
+    jobs answered from the extraction cache also carry status "completed",
+    result, confidence and document_type. A truthy "trace" asks for a stage trace.
+    """
+    async with db_manager.writer() as db:
+        await db.execute(
+            "INSERT INTO batches (batch_id, source, job_count) VALUES (?, ?, ?)",
+            (batch_id, source, len(jobs))
+        )
+        await db.executemany(
+            """
+            INSERT INTO extraction_jobs
+                (job_id, filename, file_path, file_size, status, progress, confidence,
+                 document_type, content_hash, batch_id, trace_enabled)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    job["job_id"], job["filename"], job["file_path"], job["file_size"],
+                    job.get("status", "pending"),
+                    100 if job.get("status") == "completed" else 0,
+                    job.get("confidence"), job.get("document_type"),
+                    job.get("content_hash"), batch_id, int(bool(job.get("trace")))
+                )
+                for job in jobs
+            ]
+        )
+        await store_job_results(
+            db, [(job["job_id"], job["result"]) for job in jobs if job.get("result") is not None]
+        )
+
+    for job in jobs:
+        if job.get("status") == "completed":
+            event_bus.publish(JobEvent(
+                job_id=job["job_id"], type="status", status="completed", progress=100,
+                data={"confidence": job.get("confidence"), "document_type": job.get("document_type")}
+            ))
+
+    return {
+        "batch_id": batch_id,
+        "job_count": len(jobs),
+        "created_at": datetime.now().isoformat()
+    }
+
+async def get_batch(batch_id: str) -> Optional[Dict[str, Any]]:
+    """Aggregate progress and throughput of a batch"""
+    async with db_manager.reader() as db:
+        async with db.execute(
+            "SELECT batch_id, source, job_count, created_at FROM batches WHERE batch_id = ?",
+            (batch_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        batch = dict(row)
+
+        async with db.execute(
+            """
+            SELECT job_id, status, progress, updated_at,
+                   (julianday(updated_at) - julianday(?)) * 86400.0 AS elapsed
+            FROM extraction_jobs WHERE batch_id = ?
+            """,
+            (batch["created_at"], batch_id)
+        ) as cursor:
+            rows = [dict(r) for r in await cursor.fetchall()]
+
+    by_status: Dict[str, int] = {}
+    progress_total = 0
+    last_finished = 0.0
+    for job in rows:
+        pending = db_manager.pending_progress(job["job_id"])
+        if pending:
+            job["status"], job["progress"] = pending
+        by_status[job["status"]] = by_status.get(job["status"], 0) + 1
+        progress_total += job["progress"] or 0
+        if job["status"] in ("completed", "failed"):
+            last_finished = max(last_finished, job["elapsed"] or 0.0)
+
+    finished = by_status.get("completed", 0) + by_status.get("failed", 0)
+    remaining = len(rows) - finished - by_status.get("deleted", 0)
+    # Throughput over the time the batch has been finishing jobs
+    per_minute = finished / (last_finished / 60) if last_finished > 0 else None
+
+    batch.update({
+        "by_status": by_status,
+        "finished": finished,
+        "progress": round(progress_total / len(rows)) if rows else 0,
+        "jobs_per_minute": round(per_minute, 2) if per_minute else None,
+        "eta_seconds": round(remaining / per_minute * 60) if per_minute and remaining else None
+    })
+    return batch
+
+# Job row columns read by status polls; results and traces are fetched separately
+JOB_COLUMNS = (
+    "job_id, filename, file_path, file_size, status, progress, error, confidence, document_type, "
+    "content_hash, batch_id, attempts, trace_enabled, partial_result, created_at, updated_at"
+)
+
 async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
-    """Get job by ID"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    """Get job by ID, without its result (see get_job_result) or trace"""
+    async with db_manager.reader() as db:
         async with db.execute(
-            "SELECT * FROM extraction_jobs WHERE job_id = ?",
+            f"SELECT {JOB_COLUMNS} FROM extraction_jobs WHERE job_id = ?",
             (job_id,)
         ) as cursor:
             row = await cursor.fetchone()
@@ -68,22 +170,64 @@ async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
                 return None
 
             job = dict(row)
-            # Parse JSON result if present
-            if job.get("result"):
-                job["result"] = json.loads(job["result"])
+            # Overlay progress still waiting for the next batched commit
+            pending = db_manager.pending_progress(job_id)
+            if pending:
+                job["status"], job["progress"] = pending
+            partial = db_manager.pending_partial_result(job_id) or job["partial_result"]
+            job["partial_result"] = json.loads(partial) if partial else None
 
             return job
 
+async def get_job_summary(job_id: str) -> Optional[Dict[str, Any]]:
+    """Status fields of a job without loading the result blob"""
+    async with db_manager.reader() as db:
+        async with db.execute(
+            """
+            SELECT job_id, status, progress, confidence, document_type, error
+            FROM extraction_jobs WHERE job_id = ?
+            """,
+            (job_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+
+    if not row:
+        return None
+    job = dict(row)
+    pending = db_manager.pending_progress(job_id)
+    if pending:
+        job["status"], job["progress"] = pending
+    return job
+
 async def update_job_status(
     job_id: str,
     status: str,
     progress: int = None,
     result: Dict[str, Any] = None,
     error: str = None,
-    confidence: float = None
+    confidence: float = None,
+    document_type: str = None
 ):
-    """Update job status and results"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    """Update job status and results.
+
+    Progress-only updates of a running job are buffered and committed in
+    batches; any update carrying results, errors or a final status is
+    written immediately and supersedes buffered progress. Every update is
+    published to the event bus.
+    """
+    if (
+        status == "processing"
+        and progress is not None
+        and result is None and error is None and confidence is None
+        and document_type is None
+    ):
+        db_manager.queue_progress(job_id, status, progress)
+        event_bus.publish(JobEvent(job_id=job_id, type="status", status=status, progress=progress))
+        return
+
+    async with db_manager.writer() as db:
+        db_manager.discard_progress(job_id)
+
         # Build update query dynamically
         updates = ["status = ?", "updated_at = CURRENT_TIMESTAMP"]
         params = [status]
@@ -92,10 +236,6 @@ async def update_job_status(
             updates.append("progress = ?")
             params.append(progress)
 
-        if result is not None:
-            updates.append("result = ?")
-            params.append(json.dumps(result))
-
         if error is not None:
             updates.append("error = ?")
             params.append(error)
@@ -104,24 +244,264 @@ async def update_job_status(
             updates.append("confidence = ?")
             params.append(confidence)
 
+        if document_type is not None:
+            updates.append("document_type = ?")
+            params.append(document_type)
+
+        if status != "processing":
+            # Partial fields only describe a running extraction
+            updates.append("partial_result = NULL")
+
         params.append(job_id)
 
         query = f"UPDATE extraction_jobs SET {', '.join(updates)} WHERE job_id = ?"
         await db.execute(query, params)
-        await db.commit()
+        if result is not None:
+            await store_job_results(db, [(job_id, result)])
+
+    data = {
+        key: value for key, value in
+        (("confidence", confidence), ("document_type", document_type), ("error", error))
+        if value is not None
+    }
+    if progress is None:
+        # Failures and deletions keep the last progress the client saw
+        last = event_bus.last_event(job_id)
+        progress = last.progress if last else 0
+    event_bus.publish(JobEvent(job_id=job_id, type="status", status=status, progress=progress, data=data))
+
+async def save_job_trace(job_id: str, trace: Dict[str, Any]):
+    """Store the stage trace of a job's latest attempt"""
+    async with db_manager.writer() as db:
+        await db.execute(
+            "UPDATE extraction_jobs SET trace = ? WHERE job_id = ?",
+            (json.dumps(trace), job_id)
+        )
 
-async def list_jobs(limit: int = 100, offset: int = 0) -> list:
-    """List all jobs with pagination"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def get_job_trace(job_id: str) -> Optional[Dict[str, Any]]:
+    """Stored stage trace of a job, or None if the job does not exist"""
+    async with db_manager.reader() as db:
         async with db.execute(
-            """
-            SELECT job_id, filename, status, progress, confidence, created_at, updated_at
+            "SELECT trace_enabled, trace FROM extraction_jobs WHERE job_id = ?",
+            (job_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+
+    if not row:
+        return None
+    return {
+        "job_id": job_id,
+        "trace_enabled": bool(row["trace_enabled"]),
+        "trace": json.loads(row["trace"]) if row["trace"] else None
+    }
+
+def _persist_stage_progress(event: JobEvent):
+    """Record workflow stage progress and partial results published from worker threads (runs on the loop)"""
+    if event.type in ("stage", "partial"):
+        db_manager.queue_progress(event.job_id, event.status, event.progress)
+    if event.type == "partial":
+        db_manager.queue_partial_result(event.job_id, json.dumps(event.data["result"]))
+
+event_bus.add_listener(_persist_stage_progress)
+
+def encode_cursor(created_at: str, job_id: str) -> str:
+    """Opaque cursor for the position after a listed job"""
+    return base64.urlsafe_b64encode(json.dumps([created_at, job_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return str(created_at), str(job_id)
+
+def _job_filters(
+    batch_id: str = None,
+    status: str = None,
+    document_type: str = None,
+    min_confidence: float = None,
+    max_confidence: float = None,
+    created_after: str = None,
+    created_before: str = None
+) -> Tuple[List[str], List[Any]]:
+    """WHERE clauses and parameters for the listing filters"""
+    clauses, params = [], []
+    if batch_id is not None:
+        clauses.append("batch_id = ?")
+        params.append(batch_id)
+    if status is not None:
+        clauses.append("status = ?")
+        params.append(status)
+    if document_type is not None:
+        clauses.append("document_type = ?")
+        params.append(document_type)
+    if min_confidence is not None:
+        clauses.append("confidence >= ?")
+        params.append(min_confidence)
+    if max_confidence is not None:
+        clauses.append("confidence <= ?")
+        params.append(max_confidence)
+    if created_after is not None:
+        clauses.append("created_at >= ?")
+        params.append(created_after)
+    if created_before is not None:
+        clauses.append("created_at < ?")
+        params.append(created_before)
+    return clauses, params
+
+async def list_jobs(limit: int = 100, cursor: str = None, **filters) -> Dict[str, Any]:
+    """List jobs newest first using keyset pagination on (created_at, job_id).
+
+    Returns the page and the cursor for the next page (None on the last page).
+    """
+    clauses, params = _job_filters(**filters)
+    if cursor:
+        clauses.append("(created_at, job_id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    async with db_manager.reader() as db:
+        async with db.execute(
+            f"""
+            SELECT job_id, filename, status, progress, confidence, document_type, batch_id, created_at, updated_at
             FROM extraction_jobs
-            ORDER BY created_at DESC
-            LIMIT ? OFFSET ?
+            {where}
+            ORDER BY created_at DESC, job_id DESC
+            LIMIT ?
             """,
-            (limit, offset)
+            (*params, limit + 1)
+        ) as db_cursor:
+            rows = [dict(row) for row in await db_cursor.fetchall()]
+
+    jobs = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(jobs[-1]["created_at"], jobs[-1]["job_id"])
+    return {"jobs": jobs, "next_cursor": next_cursor}
+
+async def count_jobs(**filters) -> int:
+    """Number of jobs matching the filters.
+
+    Status and document type filters are answered from the trigger-maintained
+    job_counts table; batch, confidence and date filters fall back to an indexed COUNT.
+    """
+    if any(filters.get(key) is not None for key in
+           ("batch_id", "min_confidence", "max_confidence", "created_after", "created_before")):
+        clauses, params = _job_filters(**filters)
+        async with db_manager.reader() as db:
+            async with db.execute(
+                f"SELECT COUNT(*) FROM extraction_jobs WHERE {' AND '.join(clauses)}",
+                params
+            ) as cursor:
+                return (await cursor.fetchone())[0]
+
+    clauses, params = [], []
+    if filters.get("status") is not None:
+        clauses.append("status = ?")
+        params.append(filters["status"])
+    if filters.get("document_type") is not None:
+        clauses.append("document_type = ?")
+        params.append(filters["document_type"])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    async with db_manager.reader() as db:
+        async with db.execute(f"SELECT COALESCE(SUM(count), 0) FROM job_counts {where}", params) as cursor:
+            return (await cursor.fetchone())[0]
+
+def _model_name() -> str:
+    """Models whose output is cached"""
+    return f"{settings.GEMINI_FLASH_MODEL}+{settings.GEMINI_PRO_MODEL}"
+
+def _cache_key(content_hash: str, prompt_version: str, model_name: str) -> str:
+    """Cache key for a document hash under a prompt version and model"""
+    return hashlib.sha256(f"{content_hash}:{prompt_version}:{model_name}".encode()).hexdigest()
+
+async def get_cached_extraction(content_hash: str, prompt_version: str) -> Optional[Dict[str, Any]]:
+    """Look up a previous extraction of identical content"""
+    cache_key = _cache_key(content_hash, prompt_version, _model_name())
+    async with db_manager.reader() as db:
+        async with db.execute(
+            """
+            SELECT normalized_data, confidence FROM extraction_cache
+            WHERE cache_key = ? AND created_at >= datetime('now', ?)
+            """,
+            (cache_key, f"-{settings.EXTRACTION_CACHE_MAX_AGE_DAYS} days")
         ) as cursor:
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            row = await cursor.fetchone()
+
+    if not row:
+        _cache_counters["misses"] += 1
+        record_cache_lookup("extraction", hit=False)
+        return None
+
+    async with db_manager.writer() as db:
+        await db.execute(
+            """
+            UPDATE extraction_cache
+            SET hit_count = hit_count + 1, last_hit_at = CURRENT_TIMESTAMP
+            WHERE cache_key = ?
+            """,
+            (cache_key,)
+        )
+
+    _cache_counters["hits"] += 1
+    record_cache_lookup("extraction", hit=True)
+    normalized_data = json.loads(row["normalized_data"])
+    ontology = get_ontology()
+    if normalized_data.get("ontology_version") != ontology.version:
+        # Cached under an earlier ontology: the model output still holds, its normalization does not
+        normalized_data = ontology.normalize_result(normalized_data)
+    return {
+        "normalized_data": normalized_data,
+        "confidence": row["confidence"]
+    }
+
+async def store_cached_extraction(
+    content_hash: str,
+    prompt_version: str,
+    normalized_data: Dict[str, Any],
+    confidence: float
+):
+    """Store a successful extraction and evict stale or excess entries"""
+    model_name = _model_name()
+    cache_key = _cache_key(content_hash, prompt_version, model_name)
+    async with db_manager.writer() as db:
+        await db.execute(
+            """
+            INSERT OR REPLACE INTO extraction_cache
+                (cache_key, content_hash, prompt_version, model_name, normalized_data, confidence)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (cache_key, content_hash, prompt_version, model_name, json.dumps(normalized_data), confidence)
+        )
+        _cache_counters["stores"] += 1
+        await _evict_cache(db)
+
+async def _evict_cache(db):
+    """Drop entries past the max age, then least recently hit entries over the size limit"""
+    cursor = await db.execute(
+        "DELETE FROM extraction_cache WHERE created_at < datetime('now', ?)",
+        (f"-{settings.EXTRACTION_CACHE_MAX_AGE_DAYS} days",)
+    )
+    evicted = cursor.rowcount
+    cursor = await db.execute(
+        """
+        DELETE FROM extraction_cache WHERE cache_key IN (
+            SELECT cache_key FROM extraction_cache
+            ORDER BY last_hit_at DESC
+            LIMIT -1 OFFSET ?
+        )
+        """,
+        (settings.EXTRACTION_CACHE_MAX_ENTRIES,)
+    )
+    evicted += cursor.rowcount
+    _cache_counters["evictions"] += max(evicted, 0)
+
+def extraction_cache_stats() -> Dict[str, Any]:
+    """Process-local extraction cache counters"""
+    lookups = _cache_counters["hits"] + _cache_counters["misses"]
+    return {
+        **_cache_counters,
+        "hit_rate": round(_cache_counters["hits"] / lookups, 3) if lookups else 0.0
+    }
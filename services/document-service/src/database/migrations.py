@@ -0,0 +1,263 @@
+"""Versioned schema migrations tracked with SQLite's user_version pragma"""
+import json
+import logging
+from typing import Awaitable, Callable, List, Tuple
+
+from .results import encode_result, RESULT_ENCODING
+
+logger = logging.getLogger(__name__)
+
+
+async def _ensure_column(db, table: str, column: str, definition: str):
+    """Add a column to an existing table if it is missing"""
+    async with db.execute(f"PRAGMA table_info({table})") as cursor:
+        columns = {row[1] for row in await cursor.fetchall()}
+    if column not in columns:
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+async def _initial_schema(db):
+    """Jobs, extraction cache and parsed document store (idempotent for pre-migration databases)"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_jobs (
+            job_id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            file_size INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            progress INTEGER DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            confidence REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await _ensure_column(db, "extraction_jobs", "content_hash", "TEXT")
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_cache (
+            cache_key TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            model_name TEXT NOT NULL,
+            normalized_data TEXT NOT NULL,
+            confidence REAL,
+            hit_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_hit_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_hit ON extraction_cache (last_hit_at)"
+    )
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS parsed_documents (
+            file_hash TEXT NOT NULL,
+            parser_version TEXT NOT NULL,
+            page_count INTEGER NOT NULL,
+            pages_parsed INTEGER NOT NULL,
+            char_count INTEGER NOT NULL,
+            pages BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (file_hash, parser_version)
+        )
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parsed_documents_last_accessed ON parsed_documents (last_accessed_at)"
+    )
+
+
+async def _job_listing_indexes(db):
+    """Document type column, keyset indexes for listing and trigger-maintained job counts"""
+    await _ensure_column(db, "extraction_jobs", "document_type", "TEXT")
+    await db.execute("""
+        UPDATE extraction_jobs SET document_type = json_extract(result, '$.document_type')
+        WHERE document_type IS NULL AND result IS NOT NULL AND json_valid(result)
+    """)
+
+    # Every listing orders by (created_at, job_id); filtered listings seek on the prefix
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_created ON extraction_jobs (created_at, job_id)"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON extraction_jobs (status, created_at, job_id)"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_type_created "
+        "ON extraction_jobs (document_type, created_at, job_id)"
+    )
+
+    # Row counts per (status, document_type), kept current by triggers
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS job_counts (
+            status TEXT NOT NULL,
+            document_type TEXT NOT NULL DEFAULT '',
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (status, document_type)
+        )
+    """)
+    await db.execute("DELETE FROM job_counts")
+    await db.execute("""
+        INSERT INTO job_counts (status, document_type, count)
+        SELECT status, COALESCE(document_type, ''), COUNT(*)
+        FROM extraction_jobs GROUP BY status, COALESCE(document_type, '')
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_job_counts_insert AFTER INSERT ON extraction_jobs
+        BEGIN
+            INSERT INTO job_counts (status, document_type, count)
+            VALUES (NEW.status, COALESCE(NEW.document_type, ''), 1)
+            ON CONFLICT (status, document_type) DO UPDATE SET count = count + 1;
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_job_counts_delete AFTER DELETE ON extraction_jobs
+        BEGIN
+            UPDATE job_counts SET count = count - 1
+            WHERE status = OLD.status AND document_type = COALESCE(OLD.document_type, '');
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_job_counts_update AFTER UPDATE OF status, document_type ON extraction_jobs
+        WHEN OLD.status IS NOT NEW.status OR OLD.document_type IS NOT NEW.document_type
+        BEGIN
+            UPDATE job_counts SET count = count - 1
+            WHERE status = OLD.status AND document_type = COALESCE(OLD.document_type, '');
+            INSERT INTO job_counts (status, document_type, count)
+            VALUES (NEW.status, COALESCE(NEW.document_type, ''), 1)
+            ON CONFLICT (status, document_type) DO UPDATE SET count = count + 1;
+        END
+    """)
+
+
+async def _batches(db):
+    """Batch uploads: batches table and the batch each job belongs to"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS batches (
+            batch_id TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            job_count INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await _ensure_column(db, "extraction_jobs", "batch_id", "TEXT")
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_batch ON extraction_jobs (batch_id, status)"
+    )
+
+
+async def _durable_queue(db):
+    """Lease, retry and fair-share columns for the SQLite-backed job queue"""
+    for column, definition in [
+        ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+        ("queued_at", "REAL"),
+        ("next_attempt_at", "REAL"),
+        ("fair_seq", "INTEGER NOT NULL DEFAULT 0"),
+        ("lease_owner", "TEXT"),
+        ("lease_expires_at", "REAL"),
+        ("heartbeat_at", "REAL"),
+    ]:
+        await _ensure_column(db, "extraction_jobs", column, definition)
+
+    # Claimable jobs in fair-share order; expired leases of running jobs
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jobs_claim ON extraction_jobs (fair_seq, queued_at)
+        WHERE status = 'pending' AND queued_at IS NOT NULL
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jobs_lease ON extraction_jobs (lease_expires_at)
+        WHERE status = 'processing'
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS job_queue_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            virtual_now INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    await db.execute("INSERT OR IGNORE INTO job_queue_state (id, virtual_now) VALUES (1, 0)")
+
+
+async def _job_traces(db):
+    # Opt-in per-job stage traces, kept with the job row
+    await _ensure_column(db, "extraction_jobs", "trace_enabled", "INTEGER NOT NULL DEFAULT 0")
+    await _ensure_column(db, "extraction_jobs", "trace", "TEXT")
+
+
+async def _partial_results(db):
+    # Fields extracted so far by a running job, cleared when it finishes
+    await _ensure_column(db, "extraction_jobs", "partial_result", "TEXT")
+
+
+async def _job_results(db):
+    """Results move out of the job row into compressed blobs, so status reads stay small"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS job_results (
+            job_id TEXT PRIMARY KEY,
+            etag TEXT NOT NULL,
+            encoding TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            body BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    async with db.execute("SELECT job_id, result FROM extraction_jobs WHERE result IS NOT NULL") as cursor:
+        rows = await cursor.fetchall()
+    for job_id, result in rows:
+        etag, size, body = encode_result(json.loads(result))
+        await db.execute(
+            "INSERT OR REPLACE INTO job_results (job_id, etag, encoding, size, body) VALUES (?, ?, ?, ?, ?)",
+            (job_id, etag, RESULT_ENCODING, size, body)
+        )
+    # The column stays (SQLite before 3.35 cannot drop columns) but is no longer written
+    await db.execute("UPDATE extraction_jobs SET result = NULL WHERE result IS NOT NULL")
+    logger.info(f"Moved {len(rows)} job results to job_results")
+
+
+async def _ocr_pages(db):
+    # OCR text per rendered page, so re-uploads and shared pages are not OCRed twice
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS ocr_pages (
+            page_hash TEXT NOT NULL,
+            engine TEXT NOT NULL,
+            text TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (page_hash, engine)
+        )
+    """)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_ocr_pages_last_accessed ON ocr_pages (last_accessed_at)")
+
+
+# Append only; a database at user_version N has had the first N migrations applied
+MIGRATIONS: List[Tuple[str, Callable[..., Awaitable[None]]]] = [
+    ("initial schema", _initial_schema),
+    ("job listing indexes and counts", _job_listing_indexes),
+    ("batches", _batches),
+    ("durable job queue", _durable_queue),
+    ("job traces", _job_traces),
+    ("partial results", _partial_results),
+    ("job results table", _job_results),
+    ("OCR page cache", _ocr_pages),
+]
+
+
+async def apply_migrations(db) -> int:
+    """Apply pending migrations in order, each in its own transaction; returns the schema version"""
+    async with db.execute("PRAGMA user_version") as cursor:
+        version = (await cursor.fetchone())[0]
+
+    for number, (description, migrate) in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info(f"Applying migration {number}: {description}")
+        # Explicit BEGIN so DDL is rolled back with the rest on failure
+        await db.execute("BEGIN")
+        try:
+            await migrate(db)
+            # PRAGMA does not accept bound parameters
+            await db.execute(f"PRAGMA user_version = {number}")
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    return len(MIGRATIONS)
@@ -0,0 +1,43 @@
+"""Persistent OCR text per page, keyed by a hash of the rendered page content and the OCR engine"""
+from contextlib import closing
+from typing import Dict, Iterable
+
+from .cache_tables import connect, evict
+from ..config import settings
+from ..utils.metrics import DB_QUERY_SECONDS
+
+
+def get_ocr_texts(page_hashes: Iterable[str], engine: str) -> Dict[str, str]:
+    """Cached OCR text for whichever of the pages have been OCRed before"""
+    page_hashes = list(page_hashes)
+    if not page_hashes:
+        return {}
+    placeholders = ",".join("?" * len(page_hashes))
+    with DB_QUERY_SECONDS.time(mode="ocr_cache"), closing(connect()) as db:
+        rows = db.execute(
+            f"SELECT page_hash, text FROM ocr_pages WHERE engine = ? AND page_hash IN ({placeholders})",
+            (engine, *page_hashes)
+        ).fetchall()
+        if rows:
+            db.execute(
+                f"""
+                UPDATE ocr_pages SET last_accessed_at = CURRENT_TIMESTAMP
+                WHERE engine = ? AND page_hash IN ({",".join("?" * len(rows))})
+                """,
+                (engine, *(row[0] for row in rows))
+            )
+            db.commit()
+    return dict(rows)
+
+
+def store_ocr_texts(texts: Dict[str, str], engine: str):
+    """Save OCR text by page hash and evict old entries"""
+    if not texts:
+        return
+    with DB_QUERY_SECONDS.time(mode="ocr_cache"), closing(connect()) as db:
+        db.executemany(
+            "INSERT OR REPLACE INTO ocr_pages (page_hash, engine, text) VALUES (?, ?, ?)",
+            [(page_hash, engine, text) for page_hash, text in texts.items()]
+        )
+        evict(db, "ocr_pages", settings.OCR_CACHE_MAX_AGE_DAYS, settings.OCR_CACHE_MAX_PAGES)
+        db.commit()
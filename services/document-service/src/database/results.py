@@ -0,0 +1,112 @@
+"""Extraction results stored as compressed blobs apart from the job status row"""
+import hashlib
+import json
+import logging
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from .connection import db_manager
+
+logger = logging.getLogger(__name__)
+
+RESULT_ENCODING = "zlib-json"
+
+
+def encode_result(result: Dict[str, Any]) -> Tuple[str, int, bytes]:
+    """(etag, uncompressed size, compressed body) of a result; the etag is a hash of its JSON"""
+    data = json.dumps(result, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(data).hexdigest()[:32], len(data), zlib.compress(data, 6)
+
+
+def decode_result(encoding: str, body: bytes) -> Dict[str, Any]:
+    if encoding != RESULT_ENCODING:
+        raise ValueError(f"Unknown result encoding: {encoding}")
+    return json.loads(zlib.decompress(body))
+
+
+async def store_job_results(db, results: List[Tuple[str, Dict[str, Any]]]):
+    """Write (job_id, result) pairs within the caller's write transaction"""
+    rows = []
+    for job_id, result in results:
+        etag, size, body = encode_result(result)
+        rows.append((job_id, etag, RESULT_ENCODING, size, body))
+    await db.executemany(
+        """
+        INSERT OR REPLACE INTO job_results (job_id, etag, encoding, size, body)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        rows
+    )
+
+
+async def get_job_result_etag(job_id: str) -> Optional[str]:
+    """ETag of a job's stored result without reading the blob"""
+    async with db_manager.reader() as db:
+        async with db.execute("SELECT etag FROM job_results WHERE job_id = ?", (job_id,)) as cursor:
+            row = await cursor.fetchone()
+    return row["etag"] if row else None
+
+
+async def get_job_result(job_id: str) -> Optional[Dict[str, Any]]:
+    """A job's result as {etag, result}, or None if it has none"""
+    async with db_manager.reader() as db:
+        async with db.execute(
+            "SELECT etag, encoding, body FROM job_results WHERE job_id = ?",
+            (job_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+    if not row:
+        return None
+    return {"etag": row["etag"], "result": decode_result(row["encoding"], row["body"])}
+
+
+async def renormalize_job_results(engine, batch_size: int = 500, force: bool = False) -> Dict[str, Any]:
+    """Re-normalize every stored result under ``engine``'s ontology in one keyset pass over job_results.
+
+    Rows are read ``batch_size`` at a time in job_id order and written back in
+    one transaction per batch, so the API keeps serving between batches.
+    Results already at the engine's ontology version are skipped unless
+    ``force``; results without an ``extraction`` (normalization never ran)
+    are left alone.
+    """
+    stats = {"scanned": 0, "renormalized": 0, "skipped": 0}
+    started = time.perf_counter()
+    last_job_id = ""
+    while True:
+        async with db_manager.reader() as db:
+            async with db.execute(
+                "SELECT job_id, encoding, body FROM job_results WHERE job_id > ? ORDER BY job_id LIMIT ?",
+                (last_job_id, batch_size)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        if not rows:
+            break
+        last_job_id = rows[-1]["job_id"]
+        stats["scanned"] += len(rows)
+
+        job_ids, pending = [], []
+        for row in rows:
+            result = decode_result(row["encoding"], row["body"])
+            if "extraction" not in result or (result.get("ontology_version") == engine.version and not force):
+                stats["skipped"] += 1
+                continue
+            job_ids.append(row["job_id"])
+            pending.append(result)
+
+        updates = []
+        for job_id, result in zip(job_ids, engine.normalize_batch(pending)):
+            etag, size, body = encode_result(result)
+            updates.append((etag, size, body, job_id))
+        if updates:
+            async with db_manager.writer() as db:
+                await db.executemany("UPDATE job_results SET etag = ?, size = ?, body = ? WHERE job_id = ?", updates)
+            stats["renormalized"] += len(updates)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["records_per_second"] = round(stats["scanned"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    logger.info(
+        f"Re-normalized {stats['renormalized']} of {stats['scanned']} stored results to {engine.version} "
+        f"in {stats['seconds']}s ({stats['records_per_second']} records/s)"
+    )
+    return stats
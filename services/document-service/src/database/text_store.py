@@ -0,0 +1,57 @@
+"""Persistent store of parsed document text keyed by file hash and parser version"""
+import json
+import logging
+import zlib
+from contextlib import closing
+from typing import Optional
+
+from .cache_tables import connect, evict
+from ..config import settings
+from ..core.parsers.pdf_parser import ParsedDocument
+from ..utils.metrics import DB_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def get_parsed_document(file_hash: str, parser_version: str) -> Optional[ParsedDocument]:
+    """Load previously parsed pages for a file, or None"""
+    with DB_QUERY_SECONDS.time(mode="text_store"), closing(connect()) as db:
+        row = db.execute(
+            """
+            SELECT page_count, pages FROM parsed_documents
+            WHERE file_hash = ? AND parser_version = ?
+            """,
+            (file_hash, parser_version)
+        ).fetchone()
+        if not row:
+            return None
+
+        db.execute(
+            """
+            UPDATE parsed_documents SET last_accessed_at = CURRENT_TIMESTAMP
+            WHERE file_hash = ? AND parser_version = ?
+            """,
+            (file_hash, parser_version)
+        )
+        db.commit()
+
+    document = ParsedDocument(page_count=row[0])
+    for text in json.loads(zlib.decompress(row[1])):
+        document.add_page(text)
+    return document
+
+
+def store_parsed_document(file_hash: str, parser_version: str, document: ParsedDocument):
+    """Save parsed pages (zlib-compressed) and evict old entries"""
+    pages = zlib.compress(json.dumps([page.text for page in document.pages]).encode(), 6)
+    with DB_QUERY_SECONDS.time(mode="text_store"), closing(connect()) as db:
+        db.execute(
+            """
+            INSERT OR REPLACE INTO parsed_documents
+                (file_hash, parser_version, page_count, pages_parsed, char_count, pages)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (file_hash, parser_version, document.page_count, len(document.pages), document.char_count, pages)
+        )
+        evict(db, "parsed_documents", settings.TEXT_STORE_MAX_AGE_DAYS, settings.TEXT_STORE_MAX_ENTRIES)
+        db.commit()
@@ -1,12 +1,22 @@
 """LMA Synapse Document Service - FastAPI Application"""
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from .config import settings
-from .database.jobs import init_db
+from .database.jobs import init_db, close_db, extraction_cache_stats
 from .api.routes.upload import router as upload_router
+from .api.routes.batches import router as batches_router
+from .workflows.scheduler import scheduler
+from .workflows.registry import registry
+from .workflows.llm_client import llm_client_stats
+from .utils.events import event_bus
+from .utils.metrics import metrics
+from .core.parsers.pdf_parser import shutdown_pdf_pool
+from .core.extractors.rule_classifier import classifier_stats
 
 # Configure logging
 logging.basicConfig(
@@ -23,9 +33,15 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
     logger.info(f"Gemini API configured with models: {settings.GEMINI_FLASH_MODEL}, {settings.GEMINI_PRO_MODEL}")
+    registry.warm()
+    event_bus.bind(asyncio.get_running_loop())
+    await scheduler.start(run_workers=settings.RUN_WORKERS_IN_API)
     yield
     # Shutdown
     logger.info("Shutting down...")
+    await scheduler.stop()
+    shutdown_pdf_pool()
+    await close_db()
 
 # Create FastAPI app
 app = FastAPI(
@@ -46,6 +62,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(upload_router)
+app.include_router(batches_router)
 
 @app.get("/")
 async def root():
@@ -62,9 +79,19 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "gemini_configured": bool(settings.GEMINI_API_KEY and settings.GEMINI_API_KEY != "your_gemini_api_key_here")
+        "gemini_configured": bool(settings.GEMINI_API_KEY and settings.GEMINI_API_KEY != "your_gemini_api_key_here"),
+        "scheduler": await scheduler.stats(),
+        "extraction_cache": extraction_cache_stats(),
+        "classifier": classifier_stats.snapshot(),
+        "events": event_bus.stats(),
+        "llm": llm_client_stats()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Stage, Gemini, cache and database metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,35 @@
+"""Re-normalize stored job results after an ontology change: python -m src.renormalize [--force]"""
+import argparse
+import asyncio
+import logging
+
+from .config import settings
+from .database.jobs import init_db, close_db
+from .database.results import renormalize_job_results
+from .core.mappers.ontology_mapper import get_ontology
+
+# Configure logging
+logging.basicConfig(
+    level=settings.LOG_LEVEL,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+async def main(batch_size: int, force: bool):
+    """Bring every stored result to the configured ontology version"""
+    await init_db()
+    try:
+        stats = await renormalize_job_results(get_ontology(), batch_size=batch_size, force=force)
+    finally:
+        await close_db()
+    print(
+        f"{stats['renormalized']} re-normalized, {stats['skipped']} skipped of {stats['scanned']} results "
+        f"in {stats['seconds']}s ({stats['records_per_second']} records/s)"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--force", action="store_true", help="Also re-run results already at the current version")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.force))
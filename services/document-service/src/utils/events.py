@@ -0,0 +1,160 @@
+"""In-process pub/sub for job progress events"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"completed", "failed", "deleted"}
+
+
+@dataclass
+class JobEvent:
+    """A job status change or a finished workflow stage"""
+    job_id: str
+    type: str  # "status", "stage" or "partial" (fields extracted so far)
+    status: str
+    progress: int
+    stage: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def terminal(self) -> bool:
+        return self.type == "status" and self.status in TERMINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class Subscription:
+    """Bounded per-subscriber buffer.
+
+    A slow client never blocks publishers: when the buffer is full the oldest
+    non-terminal event is dropped, and terminal events are always kept.
+    """
+
+    def __init__(self, job_id: Optional[str], max_size: int):
+        self.job_id = job_id
+        self.max_size = max(1, max_size)
+        self.dropped = 0
+        self._events: Deque[JobEvent] = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, event: JobEvent):
+        if len(self._events) >= self.max_size:
+            for index, queued in enumerate(self._events):
+                if not queued.terminal:
+                    del self._events[index]
+                    self.dropped += 1
+                    break
+        self._events.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[JobEvent]:
+        """Next event, or None if the timeout passes first"""
+        if not self._events:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._events.popleft()
+
+
+class EventBus:
+    """Fans job events out to subscribers on the event loop.
+
+    ``publish`` may be called from workflow threads; delivery is marshalled
+    onto the loop with ``call_soon_threadsafe`` so subscribers and listeners
+    only ever run on the loop thread.
+    """
+
+    def __init__(self, subscriber_queue_size: int, history_size: int = 1000):
+        self.subscriber_queue_size = subscriber_queue_size
+        self.history_size = history_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[Optional[str], Set[Subscription]] = {}
+        self._listeners: List[Callable[[JobEvent], None]] = []
+        self._last_event: "OrderedDict[str, JobEvent]" = OrderedDict()
+        self._published = 0
+        self._dropped = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Deliver events on this loop"""
+        self._loop = loop
+
+    def add_listener(self, callback: Callable[[JobEvent], None]):
+        """Call ``callback`` on the loop thread for every event"""
+        self._listeners.append(callback)
+
+    def publish(self, event: JobEvent):
+        """Publish from the loop or from any thread"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is not None:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = running
+            if running is self._loop:
+                self._dispatch(event)
+                return
+
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            logger.debug(f"[Job {event.job_id}] No event loop bound; dropping {event.type} event")
+            return
+        loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: JobEvent):
+        self._published += 1
+        self._last_event[event.job_id] = event
+        self._last_event.move_to_end(event.job_id)
+        while len(self._last_event) > self.history_size:
+            self._last_event.popitem(last=False)
+
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Event listener failed: {str(e)}")
+
+        for key in (event.job_id, None):
+            for subscription in self._subscribers.get(key, ()):
+                subscription.put(event)
+
+    def subscribe(self, job_id: Optional[str] = None) -> Subscription:
+        """Subscribe to one job's events, or to every job with ``job_id=None``"""
+        subscription = Subscription(job_id, self.subscriber_queue_size)
+        self._subscribers.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.job_id)
+        if subscribers is not None and subscription in subscribers:
+            subscribers.discard(subscription)
+            self._dropped += subscription.dropped
+            if not subscribers:
+                del self._subscribers[subscription.job_id]
+
+    def last_event(self, job_id: str) -> Optional[JobEvent]:
+        """Most recent event for a job, if still in the history window"""
+        return self._last_event.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        subscriptions = [s for subs in self._subscribers.values() for s in subs]
+        return {
+            "published": self._published,
+            "subscribers": len(subscriptions),
+            "dropped": self._dropped + sum(s.dropped for s in subscriptions),
+        }
+
+
+event_bus = EventBus(subscriber_queue_size=settings.EVENT_SUBSCRIBER_QUEUE_SIZE)
@@ -0,0 +1,175 @@
+"""File handling utilities for uploaded documents"""
+import hashlib
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import aiofiles
+
+# Magic bytes for supported document formats (DOCX is a ZIP container)
+FILE_SIGNATURES = {
+    b"%PDF-": ".pdf",
+    b"PK\x03\x04": ".docx",
+}
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+class FileTypeMismatchError(ValueError):
+    """Raised when file content does not match its extension"""
+
+
+@dataclass
+class StoredUpload:
+    """Result of streaming an upload to disk"""
+    path: Path
+    size: int
+    content_hash: str
+    detected_type: Optional[str]
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file on disk, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sniff_file_type(head: bytes) -> Optional[str]:
+    """Detect document type from the leading bytes of a file"""
+    for signature, extension in FILE_SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+async def stream_upload_to_disk(
+    upload,
+    destination: Path,
+    max_bytes: int,
+    chunk_size: int = 1024 * 1024,
+    expected_type: Optional[str] = None
+) -> StoredUpload:
+    """Stream an upload to disk in fixed-size chunks.
+
+    Size limit, SHA-256 hash and type sniffing are all done in the same pass,
+    so peak memory is one chunk. The file is written to a ``.part`` path and
+    only renamed into place once fully received; on any error it is removed.
+    """
+    partial_path = destination.with_name(destination.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
+    detected_type = None
+
+    try:
+        async with aiofiles.open(partial_path, "wb") as f:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+
+                if size == 0:
+                    detected_type = sniff_file_type(chunk)
+                    if expected_type and detected_type != expected_type:
+                        raise FileTypeMismatchError(
+                            f"File content does not match extension {expected_type}"
+                        )
+
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+                digest.update(chunk)
+                await f.write(chunk)
+
+        if size == 0:
+            raise FileTypeMismatchError("Uploaded file is empty")
+
+        partial_path.replace(destination)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+
+    return StoredUpload(
+        path=destination,
+        size=size,
+        content_hash=digest.hexdigest(),
+        detected_type=detected_type
+    )
+
+
+def iter_archive_documents(
+    archive_path: Path,
+    allowed_extensions: List[str],
+    max_members: int,
+    max_member_bytes: int,
+    destination_for: Callable[[str], Path],
+    chunk_size: int = 1024 * 1024
+) -> Iterator[Tuple[str, Optional[StoredUpload], Optional[str]]]:
+    """Extract supported documents from a zip archive one member at a time.
+
+    Yields ``(member name, stored file, None)`` for each extracted document and
+    ``(member name, None, reason)`` for skipped ones. ``destination_for`` maps
+    a file extension to the path to write. Sizes are enforced on the bytes
+    actually decompressed, not the sizes the archive declares.
+    """
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not PurePosixPath(info.filename).name.startswith(".")
+            and "__MACOSX" not in PurePosixPath(info.filename).parts
+        ]
+        extracted = 0
+        for info in members:
+            name = PurePosixPath(info.filename).name
+            extension = PurePosixPath(name).suffix.lower()
+            if extension not in allowed_extensions:
+                yield name, None, f"Unsupported file type {extension or '(none)'}"
+                continue
+            if extracted >= max_members:
+                yield name, None, f"Archive has more than {max_members} documents"
+                continue
+
+            destination = destination_for(extension)
+            partial_path = destination.with_name(destination.name + ".part")
+            digest = hashlib.sha256()
+            size = 0
+            detected_type = None
+            try:
+                with archive.open(info) as source, open(partial_path, "wb") as target:
+                    while chunk := source.read(chunk_size):
+                        if size == 0:
+                            detected_type = sniff_file_type(chunk)
+                            if detected_type != extension:
+                                raise FileTypeMismatchError(
+                                    f"File content does not match extension {extension}"
+                                )
+                        size += len(chunk)
+                        if size > max_member_bytes:
+                            raise UploadTooLargeError(f"Document exceeds {max_member_bytes} bytes")
+                        digest.update(chunk)
+                        target.write(chunk)
+                if size == 0:
+                    raise FileTypeMismatchError("File is empty")
+                partial_path.replace(destination)
+            except (ValueError, zipfile.BadZipFile, RuntimeError) as e:
+                # RuntimeError: encrypted member
+                partial_path.unlink(missing_ok=True)
+                yield name, None, str(e)
+                continue
+            except BaseException:
+                partial_path.unlink(missing_ok=True)
+                raise
+
+            extracted += 1
+            yield name, StoredUpload(
+                path=destination,
+                size=size,
+                content_hash=digest.hexdigest(),
+                detected_type=detected_type
+            ), None
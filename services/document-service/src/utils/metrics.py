@@ -0,0 +1,395 @@
+"""In-process metrics (histograms, counters, gauges) in Prometheus text format, and per-job traces"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Seconds, from a fast SQLite read to a long Gemini Pro call
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Characters or tokens
+SIZE_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, LabelValues, Sequence[str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, names, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic total per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", key, self.labelnames, value) for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set"""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket, then sum and count
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the wall time of the block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels: Any) -> Dict[str, float]:
+        with self._lock:
+            counts = list(self._values.get(self._key(labels), [0.0] * (len(self.buckets) + 2)))
+        return {"count": counts[-1], "sum": counts[-2]}
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(counts)) for key, counts in self._values.items())
+        names = self.labelnames + ("le",)
+        samples = []
+        for key, counts in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(("_bucket", key + (_format_value(bound),), names, cumulative))
+            samples.append(("_sum", key, self.labelnames, counts[-2]))
+            samples.append(("_count", key, self.labelnames, counts[-1]))
+        return samples
+
+
+class Gauge(_Metric):
+    """Current values read from a callback when metrics are scraped"""
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Dict[LabelValues, float]]
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self):
+        return [("", key, self.labelnames, value) for key, value in sorted(self.collect().items())]
+
+
+class MetricsRegistry:
+    """Named metrics of this process, rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Dict[LabelValues, float]]
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, collect))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "synapse_stage_duration_seconds", "Wall time of each extraction workflow stage", ["stage"]
+)
+STAGE_CPU_SECONDS = metrics.histogram(
+    "synapse_stage_cpu_seconds", "CPU time of the thread running each workflow stage", ["stage"]
+)
+STAGE_INPUT_CHARS = metrics.histogram(
+    "synapse_stage_input_chars", "Document characters read by a workflow stage", ["stage"], SIZE_BUCKETS
+)
+LLM_CALL_SECONDS = metrics.histogram(
+    "synapse_llm_call_duration_seconds", "Gemini call latency including retries", ["model", "stage"]
+)
+LLM_TOKENS = metrics.histogram(
+    "synapse_llm_tokens", "Tokens per Gemini call (reported by the API, else estimated)",
+    ["model", "stage", "kind"], SIZE_BUCKETS
+)
+LLM_RETRIES = metrics.counter("synapse_llm_retries_total", "Gemini calls retried after a transient error", ["model"])
+LLM_COST = metrics.counter("synapse_llm_cost_usd_total", "Estimated Gemini spend in US dollars", ["model"])
+CLASSIFY_BATCH_SIZE = metrics.histogram(
+    "synapse_classify_batch_size", "Documents per Flash classification call", buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+)
+CLASSIFY_BATCH_FILL = metrics.histogram(
+    "synapse_classify_batch_fill_ratio", "Documents per classification batch as a share of the maximum batch size",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+)
+CLASSIFY_BATCH_WAIT_SECONDS = metrics.histogram(
+    "synapse_classify_batch_wait_seconds", "Time a classification request waits for its batch to be sent"
+)
+EXTRACTION_FIRST_FIELD_SECONDS = metrics.histogram(
+    "synapse_extraction_first_field_seconds", "Time from starting extraction to its first complete field"
+)
+LLM_JSON_PARSE = metrics.counter(
+    "synapse_llm_json_parse_total", "Model JSON responses by parse result (ok, repaired, failed)", ["result"]
+)
+OCR_PAGES = metrics.counter(
+    "synapse_ocr_pages_total", "PDF pages without a text layer by outcome (cached, ocr, failed)", ["result"]
+)
+OCR_SECONDS = metrics.histogram(
+    "synapse_ocr_duration_seconds", "Wall time to OCR the pages of one extraction wave that missed the cache"
+)
+CACHE_LOOKUPS = metrics.counter("synapse_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+DB_QUERY_SECONDS = metrics.histogram(
+    "synapse_db_query_duration_seconds", "Time a database connection is held per operation", ["mode"]
+)
+DB_WAIT_SECONDS = metrics.histogram(
+    "synapse_db_wait_seconds", "Time spent waiting for a database connection", ["mode"]
+)
+JOB_SECONDS = metrics.histogram(
+    "synapse_job_duration_seconds", "Wall time of one extraction attempt by outcome", ["outcome"]
+)
+
+
+class StageStats:
+    """Work attributed to one workflow stage of one job (written from several threads)"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.input_chars = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.cost_usd = 0.0
+        self._lock = threading.Lock()
+
+    def add_llm_call(self, prompt_tokens: int, completion_tokens: int, retries: int, cost_usd: float):
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.retries += retries
+            self.cost_usd += cost_usd
+
+    def add_cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "wall_ms": round(self.wall_ms, 1),
+            "cpu_ms": round(self.cpu_ms, 1),
+            "input_chars": self.input_chars,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+class JobTrace:
+    """Per-stage record of one extraction attempt, stored with the job when tracing is on"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.stages: List[StageStats] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        stages = [stage.to_dict() for stage in self.stages]
+        return {
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 1),
+            "prompt_tokens": sum(stage["prompt_tokens"] for stage in stages),
+            "completion_tokens": sum(stage["completion_tokens"] for stage in stages),
+            "cost_usd": round(sum(stage["cost_usd"] for stage in stages), 6),
+            "stages": stages,
+        }
+
+
+# Set for the duration of a job (trace) and of each stage; LangGraph and the
+# chunk pool run nodes and calls in threads that copy this context
+_current_trace: contextvars.ContextVar[Optional[JobTrace]] = contextvars.ContextVar("job_trace", default=None)
+_current_stage: contextvars.ContextVar[Optional[StageStats]] = contextvars.ContextVar("job_stage", default=None)
+
+
+@contextmanager
+def trace_job(job_id: str, enabled: bool) -> Iterator[Optional[JobTrace]]:
+    """Collect a JobTrace of the stages run inside the block, or None when tracing is off"""
+    trace = JobTrace(job_id) if enabled else None
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_stage_name() -> str:
+    stage = _current_stage.get()
+    return stage.stage if stage else ""
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[StageStats]:
+    """Time a workflow stage and collect the LLM and cache work done inside it"""
+    stats = StageStats(stage)
+    token = _current_stage.set(stats)
+    started, cpu_started = time.perf_counter(), time.thread_time()
+    try:
+        yield stats
+    finally:
+        _current_stage.reset(token)
+        stats.wall_ms = (time.perf_counter() - started) * 1000
+        stats.cpu_ms = (time.thread_time() - cpu_started) * 1000
+        STAGE_SECONDS.observe(stats.wall_ms / 1000, stage=stage)
+        STAGE_CPU_SECONDS.observe(stats.cpu_ms / 1000, stage=stage)
+        if stats.input_chars:
+            STAGE_INPUT_CHARS.observe(stats.input_chars, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.stages.append(stats)
+
+
+def record_llm_call(
+    model: str,
+    seconds: float,
+    prompt_tokens: int,
+    completion_tokens: int,
+    retries: int,
+    cost_usd: float
+):
+    """Account one completed Gemini call to the metrics and the current stage"""
+    stage = current_stage_name()
+    LLM_CALL_SECONDS.observe(seconds, model=model, stage=stage)
+    LLM_TOKENS.observe(prompt_tokens, model=model, stage=stage, kind="prompt")
+    LLM_TOKENS.observe(completion_tokens, model=model, stage=stage, kind="completion")
+    if retries:
+        LLM_RETRIES.inc(retries, model=model)
+    LLM_COST.inc(cost_usd, model=model)
+    stats = _current_stage.get()
+    if stats is not None:
+        stats.add_llm_call(prompt_tokens, completion_tokens, retries, cost_usd)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+    stats = _current_stage.get()
+    if hit and stats is not None:
+        stats.add_cache_hit()
+
+
+def record_input_chars(chars: int):
+    """Account document text read by the current stage"""
+    stats = _current_stage.get()
+    if stats is not None:
+        stats.input_chars += chars
@@ -0,0 +1,37 @@
+"""Lazily created spawn process pools shared by all extraction jobs"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+
+class SharedProcessPool:
+    """A process pool created on first use and stopped on shutdown.
+
+    ``workers`` is read when the pool is created, so settings changed before
+    first use take effect. Workers are started with spawn: the API process is
+    multi-threaded, so forking is unsafe.
+    """
+
+    def __init__(self, workers: Callable[[], int], initializer: Optional[Callable[[], None]] = None):
+        self._workers = workers
+        self._initializer = initializer
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._workers(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self._initializer
+                )
+            return self._pool
+
+    def shutdown(self):
+        """Stop the pool without waiting for running tasks; the next get() starts a new one"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,40 @@
+"""Standalone extraction worker: claims jobs from the durable queue without serving the API"""
+import asyncio
+import logging
+import signal
+
+from .config import settings
+from .database.jobs import init_db, close_db
+from .workflows.scheduler import scheduler
+from .workflows.registry import registry
+from .utils.events import event_bus
+from .core.parsers.pdf_parser import shutdown_pdf_pool
+
+# Configure logging
+logging.basicConfig(
+    level=settings.LOG_LEVEL,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+async def main():
+    """Run extraction workers until SIGINT/SIGTERM"""
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    await init_db()
+    registry.warm()
+    event_bus.bind(loop)
+    await scheduler.start(run_workers=True)
+    logger.info(f"Extraction worker {scheduler.worker_id} running {settings.MAX_CONCURRENT_JOBS} jobs at a time")
+
+    await stopping.wait()
+    logger.info("Shutting down worker...")
+    await scheduler.stop()
+    shutdown_pdf_pool()
+    await close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""Overlapping document chunking and deterministic merge of per-chunk extractions"""
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.parsers.pdf_parser import ParsedDocument
+
+
+@dataclass
+class DocumentChunk:
+    """A slice of document text sent to the model in one call"""
+    index: int
+    text: str
+    start: int
+    end: int
+    first_page: int
+    last_page: int
+
+
+def _page_at(document: ParsedDocument, offset: int) -> int:
+    """1-based page number containing a character offset"""
+    page_number = 1
+    for page in document.pages:
+        if page.offset > offset:
+            break
+        if page.text:
+            page_number = page.page_number
+    return page_number
+
+
+def split_into_chunks(
+    document: ParsedDocument,
+    chunk_chars: int,
+    overlap_chars: int,
+    max_chunks: Optional[int] = None
+) -> List[DocumentChunk]:
+    """Split document text into overlapping chunks, preferring line breaks as boundaries"""
+    text = document.text
+    chunks = []
+    start = 0
+    overlap_chars = min(overlap_chars, chunk_chars // 2)
+
+    while start < len(text) and (max_chunks is None or len(chunks) < max_chunks):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            # Back off to the last line break in the final tenth of the chunk
+            newline = text.rfind("\n", end - chunk_chars // 10, end)
+            if newline > start:
+                end = newline
+
+        chunks.append(DocumentChunk(
+            index=len(chunks),
+            text=text[start:end],
+            start=start,
+            end=end,
+            first_page=_page_at(document, start),
+            last_page=_page_at(document, max(end - 1, start))
+        ))
+        if end >= len(text):
+            break
+        start = end - overlap_chars
+
+    return chunks
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _dedup_key(value: Any) -> str:
+    """Identity of a list item, ignoring key order, case and surrounding whitespace"""
+    def normalize(v):
+        if isinstance(v, str):
+            return " ".join(v.lower().split())
+        if isinstance(v, dict):
+            return {k: normalize(x) for k, x in v.items() if not _is_empty(x)}
+        if isinstance(v, list):
+            return [normalize(x) for x in v]
+        return v
+    return json.dumps(normalize(value), sort_keys=True, default=str)
+
+
+def _merge_into(
+    target: Dict[str, Any],
+    source: Dict[str, Any],
+    chunk_index: int,
+    provenance: Dict[str, int],
+    path: str
+):
+    for key, value in source.items():
+        field_path = f"{path}.{key}" if path else key
+        if _is_empty(value):
+            continue
+
+        existing = target.get(key)
+        if _is_empty(existing):
+            if isinstance(value, dict):
+                target[key] = {}
+                _merge_into(target[key], value, chunk_index, provenance, field_path)
+            elif isinstance(value, list):
+                target[key] = []
+                _merge_list(target[key], value, chunk_index, provenance, field_path)
+            else:
+                target[key] = value
+                provenance[field_path] = chunk_index
+        elif isinstance(existing, dict) and isinstance(value, dict):
+            _merge_into(existing, value, chunk_index, provenance, field_path)
+        elif isinstance(existing, list) and isinstance(value, list):
+            _merge_list(existing, value, chunk_index, provenance, field_path)
+        # Conflicting scalars: the earliest chunk wins
+
+
+def _merge_list(
+    target: List[Any],
+    items: List[Any],
+    chunk_index: int,
+    provenance: Dict[str, int],
+    path: str
+):
+    seen = {_dedup_key(item) for item in target}
+    for item in items:
+        key = _dedup_key(item)
+        if _is_empty(item) or key in seen:
+            continue
+        seen.add(key)
+        provenance[f"{path}[{len(target)}]"] = chunk_index
+        target.append(item)
+
+
+def merge_extractions(
+    partials: List[Tuple[int, Dict[str, Any]]]
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Merge per-chunk extractions into one result with field-level provenance.
+
+    Partials are merged in chunk order regardless of completion order, so the
+    result is deterministic: the first non-empty scalar wins, nested objects
+    merge recursively, and list items (e.g. covenants) are unioned and
+    de-duplicated. Provenance maps each field path to its source chunk index.
+    """
+    merged: Dict[str, Any] = {}
+    provenance: Dict[str, int] = {}
+    for chunk_index, extraction in sorted(partials, key=lambda p: p[0]):
+        if isinstance(extraction, dict):
+            _merge_into(merged, extraction, chunk_index, provenance, "")
+    return merged, provenance
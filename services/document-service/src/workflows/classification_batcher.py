@@ -0,0 +1,164 @@
+"""Cross-job micro-batching of Flash classification calls"""
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from .registry import registry
+from ..utils.metrics import CLASSIFY_BATCH_SIZE, CLASSIFY_BATCH_FILL, CLASSIFY_BATCH_WAIT_SECONDS
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_DOCUMENT = re.compile(r'<document index="(\d+)">\n(.*?)\n</document>', re.S)
+_ANSWER = re.compile(r"^\W*(\d+)\W+([A-Z_]+)", re.M)
+
+
+def format_batch(texts: List[str]) -> str:
+    """User message of a batched classification call, documents numbered from 1"""
+    return "\n\n".join(f'<document index="{i}">\n{text}\n</document>' for i, text in enumerate(texts, start=1))
+
+
+def split_batch(message: str) -> Dict[int, str]:
+    """Document text by index from a batched classification message"""
+    return {int(index): text for index, text in _DOCUMENT.findall(message)}
+
+
+def parse_batch_response(response: str) -> Dict[int, str]:
+    """Label by document index from "N: LABEL" lines; the first answer for an index wins"""
+    labels: Dict[int, str] = {}
+    for index, label in _ANSWER.findall(response):
+        labels.setdefault(int(index), label)
+    return labels
+
+
+class _Request:
+    __slots__ = ("text", "future", "queued_at", "taken")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.future: Future = Future()
+        self.queued_at = time.perf_counter()
+        self.taken = False
+
+
+class ClassificationBatcher:
+    """Collects classification requests from concurrent jobs into one multi-document Flash call.
+
+    The first caller to arrive leads a batch: it waits until ``window_seconds``
+    after the oldest pending request, or until ``max_size`` requests are
+    pending, then sends them all as one indexed prompt and hands each caller
+    its own label. The others block until their batch is answered; a new
+    leader starts collecting the next batch while one is in flight. A batch
+    of one uses the single-document prompt, and documents missing from a
+    batch answer are retried on their own.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        max_size: int,
+        classify_one: Optional[Callable[[str], str]] = None,
+        classify_many: Optional[Callable[[str], str]] = None
+    ):
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        self._classify_one = classify_one or _flash_classify_one
+        self._classify_many = classify_many or _flash_classify_many
+        self._cond = threading.Condition()
+        self._pending: List[_Request] = []
+        self._leading = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 1 and self.window_seconds > 0
+
+    def classify(self, text: str) -> str:
+        """Document type label for a document's leading text"""
+        if not self.enabled:
+            return self._classify_one(text)
+
+        request = _Request(text)
+        with self._cond:
+            self._pending.append(request)
+            self._cond.notify_all()
+        while True:
+            with self._cond:
+                while not request.taken and self._leading:
+                    self._cond.wait()
+                if request.taken:
+                    break
+                self._leading = True
+                try:
+                    batch = self._collect()
+                finally:
+                    self._leading = False
+                    self._cond.notify_all()
+            # Our own request may not be in the batch we lead if more than max_size were waiting
+            self._send(batch)
+        return request.future.result()
+
+    def _collect(self) -> List[_Request]:
+        """Wait (holding the condition) for a full batch or the oldest request's window, then take it"""
+        deadline = self._pending[0].queued_at + self.window_seconds
+        while len(self._pending) < self.max_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+
+        batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+        dispatched = time.perf_counter()
+        for request in batch:
+            request.taken = True
+            CLASSIFY_BATCH_WAIT_SECONDS.observe(dispatched - request.queued_at)
+        CLASSIFY_BATCH_SIZE.observe(len(batch))
+        CLASSIFY_BATCH_FILL.observe(len(batch) / self.max_size)
+        return batch
+
+    def _send(self, batch: List[_Request]):
+        if len(batch) == 1:
+            self._resolve(batch[0], lambda: self._classify_one(batch[0].text))
+            return
+
+        try:
+            labels = parse_batch_response(self._classify_many(format_batch([r.text for r in batch])))
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        missing = 0
+        for index, request in enumerate(batch, start=1):
+            if index in labels:
+                request.future.set_result(labels[index])
+            else:
+                missing += 1
+                self._resolve(request, lambda: self._classify_one(request.text))
+        if missing:
+            logger.warning(f"Batched classification answered {len(batch) - missing} of {len(batch)}; "
+                           f"classified the rest one by one")
+
+    @staticmethod
+    def _resolve(request: _Request, call: Callable[[], str]):
+        try:
+            request.future.set_result(call())
+        except Exception as e:
+            request.future.set_exception(e)
+
+
+def _flash_classify_one(text: str) -> str:
+    return registry.get_classification_chain().invoke({"text": text}).content.strip()
+
+
+def _flash_classify_many(documents: str) -> str:
+    return registry.get_batch_classification_chain().invoke({"documents": documents}).content
+
+
+# A process never runs more classifications at once than it runs jobs, so batches fill at that size
+classification_batcher = ClassificationBatcher(
+    window_seconds=settings.CLASSIFY_BATCH_WINDOW_MS / 1000,
+    max_size=min(settings.CLASSIFY_BATCH_MAX_SIZE, settings.MAX_CONCURRENT_JOBS)
+)
@@ -0,0 +1,42 @@
+"""In-process store for parsed documents referenced from workflow state"""
+import threading
+from typing import Any, Dict, Optional
+
+from ..core.parsers.pdf_parser import ParsedDocument
+
+
+class DocumentStore:
+    """Parsed documents of running jobs, keyed by reference.
+
+    Graph state only carries the reference, so the text is not copied into
+    every checkpointed state; stages that need more pages than the ones
+    already parsed continue from the stored document.
+    """
+
+    def __init__(self):
+        self._documents: Dict[str, ParsedDocument] = {}
+        self._lock = threading.Lock()
+
+    def put(self, ref: str, document: ParsedDocument):
+        with self._lock:
+            self._documents[ref] = document
+
+    def get(self, ref: str) -> Optional[ParsedDocument]:
+        with self._lock:
+            return self._documents.get(ref)
+
+    def release(self, ref: str):
+        """Drop a job's document once its workflow has finished"""
+        with self._lock:
+            self._documents.pop(ref, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            documents = list(self._documents.values())
+        return {
+            "documents": len(documents),
+            "chars": sum(document.char_count for document in documents),
+        }
+
+
+document_store = DocumentStore()
@@ -0,0 +1,106 @@
+"""Local stand-in for the Gemini chat models, for offline runs and load tests (LLM_PROVIDER=fake)"""
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from .helpers import CLASSIFICATION_PROMPT, CLASSIFICATION_BATCH_PROMPT
+from .classification_batcher import split_batch
+from .llm_client import TokenBucket, estimate_tokens
+from ..core.extractors.rule_classifier import classify_by_rules
+
+
+# Characters per streamed piece, roughly a few tokens like the real API's chunks
+STREAM_PIECE_CHARS = 16
+
+
+class FakeGeminiChat(BaseChatModel):
+    """Answers prompts without the network, raising the errors the real API raises.
+
+    Classification prompts get the rule classifier's label (a "N: LABEL"
+    line per document when batched); extraction prompts get the example
+    JSON from their own system prompt. ``latency_ms`` simulates response
+    time, ``error_rate`` the share of 503 overload errors, and
+    ``requests_per_minute`` a server-side quota enforced with 429s.
+    Streamed responses arrive in small pieces spread over the latency.
+    """
+
+    model: str = "fake-gemini"
+    latency_ms: float = 0.0
+    error_rate: float = 0.0
+    requests_per_minute: int = 0
+    quota: Optional[Any] = None
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        if self.requests_per_minute > 0:
+            # About one second of burst, like a per-second enforced quota
+            self.quota = TokenBucket(self.requests_per_minute, capacity=self.requests_per_minute / 60)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        system = next((m.content for m in messages if isinstance(m, SystemMessage)), "")
+        user = messages[-1].content if messages else ""
+        if system == CLASSIFICATION_PROMPT.template:
+            return classify_by_rules(user).label
+        if system == CLASSIFICATION_BATCH_PROMPT.template:
+            return "\n".join(f"{i}: {classify_by_rules(text).label}" for i, text in split_batch(user).items())
+        start = system.find("{")
+        return system[start:] if start >= 0 else "{}"
+
+    def _check_quota(self):
+        if self.quota is not None and not self.quota.try_acquire():
+            raise ResourceExhausted("Resource has been exhausted (e.g. check quota).")
+
+    def _check_overload(self):
+        if self.error_rate and random.random() < self.error_rate:
+            raise ServiceUnavailable("The model is overloaded. Please try again later.")
+
+    def _metadata(self, messages: List[BaseMessage], text: str) -> Dict[str, Any]:
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        usage = {
+            "prompt_token_count": prompt_tokens,
+            "candidates_token_count": estimate_tokens(text),
+            "total_token_count": prompt_tokens + estimate_tokens(text),
+        }
+        return {"usage_metadata": usage, "model": self.model}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        self._check_quota()
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        self._check_overload()
+
+        text = self._respond(messages)
+        message = AIMessage(content=text, response_metadata=self._metadata(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        self._check_quota()
+        self._check_overload()
+        text = self._respond(messages)
+        pieces = [text[i:i + STREAM_PIECE_CHARS] for i in range(0, len(text), STREAM_PIECE_CHARS)] or [""]
+        for index, piece in enumerate(pieces):
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000 / len(pieces))
+            metadata = self._metadata(messages, text) if index == len(pieces) - 1 else {}
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece, response_metadata=metadata))
@@ -1,47 +1,109 @@
 """Helper functions for document processing"""
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-import PyPDF2
-from docx import Document as DocxDocument
+from typing import Any, Dict, Optional
 
-def read_document(file_path: str) -> str:
+from ..core.parsers.docx_parser import extract_docx_pages
+from ..core.parsers.ocr_engine import engine_key, ocr_enabled
+from ..core.parsers.pdf_parser import ParsedDocument, extract_pdf_pages
+from ..database.text_store import get_parsed_document, store_parsed_document
+from ..utils.file_utils import hash_file
+from ..utils.metrics import record_cache_lookup
+from ..config import settings
+
+@dataclass(frozen=True)
+class PromptSpec:
+    """A prompt template with an explicit version"""
+    name: str
+    version: str
+    template: str
+
+# Bump when a parser's output changes so stored text is re-parsed
+PARSER_VERSIONS = {
+    ".pdf": "pdf-pages-1",
+    ".docx": "docx-blocks-1",
+}
+
+def parser_version(suffix: str) -> str:
+    """Text store version of a parser; PDF text differs with OCR on, and by OCR engine"""
+    version = PARSER_VERSIONS[suffix]
+    if suffix == ".pdf" and ocr_enabled():
+        version = f"{version}+{engine_key()}"
+    return version
+
+def read_document(
+    file_path: str,
+    max_chars: Optional[int] = None,
+    file_hash: Optional[str] = None
+) -> str:
     """Read PDF or DOCX and return text"""
-    path = Path(file_path)
+    text = read_document_pages(file_path, max_chars=max_chars, file_hash=file_hash).text
+    return text[:max_chars] if max_chars is not None else text
+
+def _has_enough(document: ParsedDocument, max_pages: Optional[int], max_chars: Optional[int]) -> bool:
+    """Whether already-parsed pages satisfy a page/character budget"""
+    if document.complete:
+        return True
+    if max_pages is not None and len(document.pages) >= max_pages:
+        return True
+    return max_chars is not None and document.char_count >= max_chars
+
+def read_document_pages(
+    file_path: str,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    file_hash: Optional[str] = None,
+    parsed: Optional[ParsedDocument] = None
+) -> ParsedDocument:
+    """Read PDF or DOCX into per-page text, stopping early at a page or character budget.
 
-    if path.suffix.lower() == ".pdf":
-        return read_pdf(file_path)
-    elif path.suffix.lower() == ".docx":
-        return read_docx(file_path)
+    Parsed pages are persisted in the text store keyed by file hash and parser
+    version, so retries and re-runs only parse pages not seen before. Pages an
+    earlier stage of the same job already parsed can be passed as ``parsed``.
+    """
+    suffix = Path(file_path).suffix.lower()
+    if suffix not in PARSER_VERSIONS:
+        raise ValueError(f"Unsupported file type: {suffix}")
+
+    if parsed is not None and _has_enough(parsed, max_pages, max_chars):
+        return parsed
+
+    cached = parsed
+    if settings.TEXT_STORE_ENABLED:
+        file_hash = file_hash or hash_file(file_path)
+        stored = get_parsed_document(file_hash, parser_version(suffix))
+        if stored is not None and (cached is None or len(stored.pages) > len(cached.pages)):
+            cached = stored
+        hit = cached is not None and _has_enough(cached, max_pages, max_chars)
+        record_cache_lookup("text_store", hit=hit)
+        if hit:
+            return cached
+
+    if suffix == ".pdf":
+        document = extract_pdf_pages(file_path, max_pages=max_pages, max_chars=max_chars, document=cached)
     else:
-        raise ValueError(f"Unsupported file type: {path.suffix}")
+        # DOCX has no fixed pagination; pages are split at section and hard page breaks
+        document = extract_docx_pages(file_path)
+
+    if settings.TEXT_STORE_ENABLED:
+        store_parsed_document(file_hash, parser_version(suffix), document)
+    return document
 
 def read_pdf(file_path: str) -> str:
     """Extract text from PDF"""
-    text = []
-    try:
-        with open(file_path, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text.append(page_text)
-    except Exception as e:
-        raise ValueError(f"Error reading PDF: {str(e)}")
-
-    return "\n".join(text)
+    return extract_pdf_pages(file_path).text
 
 def read_docx(file_path: str) -> str:
-    """Extract text from DOCX"""
-    try:
-        doc = DocxDocument(file_path)
-        text = [para.text for para in doc.paragraphs if para.text.strip()]
-        return "\n".join(text)
-    except Exception as e:
-        raise ValueError(f"Error reading DOCX: {str(e)}")
+    """Extract text from DOCX, including tables"""
+    return extract_docx_pages(file_path).text
 
-def load_extraction_prompt(doc_type: str) -> str:
-    """Load prompt template for document type"""
-    prompts = {
-        "FACILITY_AGREEMENT": """You are an expert loan document analyst. Extract the following from this LMA Facility Agreement:
+# Extraction prompts per document type. Bump a prompt's version whenever its
+# text changes so cached extractions produced by the old prompt are not reused.
+EXTRACTION_PROMPTS: Dict[str, PromptSpec] = {
+    "FACILITY_AGREEMENT": PromptSpec("FACILITY_AGREEMENT", "1", """You are an expert loan document analyst. Extract the following from this LMA Facility Agreement:
 
 1. BORROWER:
    - Legal name
@@ -64,9 +126,9 @@ Return ONLY valid JSON with this exact structure (no markdown, no explanations):
   "borrower": {"name": "Company Name Ltd", "jurisdiction": "England and Wales"},
   "facility": {"amount": 100000000, "currency": "GBP", "type": "Term Loan", "maturity_date": "2028-12-31", "interest_rate": "SONIA + 2.5%"},
   "covenants": [{"type": "Leverage Ratio", "definition": "Total Net Debt to EBITDA", "threshold": 3.5, "frequency": "Quarterly"}]
-}""",
+}"""),
 
-        "AMENDMENT": """Extract amendment details:
+    "AMENDMENT": PromptSpec("AMENDMENT", "1", """Extract amendment details:
 1. Original agreement date
 2. Amendment number
 3. Changes being made
@@ -78,9 +140,9 @@ Return ONLY valid JSON (no markdown):
   "amendment_number": 1,
   "changes": "Increase facility amount",
   "effective_date": "2024-06-01"
-}""",
+}"""),
 
-        "TERM_SHEET": """Extract term sheet details:
+    "TERM_SHEET": PromptSpec("TERM_SHEET", "1", """Extract term sheet details:
 1. Proposed borrower
 2. Facility amount and type
 3. Key terms
@@ -93,7 +155,76 @@ Return ONLY valid JSON (no markdown):
   "facility_type": "Revolving Credit Facility",
   "key_terms": "3-year tenor, quarterly payments",
   "conditions": "Board approval, KYC completion"
-}"""
-    }
+}""")
+}
+
+CLASSIFICATION_PROMPT = PromptSpec("CLASSIFICATION", "1", """You are a loan document classifier. Classify this document as one of:
+- FACILITY_AGREEMENT
+- AMENDMENT
+- TERM_SHEET
+- COMMITMENT_LETTER
+- OTHER
+
+Respond with ONLY the classification, nothing else.""")
+
+# Several jobs' documents in one Flash call; each document is wrapped in <document index="N"> tags
+CLASSIFICATION_BATCH_PROMPT = PromptSpec("CLASSIFICATION_BATCH", "1", """You are a loan document classifier. You will be given several documents, each inside <document index="N"> tags. Classify each document as one of:
+- FACILITY_AGREEMENT
+- AMENDMENT
+- TERM_SHEET
+- COMMITMENT_LETTER
+- OTHER
+
+Respond with one line per document, in index order, formatted as "N: CLASSIFICATION", nothing else.""")
+
+# Combined version of every prompt, part of the extraction cache key
+PROMPT_VERSION = hashlib.sha256(
+    ",".join(
+        f"{spec.name}:{spec.version}"
+        for spec in sorted(
+            [CLASSIFICATION_PROMPT, CLASSIFICATION_BATCH_PROMPT, *EXTRACTION_PROMPTS.values()],
+            key=lambda p: p.name
+        )
+    ).encode()
+).hexdigest()[:12]
+
+def get_extraction_prompt(doc_type: str) -> PromptSpec:
+    """Versioned extraction prompt for a document type"""
+    return EXTRACTION_PROMPTS.get(doc_type, EXTRACTION_PROMPTS["FACILITY_AGREEMENT"])
+
+def load_extraction_prompt(doc_type: str) -> str:
+    """Load prompt template for document type"""
+    return get_extraction_prompt(doc_type).template
+
+@lru_cache(maxsize=None)
+def _schema_from_prompt(template: str) -> Dict[str, Any]:
+    return json.JSONDecoder().raw_decode(template, template.index("{"))[0]
+
+def load_extraction_schema(doc_type: str) -> Dict[str, Any]:
+    """Example JSON structure the extraction prompt asks for, used to repair truncated responses"""
+    return _schema_from_prompt(load_extraction_prompt(doc_type))
+
+# Terms that locate the clauses each extraction schema needs, used to rank sections
+EXTRACTION_QUERY_TERMS = {
+    "FACILITY_AGREEMENT": [
+        "Borrower", "Obligors", "incorporated", "jurisdiction", "registered number",
+        "Facility", "Total Commitments", "Commitment", "amount", "currency",
+        "Term Loan", "Revolving Credit Facility", "Termination Date", "Final Maturity Date", "Repayment",
+        "Interest", "Margin", "SONIA", "EURIBOR", "SOFR", "Benchmark Rate", "per annum",
+        "Financial Covenants", "Leverage", "Total Net Debt", "EBITDA", "Interest Cover",
+        "Test Date", "Relevant Period", "quarterly", "semi-annually"
+    ],
+    "AMENDMENT": [
+        "Amendment", "Amendment and Restatement", "Original Facility Agreement", "dated",
+        "Effective Date", "amended", "amendments", "restated", "increase", "extension",
+        "Margin", "Termination Date", "Commitments"
+    ],
+    "TERM_SHEET": [
+        "Borrower", "Facility", "Amount", "Facility Type", "Tenor", "Purpose", "Pricing",
+        "Margin", "Fees", "Repayment", "Conditions Precedent", "Financial Covenants"
+    ],
+}
 
-    return prompts.get(doc_type, prompts["FACILITY_AGREEMENT"])
+def load_extraction_query_terms(doc_type: str) -> list:
+    """Section-ranking query terms for a document type"""
+    return EXTRACTION_QUERY_TERMS.get(doc_type, EXTRACTION_QUERY_TERMS["FACILITY_AGREEMENT"])
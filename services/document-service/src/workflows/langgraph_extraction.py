@@ -1,159 +1,271 @@
 """LangGraph-based extraction workflow for LMA Synapse"""
-import os
-import json
+import asyncio
 import logging
-from typing import TypedDict, Annotated
+import time
+from typing import Any, Dict, TypedDict, Annotated, Callable
 import operator
+from concurrent.futures import as_completed
 
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langgraph.graph import StateGraph, END
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
 
-from .helpers import read_document, load_extraction_prompt
-from ..database.jobs import update_job_status
+from .helpers import read_document_pages, load_extraction_query_terms, load_extraction_schema, PROMPT_VERSION
+from .response_parser import parse_json_response, IncrementalObjectParser, ResponseParseError
+from .document_store import document_store
+from .registry import registry
+from .classification_batcher import classification_batcher
+from .chunking import split_into_chunks, merge_extractions
+from .scheduler import TransientJobError, is_transient_error
+from ..utils.events import event_bus, JobEvent
+from ..utils.metrics import (
+    observe_stage, trace_job, record_input_chars, LLM_JSON_PARSE, EXTRACTION_FIRST_FIELD_SECONDS
+)
+from ..core.mappers.ontology_mapper import get_ontology
+from ..core.extractors.section_index import select_relevant_text
+from ..core.extractors.rule_classifier import classify_by_rules, classifier_stats, MIN_FAST_PATH_SCORE
+from ..database.jobs import update_job_status, store_cached_extraction, save_job_trace
 from ..config import settings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-os.environ["GOOGLE_API_KEY"] = settings.GEMINI_API_KEY
-
-# Initialize Gemini models
-flash_llm = ChatGoogleGenerativeAI(
-    model=settings.GEMINI_FLASH_MODEL,
-    temperature=0.1,
-    google_api_key=settings.GEMINI_API_KEY
-)
-
-pro_llm = ChatGoogleGenerativeAI(
-    model=settings.GEMINI_PRO_MODEL,
-    temperature=0.1,
-    google_api_key=settings.GEMINI_API_KEY
-)
-
 class ExtractionState(TypedDict):
-    """Shared state passed between agents"""
+    """Shared state passed between agents.
+
+    Agents return only the keys they change. Document text is kept in the
+    document store under ``document_ref`` rather than in the state.
+    """
     job_id: str
     document_path: str
+    content_hash: str
+    document_ref: str
     document_type: str
-    raw_text: str
     gemini_extraction: dict
+    extraction_provenance: dict  # field path -> source chunk index
+    fused_data: dict
     normalized_data: dict
     confidence_score: float
     errors: Annotated[list, operator.add]  # Accumulate errors
 
 # Agent 1: Document Classifier
-def classify_document_agent(state: ExtractionState) -> ExtractionState:
+def classify_document_agent(state: ExtractionState) -> Dict[str, Any]:
     """Classify document type using Gemini Flash (fast + cheap)"""
     logger.info(f"[Job {state['job_id']}] Classifying document...")
 
     try:
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a loan document classifier. Classify this document as one of:
-- FACILITY_AGREEMENT
-- AMENDMENT
-- TERM_SHEET
-- COMMITMENT_LETTER
-- OTHER
-
-Respond with ONLY the classification, nothing else."""),
-            ("user", "Document text (first 2000 chars):\n\n{text}")
-        ])
-
-        # Read document
-        raw_text = read_document(state["document_path"])
+        # Read only the leading pages needed for classification; extraction
+        # continues from them
+        document = read_document_pages(
+            state["document_path"],
+            max_chars=settings.CLASSIFY_MAX_CHARS,
+            file_hash=state.get("content_hash")
+        )
+        document_store.put(state["document_ref"], document)
+        raw_text = document.text[:settings.CLASSIFY_MAX_CHARS]
+        record_input_chars(len(raw_text))
         logger.info(f"[Job {state['job_id']}] Document read successfully. Length: {len(raw_text)} chars")
 
-        # Classify
-        chain = prompt | flash_llm
-        result = chain.invoke({"text": raw_text[:2000]})
-        doc_type = result.content.strip()
+        # Obvious title pages are classified locally; only ambiguous ones go to Flash
+        rules = classify_by_rules(raw_text)
+        fast_path = (
+            settings.CLASSIFIER_FAST_PATH_ENABLED
+            and rules.score >= MIN_FAST_PATH_SCORE
+            and rules.confidence >= settings.CLASSIFIER_FAST_PATH_CONFIDENCE
+        )
+        if fast_path:
+            doc_type = rules.label
+        else:
+            doc_type = classification_batcher.classify(raw_text)
+        classifier_stats.record(doc_type, fast_path=fast_path)
+
+        logger.info(
+            f"[Job {state['job_id']}] Classified as: {doc_type} "
+            f"({'rules' if fast_path else 'Flash'}, rule confidence {rules.confidence:.2f})"
+        )
 
-        logger.info(f"[Job {state['job_id']}] Classified as: {doc_type}")
-
-        return {
-            **state,
-            "raw_text": raw_text,
-            "document_type": doc_type
-        }
+        return {"document_type": doc_type}
 
     except Exception as e:
         logger.error(f"[Job {state['job_id']}] Classification error: {str(e)}")
         return {
-            **state,
             "document_type": "UNKNOWN",
-            "raw_text": "",
             "errors": [f"Classification failed: {str(e)}"]
         }
 
 # Agent 2: Gemini Extraction
-def gemini_extraction_agent(state: ExtractionState) -> ExtractionState:
+def _parse_json_response(job_id: str, response_text: str, doc_type: str) -> dict:
+    """Parse model output as JSON, repairing it against the prompt's schema rather than re-calling the model"""
+    try:
+        parsed = parse_json_response(response_text, load_extraction_schema(doc_type))
+    except ResponseParseError:
+        LLM_JSON_PARSE.inc(result="failed")
+        raise
+    LLM_JSON_PARSE.inc(result="repaired" if parsed.repaired else "ok")
+    if parsed.repaired:
+        logger.warning(f"[Job {job_id}] Repaired model JSON: {', '.join(dict.fromkeys(parsed.fixes))}")
+    return parsed.data
+
+def _publish_partial(job_id: str, result: dict, fraction: float):
+    """Publish the fields extracted so far; they are stored with the job until it finishes"""
+    start, end = STAGE_PROGRESS["classify"], STAGE_PROGRESS["extract_gemini"]
+    event_bus.publish(JobEvent(
+        job_id=job_id,
+        type="partial",
+        status="processing",
+        progress=start + int((end - start) * min(fraction, 1.0)),
+        stage="extract_gemini",
+        data={"fields": list(result), "result": result}
+    ))
+
+def _stream_extraction(job_id: str, chain, prompt_text: str, doc_type: str) -> str:
+    """Stream the Pro response, publishing each top-level field as soon as its value is complete"""
+    parser = IncrementalObjectParser()
+    partial = {}
+    expected = len(load_extraction_schema(doc_type)) or 1
+    started = time.perf_counter()
+    for chunk in chain.stream({"document_text": prompt_text}):
+        fields = parser.feed(chunk.content)
+        if not fields:
+            continue
+        if not partial:
+            EXTRACTION_FIRST_FIELD_SECONDS.observe(time.perf_counter() - started)
+        partial.update(fields)
+        _publish_partial(job_id, dict(partial), len(partial) / expected)
+    return parser.text
+
+def _extract_chunks(job_id: str, chain, chunks: list, doc_type: str) -> tuple:
+    """Run extraction on each chunk concurrently and merge the partial results"""
+    total = len(chunks)
+
+    def extract_chunk(chunk):
+        header = (
+            f"Excerpt {chunk.index + 1} of {total} (pages {chunk.first_page}-{chunk.last_page}). "
+            "Extract only what this excerpt states; use null for anything not present.\n\n"
+        )
+        result = chain.invoke({"document_text": header + chunk.text})
+        return _parse_json_response(job_id, result.content, doc_type)
+
+    partials, errors, failures = [], [], []
+    started = time.perf_counter()
+    # Copies the context so chunk calls are attributed to this job's stage
+    with ContextThreadPoolExecutor(max_workers=settings.EXTRACTION_CHUNK_CONCURRENCY) as pool:
+        futures = {pool.submit(extract_chunk, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                partials.append((chunk.index, future.result()))
+                if len(partials) == 1:
+                    EXTRACTION_FIRST_FIELD_SECONDS.observe(time.perf_counter() - started)
+                # Chunks finish out of order; the merge of those done so far is the partial result
+                _publish_partial(job_id, merge_extractions(partials)[0], len(partials) / total)
+            except Exception as e:
+                logger.error(f"[Job {job_id}] Chunk {chunk.index} extraction error: {str(e)}")
+                errors.append(f"Chunk {chunk.index} extraction failed: {str(e)}")
+                failures.append(e)
+
+    if not partials:
+        # Raised from a chunk's error so a quota or overload failure is still recognised as transient
+        raise ValueError(f"All {total} chunk extractions failed") from failures[-1]
+    extraction, provenance = merge_extractions(partials)
+    return extraction, provenance, len(partials), errors
+
+def gemini_extraction_agent(state: ExtractionState) -> Dict[str, Any]:
     """Extract structured data using Gemini Pro"""
     logger.info(f"[Job {state['job_id']}] Extracting data with Gemini Pro...")
 
     try:
-        # Load prompt template based on doc type
-        prompt_template = load_extraction_prompt(state["document_type"])
-
-        # Create prompt
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", prompt_template),
-            ("user", "{document_text}")
-        ])
-
-        # Use Pro model for extraction
-        chain = prompt | pro_llm
-
-        # Truncate document if too long (Gemini has token limits)
-        max_chars = 30000  # Approximately 7500 tokens
-        doc_text = state["raw_text"][:max_chars]
-
-        result = chain.invoke({"document_text": doc_text})
-
-        # Parse JSON from response
-        response_text = result.content.strip()
-
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-
-        extraction = json.loads(response_text.strip())
+        # Prebuilt Pro chain with the prompt for this doc type
+        chain = registry.get_extraction_chain(state["document_type"])
+
+        # Truncate mode only parses pages until the budget is filled (Gemini has token limits)
+        mode = settings.EXTRACTION_MODE
+        document = read_document_pages(
+            state["document_path"],
+            max_chars=settings.EXTRACTION_MAX_CHARS if mode == "truncate" else None,
+            file_hash=state.get("content_hash"),
+            parsed=document_store.get(state["document_ref"])
+        )
+        document_store.put(state["document_ref"], document)
+        record_input_chars(document.char_count)
+
+        if mode != "chunked" or document.char_count <= settings.EXTRACTION_MAX_CHARS:
+            doc_text = document.text
+            if mode == "sections":
+                # Send only the highest-ranked clauses for this document type's schema
+                prompt_text = select_relevant_text(
+                    doc_text,
+                    load_extraction_query_terms(state["document_type"]),
+                    settings.EXTRACTION_MAX_CHARS
+                )
+            else:
+                prompt_text = doc_text[:settings.EXTRACTION_MAX_CHARS]
+            if settings.EXTRACTION_STREAMING:
+                response_text = _stream_extraction(state["job_id"], chain, prompt_text, state["document_type"])
+            else:
+                response_text = chain.invoke({"document_text": prompt_text}).content
+            extraction = _parse_json_response(state["job_id"], response_text, state["document_type"])
+            provenance, errors, confidence = {}, [], 0.85  # Initial estimate
+        else:
+            chunks = split_into_chunks(
+                document,
+                chunk_chars=settings.EXTRACTION_MAX_CHARS,
+                overlap_chars=settings.EXTRACTION_CHUNK_OVERLAP_CHARS,
+                max_chunks=settings.EXTRACTION_MAX_CHUNKS
+            )
+            logger.info(
+                f"[Job {state['job_id']}] Long document ({document.char_count} chars): extracting {len(chunks)} chunks"
+            )
+
+            extraction, provenance, succeeded, errors = _extract_chunks(state["job_id"], chain, chunks, state["document_type"])
+            confidence = 0.85 * succeeded / len(chunks)
+
+            # EXTRACTION_MAX_CHUNKS can stop short of the end: nothing past the last chunk was read
+            covered = chunks[-1].end
+            skipped = len(document.text) - covered
+            if skipped > 0:
+                logger.warning(
+                    f"[Job {state['job_id']}] Chunk limit {settings.EXTRACTION_MAX_CHUNKS} reached: "
+                    f"{skipped} of {len(document.text)} chars not extracted"
+                )
+                errors.append(
+                    f"Document truncated at {settings.EXTRACTION_MAX_CHUNKS} chunks: "
+                    f"{skipped} of {len(document.text)} chars not extracted"
+                )
+                confidence *= covered / len(document.text)
 
         logger.info(f"[Job {state['job_id']}] Extraction successful")
 
         return {
-            **state,
             "gemini_extraction": extraction,
-            "confidence_score": 0.85  # Initial estimate
+            "extraction_provenance": provenance,
+            "confidence_score": confidence,
+            "errors": errors
         }
 
-    except json.JSONDecodeError as e:
+    except ResponseParseError as e:
         logger.error(f"[Job {state['job_id']}] JSON parsing error: {str(e)}")
-        logger.error(f"Response was: {result.content[:500]}")
+        logger.error(f"Response was: {response_text[:500]}")
         return {
-            **state,
             "gemini_extraction": {},
             "confidence_score": 0.0,
             "errors": [f"JSON parsing failed: {str(e)}"]
         }
 
     except Exception as e:
+        if is_transient_error(e):
+            # Nothing extracted because Gemini was rate limited or unavailable: let the scheduler
+            # retry the job later instead of saving an empty result
+            raise
         logger.error(f"[Job {state['job_id']}] Extraction error: {str(e)}")
         return {
-            **state,
             "gemini_extraction": {},
             "confidence_score": 0.0,
             "errors": [f"Extraction failed: {str(e)}"]
         }
 
 # Agent 3: Data Fusion
-def data_fusion_agent(state: ExtractionState) -> ExtractionState:
+def data_fusion_agent(state: ExtractionState) -> Dict[str, Any]:
     """Fuse Gemini and LayoutLM extractions (if available)"""
     logger.info(f"[Job {state['job_id']}] Fusing extraction results...")
 
@@ -162,40 +274,34 @@ def data_fusion_agent(state: ExtractionState) -> ExtractionState:
 
     # TODO: Add LayoutLM fusion logic post-MVP
 
-    return {
-        **state,
-        "fused_data": fused
-    }
+    return {"fused_data": fused}
 
 # Agent 4: Normalization
-def normalization_agent(state: ExtractionState) -> ExtractionState:
+def normalization_agent(state: ExtractionState) -> Dict[str, Any]:
     """Normalize to LMA ontology schema"""
     logger.info(f"[Job {state['job_id']}] Normalizing data to LMA ontology...")
 
     try:
-        # For MVP, minimal normalization
-        # Just ensure standard field names and add metadata
+        ontology = get_ontology()
+        result = ontology.normalize(state["document_type"], state["fused_data"])
         normalized = {
             "document_type": state["document_type"],
-            "extraction": state["fused_data"],
-            "ontology_version": "1.0.0-mvp",
-            "source": "gemini-extraction"
+            "extraction": result.data,
+            "ontology_version": ontology.version,
+            "source": "gemini-extraction",
+            "normalization": result.report()
         }
+        if state.get("extraction_provenance"):
+            normalized["provenance"] = state["extraction_provenance"]
+        if result.issues:
+            logger.warning(f"[Job {state['job_id']}] Values kept unnormalized: {result.issues}")
 
-        # Calculate confidence based on completeness
-        required_fields = set()
-        if state["document_type"] == "FACILITY_AGREEMENT":
-            required_fields = {"borrower", "facility"}
-
-        extracted_fields = set(state["fused_data"].keys())
-        completeness = len(required_fields & extracted_fields) / max(len(required_fields), 1)
-
-        confidence = state["confidence_score"] * (0.5 + 0.5 * completeness)
+        # Confidence scales with the share of the document type's required fields present
+        confidence = state["confidence_score"] * (0.5 + 0.5 * result.completeness)
 
         logger.info(f"[Job {state['job_id']}] Normalization complete. Confidence: {confidence:.2f}")
 
         return {
-            **state,
             "normalized_data": normalized,
             "confidence_score": confidence
         }
@@ -203,13 +309,12 @@ def normalization_agent(state: ExtractionState) -> ExtractionState:
     except Exception as e:
         logger.error(f"[Job {state['job_id']}] Normalization error: {str(e)}")
         return {
-            **state,
             "normalized_data": state["fused_data"],
             "errors": [f"Normalization failed: {str(e)}"]
         }
 
 # Agent 5: Validation
-def validation_agent(state: ExtractionState) -> ExtractionState:
+def validation_agent(state: ExtractionState) -> Dict[str, Any]:
     """Validate against schema and business rules"""
     logger.info(f"[Job {state['job_id']}] Validating extraction...")
 
@@ -227,13 +332,44 @@ def validation_agent(state: ExtractionState) -> ExtractionState:
     if validation_errors:
         logger.warning(f"[Job {state['job_id']}] Validation warnings: {validation_errors}")
         return {
-            **state,
             "errors": validation_errors,
             "confidence_score": state["confidence_score"] * 0.8  # Penalize
         }
 
     logger.info(f"[Job {state['job_id']}] Validation passed")
-    return state
+    return {}
+
+# Job progress reported when each stage finishes
+STAGE_PROGRESS = {
+    "classify": 20,
+    "extract_gemini": 70,
+    "fuse": 80,
+    "normalize": 90,
+    "validate": 95,
+}
+
+def _reporting_stage(stage: str, agent: Callable) -> Callable:
+    """Wrap an agent so it is measured and finishing it publishes a stage event with the job's progress"""
+    def run(state: ExtractionState) -> Dict[str, Any]:
+        with observe_stage(stage) as stats:
+            result = agent(state)
+        data = {
+            "duration_ms": round(stats.wall_ms, 1),
+            "llm_calls": stats.llm_calls,
+            "tokens": stats.prompt_tokens + stats.completion_tokens
+        }
+        if stage == "classify":
+            data["document_type"] = result.get("document_type")
+        event_bus.publish(JobEvent(
+            job_id=state["job_id"],
+            type="stage",
+            status="processing",
+            progress=STAGE_PROGRESS[stage],
+            stage=stage,
+            data=data
+        ))
+        return result
+    return run
 
 # Build workflow
 def create_extraction_workflow():
@@ -242,11 +378,15 @@ def create_extraction_workflow():
     workflow = StateGraph(ExtractionState)
 
     # Add nodes (agents)
-    workflow.add_node("classify", classify_document_agent)
-    workflow.add_node("extract_gemini", gemini_extraction_agent)
-    workflow.add_node("fuse", data_fusion_agent)
-    workflow.add_node("normalize", normalization_agent)
-    workflow.add_node("validate", validation_agent)
+    agents = {
+        "classify": classify_document_agent,
+        "extract_gemini": gemini_extraction_agent,
+        "fuse": data_fusion_agent,
+        "normalize": normalization_agent,
+        "validate": validation_agent,
+    }
+    for stage, agent in agents.items():
+        workflow.add_node(stage, _reporting_stage(stage, agent))
 
     # Define flow
     workflow.set_entry_point("classify")
@@ -259,31 +399,58 @@ def create_extraction_workflow():
     return workflow.compile()
 
 # Main execution function
-async def run_extraction_workflow(job_id: str, file_path: str):
-    """Run the complete extraction workflow"""
+async def run_extraction_workflow(
+    job_id: str,
+    file_path: str,
+    content_hash: str = None,
+    trace: bool = False
+) -> str:
+    """Run the complete extraction workflow and return the job's final status.
+
+    Raises TransientJobError, without marking the job failed, when it failed
+    for a retryable reason such as a Gemini quota error. With ``trace`` the
+    per-stage timings, tokens and cache hits of this attempt are stored with
+    the job.
+    """
+    with trace_job(job_id, enabled=trace) as job_trace:
+        try:
+            return await _run_workflow(job_id, file_path, content_hash)
+        finally:
+            document_store.release(job_id)
+            if job_trace is not None:
+                try:
+                    await save_job_trace(job_id, job_trace.to_dict())
+                except Exception as e:
+                    logger.error(f"[Job {job_id}] Could not store trace: {str(e)}")
+
+async def _run_workflow(job_id: str, file_path: str, content_hash: str = None) -> str:
     logger.info(f"[Job {job_id}] Starting extraction workflow for: {file_path}")
 
     try:
         # Update status to processing
         await update_job_status(job_id, status="processing", progress=0)
 
-        # Create workflow
-        app = create_extraction_workflow()
+        # Compiled once per process
+        app = registry.get_app()
 
         # Initial state
         initial_state = {
             "job_id": job_id,
             "document_path": file_path,
+            "content_hash": content_hash,
+            "document_ref": job_id,
             "document_type": "",
-            "raw_text": "",
             "gemini_extraction": {},
+            "extraction_provenance": {},
+            "fused_data": {},
             "normalized_data": {},
             "confidence_score": 0.0,
             "errors": []
         }
 
-        # Run workflow (synchronous call wrapped in async)
-        result = app.invoke(initial_state)
+        # Run workflow in a worker thread so Gemini calls and document parsing
+        # do not block the event loop
+        result = await asyncio.to_thread(app.invoke, initial_state)
 
         logger.info(f"[Job {job_id}] Workflow complete. Final confidence: {result['confidence_score']:.2f}")
 
@@ -293,16 +460,32 @@ async def run_extraction_workflow(job_id: str, file_path: str):
             status="completed",
             progress=100,
             result=result["normalized_data"],
-            confidence=result["confidence_score"]
+            confidence=result["confidence_score"],
+            document_type=result["document_type"]
         )
 
         if result["errors"]:
             logger.warning(f"[Job {job_id}] Completed with errors: {result['errors']}")
+        elif content_hash and settings.EXTRACTION_CACHE_ENABLED:
+            # Only clean extractions are reused for identical uploads
+            await store_cached_extraction(
+                content_hash=content_hash,
+                prompt_version=PROMPT_VERSION,
+                normalized_data=result["normalized_data"],
+                confidence=result["confidence_score"]
+            )
+        return "completed"
+
+    except TransientJobError:
+        raise
 
     except Exception as e:
+        if is_transient_error(e):
+            raise TransientJobError(str(e)) from e
         logger.error(f"[Job {job_id}] Workflow failed: {str(e)}", exc_info=True)
         await update_job_status(
             job_id=job_id,
             status="failed",
             error=str(e)
         )
+        return "failed"
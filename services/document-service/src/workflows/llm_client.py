@@ -0,0 +1,400 @@
+"""Shared Gemini client layer: per-model rate limits, token budgeting, adaptive concurrency and retries"""
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from google.api_core import exceptions as google_exceptions
+from langchain_core.messages import BaseMessage, BaseMessageChunk
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from .scheduler import is_transient_error, TRANSIENT_STATUS_PATTERN
+from ..config import settings
+from ..utils.metrics import metrics, record_llm_call
+
+logger = logging.getLogger(__name__)
+
+# Failures that mean the model is overloaded or over quota: back off concurrency
+OVERLOAD_EXCEPTIONS = (google_exceptions.TooManyRequests, google_exceptions.ServiceUnavailable)
+OVERLOAD_STATUS_CODES = ("429", "503")
+
+CHARS_PER_TOKEN = 4
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Whether a failed call says the model is over quota or overloaded (by type, else a labelled status)"""
+    if isinstance(error, OVERLOAD_EXCEPTIONS):
+        return True
+    if isinstance(error, (google_exceptions.GoogleAPIError, ValueError)):
+        return False
+    match = TRANSIENT_STATUS_PATTERN.search(str(error))
+    return match is not None and match.group(1) in OVERLOAD_STATUS_CODES
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count for text (about four characters per token)"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _prompt_text(prompt: Any) -> str:
+    if hasattr(prompt, "to_string"):
+        return prompt.to_string()
+    if isinstance(prompt, list):
+        return "\n".join(str(getattr(message, "content", message)) for message in prompt)
+    return str(prompt)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``per_minute`` and holding at most ``capacity``.
+
+    ``reserve`` always succeeds and returns how long the caller must wait
+    before using what it took; the balance may go negative, so large
+    requests and concurrent callers queue up in arrival order instead of
+    polling. A non-positive rate means unlimited.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = max(capacity if capacity is not None else per_minute, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` tokens; returns seconds to wait before they are covered"""
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return max(-self._tokens / self.rate, 0.0)
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Take ``amount`` tokens only if they are available now"""
+        if self.unlimited:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+    def drain(self):
+        """Drop any saved-up burst so callers proceed at the refill rate"""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+    def adjust(self, amount: float):
+        """Return (positive) or charge (negative) tokens after the real usage is known"""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on concurrent calls: +1 per limit's worth of successes, halved on overload.
+
+    Overload from a call that started before the last decrease is ignored,
+    so a burst of 429s from calls already in flight counts as one signal.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, decrease_factor: float = 0.5):
+        self.maximum = max(maximum, 1)
+        self.minimum = max(min(minimum, self.maximum), 1)
+        self.decrease_factor = decrease_factor
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """Wait for a slot; returns the start time to pass back to ``release``"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, overloaded: bool = False):
+        with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                if started >= self._last_decrease:
+                    self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+                    self._last_decrease = time.monotonic()
+                    self.decreases += 1
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+class ModelLimiter:
+    """Request and token budgets, adaptive concurrency and call statistics for one model"""
+
+    def __init__(self, model: str, requests_per_minute: int, tokens_per_minute: int, max_concurrency: int):
+        burst = settings.LLM_BURST_SECONDS / 60.0
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute, capacity=requests_per_minute * burst)
+        self.tokens = TokenBucket(tokens_per_minute, capacity=tokens_per_minute * burst)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._max_queued = 0
+        self._calls = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._retries = 0
+        self._overloaded = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._estimated_tokens = 0
+        self._reported_tokens = 0
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """Block until the budgets and a concurrency slot allow one call; returns its start time"""
+        start = time.monotonic()
+        with self._lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+            self._estimated_tokens += estimated_tokens
+        try:
+            delay = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+            if delay > 0:
+                time.sleep(delay)
+            started = self.concurrency.acquire()
+        finally:
+            waited = time.monotonic() - start
+            with self._lock:
+                self._queued -= 1
+                self._calls += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+        return started
+
+    def release(self, started: float, error: Optional[Exception] = None, retrying: bool = False):
+        overloaded = error is not None and is_overload_error(error)
+        self.concurrency.release(started, overloaded=overloaded)
+        if overloaded:
+            # The server is ahead of our budget: stop bursting until it refills
+            self.requests.drain()
+        with self._lock:
+            if error is None:
+                self._succeeded += 1
+            elif retrying:
+                self._retries += 1
+            else:
+                self._failed += 1
+            if overloaded:
+                self._overloaded += 1
+
+    def record_usage(self, estimated_tokens: int, reported_tokens: int):
+        """Settle the token budget with the usage the API reported"""
+        self.tokens.adjust(estimated_tokens - reported_tokens)
+        with self._lock:
+            self._reported_tokens += reported_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._queued,
+                "max_queued": self._max_queued,
+                "in_flight": self.concurrency.in_flight,
+                "concurrency_limit": round(self.concurrency.limit, 2),
+                "concurrency_decreases": self.concurrency.decreases,
+                "calls": self._calls,
+                "succeeded": self._succeeded,
+                "failed": self._failed,
+                "retries": self._retries,
+                "overloaded": self._overloaded,
+                "avg_wait_seconds": round(self._total_wait / self._calls, 3) if self._calls else 0.0,
+                "max_wait_seconds": round(self._max_wait, 3),
+                "estimated_tokens": self._estimated_tokens,
+                "reported_tokens": self._reported_tokens,
+            }
+
+
+_limiters: Dict[str, ModelLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model: str, requests_per_minute: int, tokens_per_minute: int) -> ModelLimiter:
+    """The process-wide limiter for a model; quotas are per model, so clients share it"""
+    with _limiters_lock:
+        if model not in _limiters:
+            _limiters[model] = ModelLimiter(
+                model, requests_per_minute, tokens_per_minute, settings.LLM_MAX_CONCURRENCY
+            )
+        return _limiters[model]
+
+
+def llm_client_stats() -> Dict[str, Any]:
+    """Queued vs in-flight calls, retries and token usage per model"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.model: limiter.snapshot() for limiter in limiters}
+
+
+def retry_backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (1-based) retry"""
+    ceiling = min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+def _gauge(field: str):
+    def collect() -> Dict[tuple, float]:
+        return {(model,): stats[field] for model, stats in llm_client_stats().items()}
+    return collect
+
+
+metrics.gauge("synapse_llm_queued_calls", "Gemini calls waiting for budget or a slot", ["model"], _gauge("queued"))
+metrics.gauge("synapse_llm_in_flight_calls", "Gemini calls currently running", ["model"], _gauge("in_flight"))
+metrics.gauge(
+    "synapse_llm_concurrency_limit", "Current adaptive concurrency limit", ["model"], _gauge("concurrency_limit")
+)
+
+
+def _reported_usage(message: BaseMessage) -> Optional[Tuple[int, int]]:
+    """(prompt, completion) tokens reported with a response, if the API sent usage"""
+    usage = getattr(message, "response_metadata", {}).get("usage_metadata") or {}
+    if "prompt_token_count" not in usage:
+        return None
+    return usage["prompt_token_count"], usage.get("candidates_token_count", 0)
+
+
+class RateLimitedLLM(Runnable):
+    """Chat model wrapper that sends every call through its model's limiter.
+
+    Drop-in for the model in ``prompt | llm`` chains. Transient failures are
+    retried here with jittered backoff; when retries run out the error
+    propagates and the job-level retry in the scheduler takes over.
+    """
+
+    def __init__(
+        self,
+        llm: Runnable,
+        limiter: ModelLimiter,
+        max_retries: int,
+        input_cost_per_mtok: float = 0.0,
+        output_cost_per_mtok: float = 0.0
+    ):
+        self.llm = llm
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.input_cost_per_mtok = input_cost_per_mtok
+        self.output_cost_per_mtok = output_cost_per_mtok
+
+    @property
+    def InputType(self):
+        return self.llm.InputType
+
+    @property
+    def OutputType(self):
+        return self.llm.OutputType
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseMessage:
+        prompt_tokens = estimate_tokens(_prompt_text(input))
+        estimated = prompt_tokens + settings.LLM_OUTPUT_TOKEN_ESTIMATE
+        call_started = time.perf_counter()
+        attempt = 0
+        while True:
+            started = self.limiter.acquire(estimated)
+            try:
+                result = self.llm.invoke(input, config, **kwargs)
+            except Exception as e:
+                retrying = attempt < self.max_retries and is_transient_error(e)
+                self.limiter.release(started, error=e, retrying=retrying)
+                if not retrying:
+                    raise
+                attempt += 1
+                self._back_off(attempt, e)
+                continue
+
+            self.limiter.release(started)
+            self._record(result, prompt_tokens, estimated, attempt, call_started)
+            return result
+
+    def stream(
+        self,
+        input: Any,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any
+    ) -> Iterator[BaseMessageChunk]:
+        """Stream the response; a failed call is only retried if nothing was yielded yet"""
+        prompt_tokens = estimate_tokens(_prompt_text(input))
+        estimated = prompt_tokens + settings.LLM_OUTPUT_TOKEN_ESTIMATE
+        call_started = time.perf_counter()
+        attempt = 0
+        while True:
+            started = self.limiter.acquire(estimated)
+            message = None
+            try:
+                for chunk in self.llm.stream(input, config, **kwargs):
+                    message = chunk if message is None else message + chunk
+                    yield chunk
+            except GeneratorExit:
+                # The consumer stopped reading; free the slot
+                self.limiter.release(started)
+                raise
+            except Exception as e:
+                retrying = message is None and attempt < self.max_retries and is_transient_error(e)
+                self.limiter.release(started, error=e, retrying=retrying)
+                if not retrying:
+                    raise
+                attempt += 1
+                self._back_off(attempt, e)
+                continue
+
+            self.limiter.release(started)
+            self._record(message, prompt_tokens, estimated, attempt, call_started)
+            return
+
+    def _back_off(self, attempt: int, error: Exception):
+        delay = retry_backoff(attempt)
+        logger.warning(
+            f"{self.limiter.model} call failed, retry {attempt}/{self.max_retries} "
+            f"in {delay:.1f}s: {str(error)}"
+        )
+        time.sleep(delay)
+
+    def _record(
+        self,
+        result: Optional[BaseMessage],
+        prompt_tokens: int,
+        estimated: int,
+        attempt: int,
+        call_started: float
+    ):
+        """Account a finished call's tokens to the limiter and metrics"""
+        reported = _reported_usage(result) if result is not None else None
+        if reported is not None:
+            prompt_tokens, completion_tokens = reported
+            self.limiter.record_usage(estimated, prompt_tokens + completion_tokens)
+        else:
+            completion_tokens = estimate_tokens(str(result.content)) if result is not None else 0
+        record_llm_call(
+            self.limiter.model,
+            seconds=time.perf_counter() - call_started,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            retries=attempt,
+            cost_usd=(
+                prompt_tokens * self.input_cost_per_mtok + completion_tokens * self.output_cost_per_mtok
+            ) / 1_000_000
+        )
@@ -0,0 +1,158 @@
+"""Process-wide registry of the compiled workflow, Gemini models and prompt chains"""
+import logging
+import os
+import threading
+from typing import Dict
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from .helpers import (
+    PromptSpec, CLASSIFICATION_PROMPT, CLASSIFICATION_BATCH_PROMPT, EXTRACTION_PROMPTS, PROMPT_VERSION
+)
+from .llm_client import RateLimitedLLM, get_limiter
+from ..core.mappers.ontology_mapper import get_ontology
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _escape_braces(template: str) -> str:
+    """Keep the JSON examples in prompt text from being read as template variables"""
+    return template.replace("{", "{{").replace("}", "}}")
+
+
+def _build_llm(
+    model: str,
+    requests_per_minute: int,
+    tokens_per_minute: int,
+    input_cost_per_mtok: float,
+    output_cost_per_mtok: float
+) -> RateLimitedLLM:
+    """Chat model for a Gemini model name, behind that model's shared rate limiter"""
+    if settings.LLM_PROVIDER == "fake":
+        from .fake_gemini import FakeGeminiChat
+
+        llm = FakeGeminiChat(
+            model=model,
+            latency_ms=settings.FAKE_GEMINI_LATENCY_MS,
+            error_rate=settings.FAKE_GEMINI_ERROR_RATE,
+            requests_per_minute=settings.FAKE_GEMINI_RPM
+        )
+    else:
+        llm = ChatGoogleGenerativeAI(
+            model=model,
+            temperature=0.1,
+            google_api_key=settings.GEMINI_API_KEY
+        )
+    return RateLimitedLLM(
+        llm,
+        get_limiter(model, requests_per_minute, tokens_per_minute),
+        max_retries=settings.LLM_MAX_RETRIES,
+        input_cost_per_mtok=input_cost_per_mtok,
+        output_cost_per_mtok=output_cost_per_mtok
+    )
+
+
+def _json_output_supported() -> bool:
+    """Whether Gemini can be asked for JSON output (response_mime_type needs google-generativeai >= 0.5)"""
+    if settings.LLM_PROVIDER == "fake":
+        return False
+    try:
+        from google.ai.generativelanguage import GenerationConfig
+    except ImportError:
+        return False
+    return "response_mime_type" in GenerationConfig.meta.fields
+
+
+def _build_chain(spec: PromptSpec, user_message: str, llm):
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", _escape_braces(spec.template)),
+        ("user", user_message)
+    ])
+    return prompt | llm
+
+
+class WorkflowRegistry:
+    """Builds the Gemini clients, per-document-type chains and the compiled
+    LangGraph app once per process; jobs only look them up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._warm = False
+        self.flash_llm = None
+        self.pro_llm = None
+        self.classification_chain = None
+        self.batch_classification_chain = None
+        self.extraction_chains: Dict[str, object] = {}
+        self.app = None
+
+    def warm(self):
+        """Build everything; safe to call repeatedly and from several threads"""
+        if self._warm:
+            return
+        with self._lock:
+            if self._warm:
+                return
+
+            # Imported here: the workflow module imports this registry
+            from .langgraph_extraction import create_extraction_workflow
+
+            os.environ["GOOGLE_API_KEY"] = settings.GEMINI_API_KEY
+            self.flash_llm = _build_llm(
+                settings.GEMINI_FLASH_MODEL, settings.GEMINI_FLASH_RPM, settings.GEMINI_FLASH_TPM,
+                settings.GEMINI_FLASH_INPUT_COST_PER_MTOK, settings.GEMINI_FLASH_OUTPUT_COST_PER_MTOK
+            )
+            self.pro_llm = _build_llm(
+                settings.GEMINI_PRO_MODEL, settings.GEMINI_PRO_RPM, settings.GEMINI_PRO_TPM,
+                settings.GEMINI_PRO_INPUT_COST_PER_MTOK, settings.GEMINI_PRO_OUTPUT_COST_PER_MTOK
+            )
+
+            self.classification_chain = _build_chain(
+                CLASSIFICATION_PROMPT,
+                f"Document text (first {settings.CLASSIFY_MAX_CHARS} chars):\n\n{{text}}",
+                self.flash_llm
+            )
+            self.batch_classification_chain = _build_chain(CLASSIFICATION_BATCH_PROMPT, "{documents}", self.flash_llm)
+            extraction_llm = self.pro_llm
+            if settings.GEMINI_JSON_MODE and _json_output_supported():
+                extraction_llm = self.pro_llm.bind(generation_config={"response_mime_type": "application/json"})
+            self.extraction_chains = {
+                doc_type: _build_chain(spec, "{document_text}", extraction_llm)
+                for doc_type, spec in EXTRACTION_PROMPTS.items()
+            }
+            self.app = create_extraction_workflow()
+            # Compile the ontology now rather than inside the first job's normalization stage
+            get_ontology()
+            self._warm = True
+
+        logger.info(
+            f"Workflow registry ready: {len(self.extraction_chains)} extraction chains, "
+            f"prompt version {PROMPT_VERSION}"
+        )
+
+    def get_app(self):
+        self.warm()
+        return self.app
+
+    def get_classification_chain(self):
+        self.warm()
+        return self.classification_chain
+
+    def get_batch_classification_chain(self):
+        self.warm()
+        return self.batch_classification_chain
+
+    def get_extraction_chain(self, doc_type: str):
+        """Prebuilt Pro chain for a document type (facility agreement prompt as fallback)"""
+        self.warm()
+        return self.extraction_chains.get(doc_type, self.extraction_chains["FACILITY_AGREEMENT"])
+
+    def prompt_versions(self) -> Dict[str, str]:
+        versions = {spec.name: spec.version for spec in EXTRACTION_PROMPTS.values()}
+        versions[CLASSIFICATION_PROMPT.name] = CLASSIFICATION_PROMPT.version
+        return versions
+
+
+registry = WorkflowRegistry()
@@ -0,0 +1,242 @@
+"""Tolerant parsing of model JSON output, repairing sloppy or truncated responses"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Python literals models sometimes emit instead of JSON ones
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+# Any run of letters, digits and underscores starting with a letter, including non-ASCII ones
+_WORD = re.compile(r"[^\W\d]\w*")
+
+
+class ResponseParseError(ValueError):
+    """Model output that holds no recoverable JSON object"""
+
+
+@dataclass
+class ParsedResponse:
+    """A parsed JSON object and the repairs needed to get it"""
+    data: Dict[str, Any]
+    fixes: List[str] = field(default_factory=list)
+
+    @property
+    def repaired(self) -> bool:
+        return bool(self.fixes)
+
+
+def _clean(text: str, start: int) -> tuple:
+    """Rewrite the object starting at ``start`` as strict JSON.
+
+    Drops trailing commas, comments and anything after the object, escapes
+    raw control characters in strings and maps Python literals. Returns the
+    cleaned text, the fixes applied and, for truncated input, the cut points
+    (cleaned length, open brackets) at which every member before is complete.
+    """
+    out: List[str] = []
+    fixes: List[str] = []
+    stack: List[str] = []
+    cut_points: List[tuple] = []
+    in_string = escaped = False
+    # One character per element, so cut points are offsets into the cleaned text
+    i = start
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char in "\n\r\t":
+                char = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}[char]
+                fixes.append("control character in string")
+            out.extend(char)
+            i += 1
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            out.append(char)
+            cut_points.append((len(out), tuple(stack)))
+            i += 1
+            continue
+        elif char in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+                fixes.append("trailing comma")
+            if not stack:
+                break
+            out.append(_CLOSERS[stack.pop()])
+            if not stack:
+                if text[i + 1:].strip():
+                    fixes.append("text after object")
+                return "".join(out), fixes, None
+            cut_points.append((len(out), tuple(stack)))
+            i += 1
+            continue
+        elif char == ",":
+            cut_points.append((len(out), tuple(stack)))
+        elif char == "/" and text[i:i + 2] in ("//", "/*"):
+            end = text.find("\n" if text[i + 1] == "/" else "*/", i + 2)
+            i = len(text) if end < 0 else end + (1 if text[i + 1] == "/" else 2)
+            fixes.append("comment")
+            continue
+        elif char.isalpha():
+            word = _WORD.match(text, i).group()
+            if word in _LITERALS:
+                fixes.append("python literal")
+            out.extend(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        out.append(char)
+        i += 1
+
+    return "".join(out), fixes, cut_points
+
+
+def _close_truncated(cut_points: List[tuple], cleaned: str) -> str:
+    """Cut a truncated object back to its last complete member and close its brackets"""
+    if not cut_points:
+        raise ResponseParseError("Truncated response with no complete member")
+    length, stack = cut_points[-1]
+    return cleaned[:length].rstrip().rstrip(",") + "".join(_CLOSERS[b] for b in reversed(stack))
+
+
+def _skeleton(schema: Any) -> Any:
+    """Empty value shaped like a schema example: nested objects of nulls, empty lists"""
+    if isinstance(schema, dict):
+        return {key: _skeleton(value) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return []
+    return None
+
+
+def _fill_missing(data: Any, schema: Any, path: str, fixes: List[str]):
+    """Add the schema keys a truncated response never reached, as nulls"""
+    if isinstance(schema, dict) and isinstance(data, dict):
+        for key, example in schema.items():
+            field_path = f"{path}.{key}" if path else key
+            if key not in data:
+                data[key] = _skeleton(example)
+                fixes.append(f"missing {field_path}")
+            else:
+                _fill_missing(data[key], example, field_path, fixes)
+    elif isinstance(schema, list) and schema and isinstance(data, list):
+        for item in data:
+            _fill_missing(item, schema[0], f"{path}[]", fixes)
+
+
+class IncrementalObjectParser:
+    """Yields the top-level members of a streamed JSON object as each one closes.
+
+    Feed it the text chunks of a streaming response; ``feed`` returns the
+    (key, value) pairs completed by that chunk, e.g. ``borrower`` as soon as
+    its object is closed. Members that do not parse on their own are skipped;
+    the full ``text`` still goes through ``parse_json_response`` at the end.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._member_start: Optional[int] = None
+        self._in_string = self._escaped = False
+        self._closed = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> List[tuple]:
+        self._parts.append(chunk)
+        if self._closed:
+            return []
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = self._depth > 0
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif char in "}]" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    completed += self._member(buffer[self._member_start:i])
+                    self._member_start = None
+                    self._closed = True
+                    break
+            elif char == "," and self._depth == 1:
+                completed += self._member(buffer[self._member_start:i])
+                self._member_start = i + 1
+        # Keep only the open member, so scanning stays linear in the response length
+        if self._member_start is None:
+            self._buffer, self._pos = "", 0
+        else:
+            self._buffer, self._pos = buffer[self._member_start:], len(buffer) - self._member_start
+            self._member_start = 0
+        return completed
+
+    @staticmethod
+    def _member(text: str) -> List[tuple]:
+        if not text.strip():
+            return []
+        try:
+            return list(json.loads("{" + text + "}").items())
+        except json.JSONDecodeError:
+            return []
+
+
+def parse_json_response(text: str, schema: Optional[Dict[str, Any]] = None) -> ParsedResponse:
+    """Parse a model response as a JSON object, repairing it where possible.
+
+    Tries a strict parse first, then locates the outermost object among any
+    surrounding prose or code fences and parses it leniently. Output cut off
+    mid-object (e.g. at the token limit) keeps its complete members; with a
+    ``schema`` example, fields it never reached are added as nulls so the
+    result has the expected shape.
+    """
+    body = _FENCE.sub("", text.strip())
+    try:
+        data = json.loads(body)
+        if isinstance(data, dict):
+            return ParsedResponse(data)
+    except json.JSONDecodeError:
+        pass
+
+    start = text.find("{")
+    if start < 0:
+        raise ResponseParseError("No JSON object in response")
+
+    cleaned, fixes, cut_points = _clean(text, start)
+    if cut_points is not None:
+        cleaned = _close_truncated(cut_points, cleaned)
+        fixes.append("truncated")
+    try:
+        data = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        raise ResponseParseError(f"Unrepairable JSON: {str(e)}") from e
+
+    if "truncated" in fixes and schema:
+        _fill_missing(data, schema, "", fixes)
+    # Strict parsing failed, so at least the surrounding text had to go
+    return ParsedResponse(data, fixes or ["text around object"])
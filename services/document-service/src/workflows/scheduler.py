@@ -0,0 +1,294 @@
+"""Job scheduler for extraction workflows backed by the durable SQLite queue"""
+import asyncio
+import logging
+import os
+import random
+import re
+import socket
+import time
+import uuid
+from typing import Optional, Dict, Any, List
+
+from google.api_core import exceptions as google_exceptions
+
+from ..config import settings
+from ..utils.metrics import metrics, JOB_SECONDS
+from ..database.job_queue import (
+    enqueue_jobs, queue_position, pending_count, claim_job, renew_lease, retry_job, recover_jobs,
+    ClaimedJob
+)
+
+logger = logging.getLogger(__name__)
+
+# Gemini/API failures worth retrying: quota, overload, timeouts
+TRANSIENT_EXCEPTIONS = (
+    google_exceptions.TooManyRequests,  # includes ResourceExhausted
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    TimeoutError,
+    ConnectionError,
+)
+# Other clients only say so in the message; trust a status code there only when it is labelled as one
+TRANSIENT_STATUS_PATTERN = re.compile(r"\b(?:status|code|HTTP)\b(?:\s*code)?[\s:=]*(429|5\d\d)\b", re.IGNORECASE)
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler queue has no free slots"""
+
+
+class TransientJobError(Exception):
+    """A job failed for a reason that may succeed on a later attempt"""
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether an exception, or one it was raised from, is a retryable quota, overload or timeout failure.
+
+    Judged by exception type. Only exceptions of no known type fall back
+    to their message, and then only to a labelled status code, so numbers
+    inside an error message (a JSON parse error at "column 503") do not
+    count. Value errors, which include response parse errors, are never
+    transient by message.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, TRANSIENT_EXCEPTIONS):
+            return True
+        if (
+            not isinstance(error, (google_exceptions.GoogleAPIError, ValueError))
+            and TRANSIENT_STATUS_PATTERN.search(str(error))
+        ):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (1-based) attempt"""
+    ceiling = min(settings.JOB_RETRY_MAX_SECONDS, settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class JobScheduler:
+    """Runs extraction jobs claimed from the durable queue in the extraction_jobs table.
+
+    Jobs survive restarts: a worker leases a job, renews the lease with
+    heartbeats while it runs, and a job whose lease expires (worker crashed
+    or was killed) is requeued by any live scheduler. Transient failures are
+    retried with exponential backoff up to ``max_attempts``.
+
+    The queue is ordered by a virtual clock so batches share workers fairly:
+    the i-th job of a batch is placed ``i // batch_size`` rounds after the
+    current virtual time, and single uploads go in the current round. A
+    500-file data room therefore interleaves with batches and uploads that
+    arrive after it instead of holding every worker until it drains.
+
+    The same scheduler runs inside the API process or, with
+    ``run_workers=False`` there, in separate ``python -m src.worker`` processes.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, batch_size: int = 1):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(1, max_queued)
+        self.batch_size = max(1, batch_size)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._workers: List[asyncio.Task] = []
+        self._reaper: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._started = False
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+        self._recovered = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._claimed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._started
+
+    async def start(self, run_workers: bool = True):
+        """Recover orphaned jobs, then start worker tasks on the running event loop"""
+        if self.running:
+            return
+        recovered = await recover_jobs(settings.JOB_MAX_ATTEMPTS, include_unleased=True)
+        self._recovered += recovered["requeued"] + recovered["enqueued"]
+        if any(recovered.values()):
+            logger.info(f"Recovered orphaned jobs: {recovered}")
+
+        self._wakeup = asyncio.Event()
+        self._started = True
+        if run_workers:
+            self._workers = [
+                asyncio.create_task(self._worker(i), name=f"extraction-worker-{i}")
+                for i in range(self.max_concurrent)
+            ]
+            self._reaper = asyncio.create_task(self._reap_expired_leases(), name="lease-reaper")
+        logger.info(
+            f"Job scheduler {self.worker_id} started: "
+            f"{len(self._workers)} workers, queue size {self.max_queued}"
+        )
+
+    async def stop(self):
+        """Cancel workers; in-flight jobs go back to the queue"""
+        tasks = self._workers + ([self._reaper] if self._reaper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._reaper = None
+        self._started = False
+        logger.info("Job scheduler stopped")
+
+    async def free_slots(self) -> int:
+        """Jobs that can still be queued before submissions are rejected"""
+        if not self.running:
+            return 0
+        return max(self.max_queued - await pending_count(), 0)
+
+    async def submit(self, job_id: str, file_path: str, content_hash: Optional[str] = None) -> int:
+        """Queue a created job for extraction and return the number of jobs ahead of it"""
+        if not self.running:
+            raise RuntimeError("Job scheduler is not running")
+        # The job's own pending row is already counted
+        if await pending_count() > self.max_queued:
+            raise QueueFullError(f"Extraction queue is full ({self.max_queued} jobs waiting)")
+        await enqueue_jobs([(job_id, 0)])
+        self._wakeup.set()
+        return await queue_position(job_id)
+
+    async def submit_batch(self, batch_id: str, jobs: List[Dict[str, Any]]):
+        """Queue all jobs of a batch (dicts with job_id) at fair-share positions"""
+        if not self.running:
+            raise RuntimeError("Job scheduler is not running")
+        await enqueue_jobs([(job["job_id"], index // self.batch_size) for index, job in enumerate(jobs)])
+        logger.info(f"[Batch {batch_id}] Queued {len(jobs)} jobs")
+        self._wakeup.set()
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                job = await claim_job(self.worker_id, settings.JOB_LEASE_SECONDS)
+            except Exception as e:
+                logger.error(f"Worker {index} failed to claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.QUEUE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(index, job)
+
+    async def _run(self, index: int, job: ClaimedJob):
+        # Imported lazily so the scheduler can be created before the workflow module
+        from .langgraph_extraction import run_extraction_workflow
+
+        self._claimed += 1
+        self._total_wait += job.wait_seconds
+        self._max_wait = max(self._max_wait, job.wait_seconds)
+        self._in_flight += 1
+        logger.info(
+            f"[Job {job.job_id}] Claimed by worker {index} after {job.wait_seconds:.2f}s wait "
+            f"(attempt {job.attempts})"
+        )
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            outcome = await run_extraction_workflow(
+                job_id=job.job_id,
+                file_path=job.file_path,
+                content_hash=job.content_hash,
+                trace=job.trace or settings.JOB_TRACE_ENABLED
+            )
+            if outcome == "completed":
+                self._completed += 1
+            else:
+                self._failed += 1
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without spending an attempt
+            outcome = "cancelled"
+            await retry_job(job.job_id, self.worker_id, 0, "Worker shut down", refund_attempt=True)
+            raise
+        except TransientJobError as e:
+            outcome = "transient_error"
+            await self._retry_or_fail(job, str(e))
+        except Exception as e:
+            self._failed += 1
+            logger.error(f"[Job {job.job_id}] Scheduler worker error: {str(e)}", exc_info=True)
+        finally:
+            heartbeat.cancel()
+            self._in_flight -= 1
+            JOB_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+    async def _retry_or_fail(self, job: ClaimedJob, error: str):
+        from ..database.jobs import update_job_status
+
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            self._failed += 1
+            logger.error(f"[Job {job.job_id}] Failed after {job.attempts} attempts: {error}")
+            await update_job_status(job.job_id, status="failed", error=error)
+            return
+        delay = retry_delay(job.attempts)
+        self._retried += 1
+        logger.warning(f"[Job {job.job_id}] Transient failure, retrying in {delay:.0f}s: {error}")
+        await retry_job(job.job_id, self.worker_id, delay, error)
+
+    async def _heartbeat(self, job: ClaimedJob):
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            try:
+                if not await renew_lease(job.job_id, self.worker_id, settings.JOB_LEASE_SECONDS):
+                    logger.warning(f"[Job {job.job_id}] Lease lost; another worker may rerun this job")
+                    return
+            except Exception as e:
+                logger.error(f"[Job {job.job_id}] Heartbeat failed: {str(e)}")
+
+    async def _reap_expired_leases(self):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 2)
+            try:
+                recovered = await recover_jobs(settings.JOB_MAX_ATTEMPTS)
+                self._recovered += recovered["requeued"]
+                if recovered["requeued"] or recovered["failed"]:
+                    logger.warning(f"Recovered jobs with expired leases: {recovered}")
+                    self._wakeup.set()
+            except Exception as e:
+                logger.error(f"Lease recovery failed: {str(e)}")
+
+    async def stats(self) -> Dict[str, Any]:
+        """Queue depth, concurrency, retry and wait-time statistics"""
+        return {
+            "worker_id": self.worker_id,
+            "queue_depth": await pending_count() if self.running else 0,
+            "queue_capacity": self.max_queued,
+            "in_flight": self._in_flight,
+            "max_concurrent": self.max_concurrent if self._workers else 0,
+            "completed": self._completed,
+            "failed": self._failed,
+            "retried": self._retried,
+            "recovered": self._recovered,
+            "avg_wait_seconds": round(self._total_wait / self._claimed, 3) if self._claimed else 0.0,
+            "max_wait_seconds": round(self._max_wait, 3),
+        }
+
+
+scheduler = JobScheduler(
+    max_concurrent=settings.MAX_CONCURRENT_JOBS,
+    max_queued=settings.MAX_QUEUED_JOBS,
+    batch_size=settings.BATCH_SIZE,
+)
+
+metrics.gauge(
+    "synapse_jobs_in_flight", "Extraction jobs running in this process", [],
+    lambda: {(): scheduler._in_flight}
+)
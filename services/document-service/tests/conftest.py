@@ -0,0 +1,16 @@
+"""Offline settings for the unit tests: no Gemini key or network needed"""
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import pytest  # noqa: E402
+
+from src.database.connection import db_manager  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh SQLite database; tests open it with init_db() inside their event loop"""
+    monkeypatch.setattr(db_manager, "db_path", tmp_path / "test.db")
+    return db_manager
@@ -0,0 +1,38 @@
+"""Age and size eviction of the OCR and parsed text caches"""
+import asyncio
+from contextlib import closing
+
+from src.config import settings
+from src.database.cache_tables import connect
+from src.database.jobs import close_db, init_db
+from src.database.ocr_cache import get_ocr_texts, store_ocr_texts
+
+
+def test_ocr_cache_evicts_by_its_own_max_age(database, monkeypatch):
+    asyncio.run(init_db())
+    asyncio.run(close_db())
+    monkeypatch.setattr(settings, "OCR_CACHE_MAX_AGE_DAYS", 90)
+    monkeypatch.setattr(settings, "TEXT_STORE_MAX_AGE_DAYS", 1)
+
+    store_ocr_texts({"recent": "page one", "stale": "page two"}, "engine")
+    with closing(connect()) as db:
+        db.execute("UPDATE ocr_pages SET last_accessed_at = datetime('now', '-30 days') WHERE page_hash = 'recent'")
+        db.execute("UPDATE ocr_pages SET last_accessed_at = datetime('now', '-120 days') WHERE page_hash = 'stale'")
+        db.commit()
+    store_ocr_texts({"new": "page three"}, "engine")
+
+    assert get_ocr_texts(["recent", "stale", "new"], "engine") == {"recent": "page one", "new": "page three"}
+
+
+def test_ocr_cache_keeps_most_recently_used_pages(database, monkeypatch):
+    asyncio.run(init_db())
+    asyncio.run(close_db())
+    monkeypatch.setattr(settings, "OCR_CACHE_MAX_PAGES", 2)
+
+    store_ocr_texts({"first": "a", "second": "b"}, "engine")
+    with closing(connect()) as db:
+        db.execute("UPDATE ocr_pages SET last_accessed_at = datetime('now', '-1 day') WHERE page_hash = 'first'")
+        db.commit()
+    store_ocr_texts({"third": "c"}, "engine")
+
+    assert set(get_ocr_texts(["first", "second", "third"], "engine")) == {"second", "third"}
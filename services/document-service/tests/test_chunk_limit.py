@@ -0,0 +1,59 @@
+"""Extraction of documents longer than EXTRACTION_MAX_CHUNKS chunks"""
+import pytest
+
+from src.config import settings
+from src.core.parsers.pdf_parser import ParsedDocument
+from src.workflows import langgraph_extraction
+from src.workflows.chunking import split_into_chunks
+
+
+def long_document(pages: int, chars_per_page: int) -> ParsedDocument:
+    document = ParsedDocument(page_count=pages)
+    for page in range(pages):
+        document.add_page("\n".join(f"Clause {page}.{line} " + "x" * 60 for line in range(chars_per_page // 70)))
+    return document
+
+
+@pytest.fixture
+def chunked(monkeypatch):
+    document = long_document(pages=20, chars_per_page=3000)
+    monkeypatch.setattr(settings, "EXTRACTION_MODE", "chunked")
+    monkeypatch.setattr(settings, "EXTRACTION_MAX_CHARS", 5000)
+    monkeypatch.setattr(settings, "EXTRACTION_CHUNK_OVERLAP_CHARS", 500)
+    monkeypatch.setattr(langgraph_extraction, "read_document_pages", lambda *args, **kwargs: document)
+    monkeypatch.setattr(langgraph_extraction.registry, "get_extraction_chain", lambda document_type: None)
+    monkeypatch.setattr(
+        langgraph_extraction, "_extract_chunks",
+        lambda job_id, chain, chunks, document_type: ({"borrower": {"name": "Acme"}}, {}, len(chunks), [])
+    )
+    return document
+
+
+def run_agent():
+    return langgraph_extraction.gemini_extraction_agent({
+        "job_id": "job-1", "document_path": "agreement.pdf", "content_hash": "hash",
+        "document_ref": "ref-1", "document_type": "FACILITY_AGREEMENT", "errors": [],
+    })
+
+
+def test_truncated_document_reports_error_and_scales_confidence(chunked, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "EXTRACTION_MAX_CHUNKS", 3)
+    covered = split_into_chunks(chunked, 5000, 500, max_chunks=3)[-1].end
+    total = len(chunked.text)
+
+    result = run_agent()
+
+    assert result["confidence_score"] == pytest.approx(0.85 * covered / total)
+    assert result["errors"] == [
+        f"Document truncated at 3 chunks: {total - covered} of {total} chars not extracted"
+    ]
+    assert "Chunk limit 3 reached" in caplog.text
+
+
+def test_document_within_chunk_limit_keeps_full_confidence(chunked, monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACTION_MAX_CHUNKS", 100)
+
+    result = run_agent()
+
+    assert result["confidence_score"] == pytest.approx(0.85)
+    assert result["errors"] == []
@@ -0,0 +1,46 @@
+"""Partial results do not outlive the attempt that produced them"""
+import asyncio
+
+from src.database import job_queue
+from src.database.jobs import close_db, create_job, get_job, init_db
+
+
+async def claimed_job_with_partial(database, job_id: str):
+    await init_db()
+    await create_job(job_id, "agreement.pdf", "/tmp/agreement.pdf", 100)
+    await job_queue.enqueue_jobs([(job_id, 0)])
+    assert (await job_queue.claim_job("worker-1", lease_seconds=30)).job_id == job_id
+    async with database.writer() as db:
+        await db.execute(
+            "UPDATE extraction_jobs SET partial_result = ? WHERE job_id = ?", ('{"borrower": "Acme"}', job_id)
+        )
+
+
+def test_retry_clears_partial_result(database):
+    async def scenario():
+        await claimed_job_with_partial(database, "job-1")
+        await job_queue.retry_job("job-1", "worker-1", delay=0, error="quota")
+        job = await get_job("job-1")
+        await close_db()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "pending"
+    assert job["partial_result"] is None
+
+
+def test_claim_clears_partial_result_left_by_a_dead_worker(database):
+    async def scenario():
+        await claimed_job_with_partial(database, "job-1")
+        # Lease expired without a retry, as when the worker process dies
+        async with database.writer() as db:
+            await db.execute("UPDATE extraction_jobs SET lease_expires_at = 0 WHERE job_id = 'job-1'")
+        await job_queue.recover_jobs(max_attempts=3)
+        claimed = await job_queue.claim_job("worker-2", lease_seconds=30)
+        job = await get_job("job-1")
+        await close_db()
+        return claimed, job
+
+    claimed, job = asyncio.run(scenario())
+    assert claimed.job_id == "job-1"
+    assert job["partial_result"] is None
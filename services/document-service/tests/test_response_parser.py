@@ -0,0 +1,75 @@
+"""Repair of sloppy and truncated model JSON"""
+import pytest
+
+from src.workflows.response_parser import IncrementalObjectParser, ResponseParseError, parse_json_response
+
+
+def test_strict_json_needs_no_repair():
+    parsed = parse_json_response('{"borrower": {"name": "Acme"}}')
+    assert parsed.data == {"borrower": {"name": "Acme"}}
+    assert not parsed.repaired
+
+
+def test_code_fences_are_stripped():
+    parsed = parse_json_response('```json\n{"borrower": {"name": "Acme"}}\n```')
+    assert parsed.data == {"borrower": {"name": "Acme"}}
+
+
+def test_prose_around_object_is_dropped():
+    parsed = parse_json_response('Here is the extraction:\n{"amount": 5} Let me know if you need more.')
+    assert parsed.data == {"amount": 5}
+    assert "text after object" in parsed.fixes
+
+
+def test_trailing_commas_are_dropped():
+    parsed = parse_json_response('{"lenders": ["A", "B",], "amount": 5,}')
+    assert parsed.data == {"lenders": ["A", "B"], "amount": 5}
+    assert "trailing comma" in parsed.fixes
+
+
+def test_python_literals_and_comments_are_mapped():
+    parsed = parse_json_response('{"secured": True, // per clause 4\n "guarantor": None}')
+    assert parsed.data == {"secured": True, "guarantor": None}
+    assert {"python literal", "comment"} <= set(parsed.fixes)
+
+
+def test_truncation_inside_a_string_keeps_complete_members():
+    parsed = parse_json_response('{"borrower": "Acme plc", "agent": "Big Ba')
+    assert parsed.data == {"borrower": "Acme plc"}
+    assert "truncated" in parsed.fixes
+
+
+def test_truncation_inside_an_array_keeps_complete_items():
+    parsed = parse_json_response('{"borrower": "Acme", "lenders": ["Bank A", "Bank B", "Ba')
+    assert parsed.data == {"borrower": "Acme", "lenders": ["Bank A", "Bank B"]}
+
+
+def test_truncated_response_is_filled_out_to_the_schema():
+    schema = {"borrower": {"name": "", "jurisdiction": ""}, "covenants": [{"type": ""}]}
+    parsed = parse_json_response('{"borrower": {"name": "Acme", "juris', schema)
+    assert parsed.data == {"borrower": {"name": "Acme", "jurisdiction": None}, "covenants": []}
+
+
+def test_non_ascii_strings_parse():
+    parsed = parse_json_response('{"borrower": "Contoso Énergie S.à r.l.", "note": "café",}')
+    assert parsed.data == {"borrower": "Contoso Énergie S.à r.l.", "note": "café"}
+
+
+@pytest.mark.parametrize("text", [
+    '{"a": 1, note: café}',
+    '{"a": 1, "b": Größe}',
+    '{"a": 1, "b": 日本}',
+    'no object here',
+    '{"a": 1 "b": 2}',
+])
+def test_unrepairable_input_raises_response_parse_error(text):
+    with pytest.raises(ResponseParseError):
+        parse_json_response(text)
+
+
+def test_incremental_parser_yields_members_as_they_close():
+    parser = IncrementalObjectParser()
+    assert parser.feed('{"borrower": {"name": "Ac') == []
+    assert parser.feed('me"}, "amount"') == [("borrower", {"name": "Acme"})]
+    assert parser.feed(': 5}') == [("amount", 5)]
+    assert parser.text == '{"borrower": {"name": "Acme"}, "amount": 5}'
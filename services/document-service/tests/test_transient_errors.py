@@ -0,0 +1,51 @@
+"""Which failures the scheduler and the Gemini client treat as retryable"""
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from src.workflows.llm_client import is_overload_error
+from src.workflows.response_parser import ResponseParseError
+from src.workflows.scheduler import is_transient_error
+
+
+@pytest.mark.parametrize("error", [
+    google_exceptions.ResourceExhausted("Resource has been exhausted (e.g. check quota)."),
+    google_exceptions.TooManyRequests("Too many requests"),
+    google_exceptions.ServiceUnavailable("The model is overloaded. Please try again later."),
+    google_exceptions.DeadlineExceeded("Deadline exceeded"),
+    google_exceptions.InternalServerError("Internal error"),
+    TimeoutError("read timed out"),
+    ConnectionResetError("connection reset by peer"),
+    RuntimeError("upstream returned HTTP 503"),
+    RuntimeError("request failed with status code: 429"),
+])
+def test_quota_overload_and_timeout_errors_are_transient(error):
+    assert is_transient_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    ResponseParseError("Unrepairable JSON: Expecting ',' delimiter: line 1 column 503 (char 502)"),
+    ResponseParseError("Unrepairable JSON: Expecting value: line 429 column 1 (char 4290)"),
+    ValueError("JSON parsing failed: Unrepairable JSON: Expecting , delimiter: line 1 column 503 (char 502)"),
+    RuntimeError("Error reading PDF: object 500 0 R not found"),
+    google_exceptions.InvalidArgument("Request payload size exceeds the limit: 429 bytes over"),
+    google_exceptions.PermissionDenied("API key not valid"),
+])
+def test_parse_and_client_errors_are_not_transient(error):
+    assert not is_transient_error(error)
+
+
+def test_error_raised_from_a_transient_one_is_transient():
+    try:
+        try:
+            raise google_exceptions.ServiceUnavailable("overloaded")
+        except google_exceptions.ServiceUnavailable as e:
+            raise ValueError("All 3 chunk extractions failed") from e
+    except ValueError as e:
+        assert is_transient_error(e)
+
+
+def test_overload_backs_off_on_quota_and_unavailable_only():
+    assert is_overload_error(google_exceptions.ResourceExhausted("quota"))
+    assert is_overload_error(google_exceptions.ServiceUnavailable("overloaded"))
+    assert not is_overload_error(google_exceptions.DeadlineExceeded("slow"))
+    assert not is_overload_error(ResponseParseError("line 1 column 429"))